@@ -20,8 +20,11 @@ from models.schemas import (
     ErrorResponse
 )
 from config import settings, get_device_ip
-from core.inference import run_inference
+from core.batching import InferenceBusyError
+from core.inference import InvalidAudioError, run_inference
 from core.audio import AudioRecorder
+from core.simulator import create_simulator
+from core.spool import find_orphaned_spools
 
 logger = logging.getLogger("heartsound.detection")
 
@@ -97,6 +100,57 @@ def cleanup_old_sessions(max_age_minutes: int = 30):
         logger.info(f"Cleaned up {len(to_remove)} old sessions")
 
 
+async def recover_orphaned_recordings() -> int:
+    """
+    Re-analyze recordings spooled to disk before an unclean shutdown.
+    重新分析异常退出前落盘的录音
+
+    Each recovered recording is registered as a completed session under
+    its original session ID so clients can still fetch the result.
+
+    Returns:
+        Number of recordings recovered
+    """
+    recovered = 0
+    for spool in find_orphaned_spools(settings.AUDIO_SPOOL_DIR):
+        if spool.frames_written == 0:
+            spool.discard()
+            continue
+
+        logger.info(
+            f"Recovering spooled recording {spool.spool_id}: "
+            f"{spool.frames_written} frames ({spool.state})"
+        )
+        try:
+            result = await run_inference(spool.get_audio_data())
+        except InvalidAudioError as e:
+            # Nothing to recover; retrying on every start would not help
+            logger.warning(f"Discarding unusable spool {spool.spool_id}: {e.reason}")
+            spool.discard()
+            continue
+        except Exception as e:
+            logger.error(f"Failed to re-analyze spool {spool.spool_id}: {e}")
+            continue
+
+        session = DetectionSession(
+            session_id=spool.spool_id,
+            duration=round(spool.frames_written / spool.sample_rate)
+        )
+        session.result = result
+        session.status = "completed"
+        session.message = "已从中断的录制中恢复分析结果"
+        session.progress = 100
+        session.completed_at = datetime.now()
+        active_sessions[session.session_id] = session
+
+        spool.discard()
+        recovered += 1
+
+    if recovered:
+        logger.info(f"Recovered {recovered} spooled recordings")
+    return recovered
+
+
 # ============================================================================
 # API Endpoints
 # ============================================================================
@@ -192,7 +246,8 @@ async def get_detection_result(session_id: str) -> DetectionResultResponse:
     response_model=DetectionResultResponse,
     responses={
         404: {"model": ErrorResponse, "description": "会话不存在"},
-        400: {"model": ErrorResponse, "description": "无效操作"}
+        400: {"model": ErrorResponse, "description": "无效操作"},
+        503: {"model": ErrorResponse, "description": "推理队列已满"}
     }
 )
 async def trigger_analysis(session_id: str) -> DetectionResultResponse:
@@ -223,15 +278,15 @@ async def trigger_analysis(session_id: str) -> DetectionResultResponse:
         )
 
     # Update status
+    previous = (session.status, session.message, session.progress)
     session.status = "analyzing"
     session.message = "AI正在分析心音..."
     session.progress = 70
 
     # Run simulated analysis
     try:
-        import numpy as np
-        # Generate fake audio data for testing
-        fake_audio = np.random.randn(settings.AUDIO_SAMPLE_RATE * session.duration).astype(np.float32)
+        # Generate simulated heart sound data for testing
+        fake_audio = create_simulator().generate(session.duration)
         result = await run_inference(fake_audio)
 
         session.result = result
@@ -242,6 +297,19 @@ async def trigger_analysis(session_id: str) -> DetectionResultResponse:
 
         logger.info(f"Manual analysis completed for {session_id}: {result.category}")
 
+    except InferenceBusyError as e:
+        # Not started: leave the session as it was so the client can retry
+        session.status, session.message, session.progress = previous
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "inference_busy",
+                "message": f"设备繁忙，请{e.retry_after}秒后重试",
+                "retry_after": e.retry_after
+            },
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
     except Exception as e:
         logger.error(f"Analysis failed for {session_id}: {e}")
         session.status = "error"
@@ -5,10 +5,21 @@ HeartSound Device API Router
 """
 import time
 from datetime import datetime
+from pathlib import Path
 from fastapi import APIRouter, HTTPException
 
-from models.schemas import DeviceInfo, PingResponse, ErrorResponse
+from models.schemas import (
+    DeviceInfo,
+    PingResponse,
+    ErrorResponse,
+    ModelDeployRequest,
+    ModelTrafficRequest
+)
 from config import settings, get_device_ip
+from core.batching import get_inference_batcher
+from core.capture import get_capture_service
+from core.inference import get_result_cache
+from core.registry import get_model_registry
 
 # Module-level state
 _start_time = time.time()
@@ -44,7 +55,7 @@ async def get_device_info() -> DeviceInfo:
         status=_device_status,
         ip_address=get_device_ip(),
         firmware_version=settings.FIRMWARE_VERSION,
-        model_version=settings.MODEL_VERSION,
+        model_version=get_model_registry().active_version,
         uptime_seconds=uptime
     )
 
@@ -68,6 +79,140 @@ async def ping() -> PingResponse:
     )
 
 
+@router.get(
+    "/capture",
+    summary="采集设备状态",
+    description="查看共享采集设备状态及各订阅者队列、溢出计数"
+)
+async def get_capture_status() -> dict:
+    """
+    Capture device status
+
+    Returns device format, input overflow count and per-subscriber
+    queue fill level / overrun counters.
+    """
+    return get_capture_service().get_stats()
+
+
+@router.get(
+    "/inference",
+    summary="推理队列状态",
+    description="查看推理队列深度、执行中请求数、拒绝次数、批大小及结果缓存命中统计"
+)
+async def get_inference_status() -> dict:
+    """
+    Inference queue status
+
+    Returns queued and in-flight requests, busy rejections and batch size
+    metrics of the shared micro-batching queue, plus result cache
+    hit / miss / eviction counters.
+    """
+    stats = get_inference_batcher().get_stats()
+    stats["result_cache"] = get_result_cache().get_stats()
+    return stats
+
+
+@router.get(
+    "/models",
+    summary="模型版本状态",
+    description="查看活动模型、候选模型、流量分配、各版本延迟及部署进度"
+)
+async def get_models() -> dict:
+    """
+    Model registry status
+
+    Returns the active and candidate model versions with their traffic
+    share and latency, and the state of the last deployment.
+    """
+    return get_model_registry().get_stats()
+
+
+@router.post(
+    "/models",
+    status_code=202,
+    responses={
+        400: {"model": ErrorResponse, "description": "无效的模型或版本"},
+        409: {"model": ErrorResponse, "description": "已有模型正在加载"}
+    },
+    summary="部署新模型",
+    description="后台加载并预热新模型，按流量比例上线或直接热切换，不中断现有会话"
+)
+async def deploy_model(request: ModelDeployRequest) -> dict:
+    """
+    Deploy a model without restarting
+
+    The model file must be in the model directory. Loading and warm-up
+    run in the background; poll GET /api/device/models for progress.
+    """
+    if Path(request.model_file).name != request.model_file:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": "invalid_model", "message": "模型文件名不能包含路径"}
+        )
+    model_path = str(Path(settings.MODEL_PATH).parent / request.model_file)
+
+    registry = get_model_registry()
+    try:
+        registry.start_deploy(model_path, request.version, request.traffic)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400, detail={"error": "invalid_model", "message": str(e)}
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=409, detail={"error": "deployment_in_progress", "message": str(e)}
+        )
+    return {"message": "模型加载中", "deployment": registry.deployment}
+
+
+@router.put(
+    "/models/traffic",
+    responses={409: {"model": ErrorResponse, "description": "没有候选模型"}},
+    summary="调整候选模型流量",
+    description="设置分配到候选模型的新请求百分比"
+)
+async def set_model_traffic(request: ModelTrafficRequest) -> dict:
+    """Set the candidate model's share of new requests"""
+    registry = get_model_registry()
+    try:
+        registry.set_traffic(request.traffic)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=409, detail={"error": "no_candidate", "message": str(e)}
+        )
+    return registry.get_stats()
+
+
+@router.post(
+    "/models/promote",
+    responses={409: {"model": ErrorResponse, "description": "没有候选模型"}},
+    summary="切换到候选模型",
+    description="将候选模型原子切换为活动模型，进行中的分析在旧模型上完成"
+)
+async def promote_model() -> dict:
+    """Make the candidate the active model for new requests"""
+    registry = get_model_registry()
+    try:
+        registry.promote()
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=409, detail={"error": "no_candidate", "message": str(e)}
+        )
+    return registry.get_stats()
+
+
+@router.delete(
+    "/models/candidate",
+    summary="撤下候选模型",
+    description="停止向候选模型分配流量并释放（回滚）"
+)
+async def discard_model() -> dict:
+    """Drop the candidate model"""
+    registry = get_model_registry()
+    registry.discard()
+    return registry.get_stats()
+
+
 # ============================================================================
 # Internal functions for device state management
 # ============================================================================
@@ -11,9 +11,17 @@ import logging
 from datetime import datetime
 from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
 
+from config import settings
 from core.audio import AudioRecorder
-from core.inference import run_inference
+from core.capture import get_capture_service
+from core.simulator import SIMULATOR_PRESETS, create_simulator
+from core.batching import InferenceBusyError
+from core.inference import InvalidAudioError, run_inference
+from models.schemas import BeatMarker
+from utils.audio_utils import mix_channels
+from utils.frame_codec import FrameEncoder
 
 logger = logging.getLogger("heartsound.websocket")
 
@@ -30,12 +38,19 @@ class ConnectionManager:
         self.active_connections: dict[str, WebSocket] = {}
         self._recorders: dict[str, AudioRecorder] = {}
         self._tasks: dict[str, asyncio.Task] = {}
-
-    async def connect(self, session_id: str, websocket: WebSocket) -> bool:
+        self._encoders: dict[str, FrameEncoder] = {}
+
+    async def connect(
+        self,
+        session_id: str,
+        websocket: WebSocket,
+        encoder: Optional[FrameEncoder] = None
+    ) -> bool:
         """Accept new WebSocket connection."""
         try:
             await websocket.accept()
             self.active_connections[session_id] = websocket
+            self._encoders[session_id] = encoder or FrameEncoder()
             logger.info(f"Client connected: {session_id}")
             return True
         except Exception as e:
@@ -47,6 +62,7 @@ class ConnectionManager:
         if session_id in self.active_connections:
             del self.active_connections[session_id]
             logger.info(f"Client disconnected: {session_id}")
+        self._encoders.pop(session_id, None)
 
         # Clean up recorder
         if session_id in self._recorders:
@@ -67,15 +83,56 @@ class ConnectionManager:
                 logger.error(f"Failed to send message to {session_id}: {e}")
                 self.disconnect(session_id)
 
+    async def send_frame(self, session_id: str, frame: dict):
+        """Send an audio frame in the format negotiated at connect."""
+        encoder = self._encoders.get(session_id)
+        if encoder is None:
+            return
+        message = encoder.encode(frame)
+        if not encoder.is_binary:
+            await self.send_message(session_id, message)
+        elif session_id in self.active_connections:
+            try:
+                await self.active_connections[session_id].send_bytes(message)
+            except Exception as e:
+                logger.error(f"Failed to send frame to {session_id}: {e}")
+                self.disconnect(session_id)
+                return
+
+        # Packed frames only carry the BPM; beat markers follow as JSON
+        if encoder.encoding != "json" and frame.get("beats"):
+            await self.send_message(session_id, {
+                "type": "beats",
+                "bpm": frame.get("bpm"),
+                "beats": frame["beats"]
+            })
+
+    def get_frame_format(self, session_id: str) -> dict:
+        """Get the negotiated frame format of a session."""
+        encoder = self._encoders.get(session_id)
+        return encoder.describe() if encoder else {}
+
     async def broadcast(self, message: dict):
         """Broadcast message to all connected clients."""
         for session_id in list(self.active_connections.keys()):
             await self.send_message(session_id, message)
 
-    def get_recorder(self, session_id: str, duration: int = 30) -> AudioRecorder:
+    def get_recorder(
+        self,
+        session_id: str,
+        duration: int = 30,
+        simulator_options: Optional[dict] = None
+    ) -> AudioRecorder:
         """Get or create audio recorder for session."""
         if session_id not in self._recorders:
-            self._recorders[session_id] = AudioRecorder(duration=duration)
+            simulator = None
+            if simulator_options:
+                simulator = create_simulator(**simulator_options)
+            self._recorders[session_id] = AudioRecorder(
+                duration=duration,
+                session_id=session_id,
+                simulator=simulator
+            )
         return self._recorders[session_id]
 
     def is_connected(self, session_id: str) -> bool:
@@ -93,14 +150,25 @@ async def websocket_audio_endpoint(websocket: WebSocket, session_id: str):
     WebSocket endpoint for audio streaming.
     音频流WebSocket端点
 
+    Query parameters ``frame_encoding`` (json | uint8 | int16 | float16)
+    and ``frame_transport`` (binary | base64) select the audio_frame
+    format; see utils.frame_codec. The connected status echoes the
+    format in use.
+
     Protocol Messages:
     - audio_frame: Real-time waveform data for visualization
     - status: Recording status updates
     - recording_complete: Recording finished, analysis starting
     - analysis_complete: AI analysis finished with results
     """
+    try:
+        encoder = FrameEncoder.from_params(websocket.query_params)
+    except ValueError as e:
+        logger.warning(f"{e}, using JSON frames for {session_id}")
+        encoder = FrameEncoder()
+
     # Accept connection
-    if not await manager.connect(session_id, websocket):
+    if not await manager.connect(session_id, websocket, encoder):
         return
 
     try:
@@ -112,6 +180,7 @@ async def websocket_audio_endpoint(websocket: WebSocket, session_id: str):
             "type": "status",
             "status": "connected",
             "session_id": session_id,
+            "frame_format": manager.get_frame_format(session_id),
             "message": "设备连接成功，等待开始录制"
         })
 
@@ -128,7 +197,8 @@ async def websocket_audio_endpoint(websocket: WebSocket, session_id: str):
                 if command == "start":
                     # Start recording
                     duration = data.get("duration", 30)
-                    await handle_recording(session_id, duration)
+                    simulator_options = parse_simulator_options(data.get("simulator"))
+                    await handle_recording(session_id, duration, simulator_options)
 
                 elif command == "stop":
                     # Manual stop
@@ -161,12 +231,44 @@ async def websocket_audio_endpoint(websocket: WebSocket, session_id: str):
         manager.disconnect(session_id)
 
 
-async def handle_recording(session_id: str, duration: int = 30):
+def parse_simulator_options(options) -> Optional[dict]:
+    """
+    Validate simulator parameters sent with the start command.
+    校验开始命令中的模拟器参数
+
+    Only applies when the device has no capture hardware; used by load
+    tests to get deterministic, preset-specific audio.
+    """
+    if not isinstance(options, dict):
+        return None
+
+    parsed = {}
+    if options.get("preset") in SIMULATOR_PRESETS:
+        parsed["preset"] = options["preset"]
+    for key in ("bpm", "snr_db"):
+        if isinstance(options.get(key), (int, float)):
+            parsed[key] = float(options[key])
+    if isinstance(options.get("seed"), int):
+        parsed["seed"] = options["seed"]
+    if "bpm" in parsed:
+        parsed["bpm"] = min(max(parsed["bpm"], 30.0), 220.0)
+    return parsed or None
+
+
+async def handle_recording(
+    session_id: str,
+    duration: int = 30,
+    simulator_options: Optional[dict] = None
+):
     """
     Handle audio recording session.
     处理音频录制会话
     """
-    recorder = manager.get_recorder(session_id, duration=duration)
+    recorder = manager.get_recorder(
+        session_id,
+        duration=duration,
+        simulator_options=simulator_options
+    )
 
     # Start recording
     await recorder.start_recording()
@@ -177,35 +279,54 @@ async def handle_recording(session_id: str, duration: int = 30):
         "type": "status",
         "status": "recording",
         "remaining_seconds": duration,
+        "simulated": recorder.is_simulated,
         "message": "开始录制心音"
     })
 
     # Stream audio frames
-    frame_count = 0
-    async for frame in recorder.stream_frames(frame_interval=0.033):
+    next_status_at = 5.0
+    prompted_issue = None
+    # Packed frame encodings are mono-only: skip per-channel data for them
+    frame_format = manager.get_frame_format(session_id)
+    per_channel = frame_format.get("encoding", "json") == "json"
+    async for frame in recorder.stream_frames(per_channel=per_channel):
         if not manager.is_connected(session_id):
             logger.warning(f"Client disconnected during recording: {session_id}")
             await recorder.stop_recording()
             return
 
         # Send audio frame
-        await manager.send_message(session_id, {
-            "type": "audio_frame",
-            "timestamp": frame["timestamp"],
-            "data": frame["waveform"],
-            "amplitude": frame["amplitude"],
-            "remaining_seconds": frame["remaining_seconds"]
-        })
-
-        frame_count += 1
-
-        # Send status update every 5 seconds
-        if frame_count % 150 == 0:  # ~5 seconds at 30fps
+        await manager.send_frame(session_id, frame)
+
+        # Act on sustained poor signal quality
+        quality = frame.get("quality")
+        if quality is not None and not quality["good"]:
+            if should_abort_for_quality(quality, frame["elapsed_seconds"]):
+                await abort_recording_for_quality(session_id, recorder, quality)
+                return
+            if (quality["bad_seconds"] >= settings.QUALITY_PROMPT_SECONDS
+                    and quality["issue"] != prompted_issue):
+                prompted_issue = quality["issue"]
+                await manager.send_message(session_id, {
+                    "type": "status",
+                    "status": "quality_warning",
+                    "issue": quality["issue"],
+                    "quality": quality,
+                    "message": quality["message"] or "信号质量较差，请调整听诊位置"
+                })
+        elif quality is not None:
+            prompted_issue = None
+
+        # Send status update every 5 seconds of captured audio
+        if frame["elapsed_seconds"] >= next_status_at:
+            next_status_at += 5.0
             await manager.send_message(session_id, {
                 "type": "status",
                 "status": "recording",
-                "remaining_seconds": recorder.remaining_seconds,
-                "progress": int((1 - recorder.remaining_seconds / duration) * 100)
+                "remaining_seconds": frame["remaining_seconds"],
+                "progress": int(frame["elapsed_seconds"] / duration * 100),
+                "frame_rate": recorder.frame_stats,
+                "signal": recorder.stats.summary()
             })
 
     # Stop recording
@@ -227,7 +348,11 @@ async def handle_recording(session_id: str, duration: int = 30):
     })
 
     try:
-        result = await run_inference(audio_data)
+        result = await run_inference(audio_data, stats=recorder.stats, quality=recorder.quality)
+        if recorder.segmenter is not None:
+            segmentation = recorder.segmenter.summary()
+            result.bpm = segmentation["bpm"]
+            result.beats = [BeatMarker(**beat) for beat in segmentation["beats"]]
 
         # Send analysis complete with results
         await manager.send_message(session_id, {
@@ -243,12 +368,40 @@ async def handle_recording(session_id: str, duration: int = 30):
                     "summary": result.health_advice.summary,
                     "suggestions": result.health_advice.suggestions,
                     "action": result.health_advice.action
-                }
+                },
+                "bpm": result.bpm,
+                "beats": [beat.model_dump() for beat in result.beats or []],
+                "windows": [window.model_dump() for window in result.windows or []],
+                "simulated": result.simulated
             }
         })
 
         logger.info(f"Analysis complete for {session_id}: {result.category}")
 
+        # Result delivered, the on-disk spool is no longer needed
+        recorder.discard_spool()
+
+    except InvalidAudioError as e:
+        # Unusable recording: report it like a quality abort, no diagnosis
+        recorder.discard_spool()
+        logger.warning(f"Recording unusable for {session_id}: {e.reason}")
+        await manager.send_message(session_id, {
+            "type": "error",
+            "error": "poor_signal_quality",
+            "issue": "invalid_audio",
+            "quality": recorder.quality.report if recorder.quality else None,
+            "message": f"{e.reason}，请调整后重新开始检测"
+        })
+
+    except InferenceBusyError as e:
+        logger.warning(f"Analysis rejected for {session_id}: {e}")
+        await manager.send_message(session_id, {
+            "type": "error",
+            "error": "inference_busy",
+            "message": f"设备繁忙，请{e.retry_after}秒后重试",
+            "retry_after": e.retry_after
+        })
+
     except Exception as e:
         logger.error(f"Analysis failed for {session_id}: {e}")
         await manager.send_message(session_id, {
@@ -258,6 +411,110 @@ async def handle_recording(session_id: str, duration: int = 30):
         })
 
 
+def should_abort_for_quality(quality: dict, elapsed_seconds: float) -> bool:
+    """Check whether a recording should stop early because of bad signal."""
+    return (
+        settings.QUALITY_ABORT_SECONDS > 0
+        and quality["bad_seconds"] >= settings.QUALITY_ABORT_SECONDS
+        and elapsed_seconds <= settings.QUALITY_ABORT_WITHIN_SECONDS
+    )
+
+
+async def abort_recording_for_quality(
+    session_id: str,
+    recorder: AudioRecorder,
+    quality: dict
+):
+    """
+    Stop a recording whose signal stayed unusable, without analysis.
+    信号持续不可用时提前终止录制（不进行分析）
+    """
+    await recorder.stop_recording()
+    recorder.discard_spool()
+    logger.warning(
+        f"Recording aborted for {session_id}: {quality['issue']} "
+        f"for {quality['bad_seconds']}s (score {quality['score']})"
+    )
+    await manager.send_message(session_id, {
+        "type": "error",
+        "error": "poor_signal_quality",
+        "issue": quality["issue"],
+        "quality": quality,
+        "message": f"{quality['message'] or '信号质量较差'}，请调整后重新开始检测"
+    })
+
+
+# Clients allowed to tap the raw microphone stream
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+@router.websocket("/ws/capture")
+async def websocket_capture_endpoint(
+    websocket: WebSocket,
+    name: str = "local",
+    block_ms: int = 100
+):
+    """
+    Raw PCM stream from the shared capture device.
+    共享采集设备的原始PCM流
+
+    Lets other local processes (e.g. the voice assistant) use the
+    microphone while it stays open for detection recordings. The first
+    message is a JSON format header; every following message is a binary
+    block of mono S16_LE samples. When no audio arrives for 2 s an empty
+    binary message is sent as a keepalive, so a client that went away is
+    noticed and its subscription released. Only loopback clients are
+    accepted.
+    """
+    client_host = websocket.client.host if websocket.client else ""
+    if client_host not in LOOPBACK_HOSTS:
+        await websocket.close(code=1008)
+        return
+
+    service = get_capture_service()
+    reader = await asyncio.to_thread(
+        service.subscribe,
+        f"ws:{name}",
+        max_seconds=2.0
+    )
+
+    try:
+        await websocket.accept()
+        if reader is None:
+            await websocket.send_json({
+                "type": "error",
+                "error": "no_capture_device",
+                "message": "采集设备不可用"
+            })
+            await websocket.close()
+            return
+
+        block = max(1, int(service.sample_rate * min(max(block_ms, 10), 1000) / 1000))
+        await websocket.send_json({
+            "type": "format",
+            "sample_rate": service.sample_rate,
+            "channels": 1,
+            "sample_format": "S16_LE",
+            "block_frames": block
+        })
+
+        while websocket.client_state == WebSocketState.CONNECTED:
+            if not await reader.wait_for(block, timeout=2.0):
+                # Keepalive: fails (and ends the loop) once the client is gone
+                await websocket.send_bytes(b"")
+                continue
+            data = reader.read(block)
+            # Subscribers expect mono
+            mono = mix_channels(data, settings.AUDIO_CHANNEL_MIX)
+            await websocket.send_bytes(mono.astype("<i2").tobytes())
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Capture stream error for {name}: {e}")
+    finally:
+        service.unsubscribe(reader)
+
+
 # Export connection manager for use by detection API
 def get_connection_manager() -> ConnectionManager:
     """Get the global connection manager."""
@@ -32,9 +32,76 @@ class Settings(BaseSettings):
     DEFAULT_DURATION: int = 30  # seconds
     MIN_DURATION: int = 10
     MAX_DURATION: int = 60
+    AUDIO_CHANNEL_MIX: str = "mean"  # mean | best | <channel index>, before inference
+    AUDIO_BACKEND: str = "auto"  # auto | sounddevice | pyaudio | simulated
+    AUDIO_INPUT_DEVICE: Optional[str] = None  # device index or name substring
+    AUDIO_DEVICE_SAMPLE_RATE: int = 0  # device capture rate; 0 = device native rate
+    AUDIO_RING_BUFFER_SECONDS: float = 2.0  # per-subscriber capture queue bound
+    AUDIO_BANDPASS_ENABLED: bool = True  # heart-sound band-pass on captured audio
+    AUDIO_BANDPASS_LOW_HZ: float = 20.0
+    AUDIO_BANDPASS_HIGH_HZ: float = 400.0
+    AUDIO_BANDPASS_ORDER: int = 4
+    AUDIO_FRAME_RATE: float = 30.0  # waveform frames per second sent to the UI
+    AUDIO_SPOOL_ENABLED: bool = False  # write recordings to a memmapped file
+    AUDIO_SPOOL_DIR: str = "spool"
+    AUDIO_SPOOL_CHECKPOINT_SECONDS: float = 1.0
+
+    # Simulation Configuration (used when no capture device is available)
+    SIMULATOR_PRESET: str = "normal"  # see core.simulator.SIMULATOR_PRESETS
+    SIMULATOR_BPM: float = 72.0
+    SIMULATOR_SNR_DB: float = 20.0
+    SIMULATOR_SEED: Optional[int] = None
+
+    # Signal Quality Configuration
+    QUALITY_ENABLED: bool = True
+    QUALITY_WINDOW_SECONDS: float = 2.0  # analysis window, spans >= 1 heartbeat
+    QUALITY_HOP_SECONDS: float = 0.5
+    QUALITY_MIN_SCORE: float = 0.4
+    QUALITY_PROMPT_SECONDS: float = 2.0  # bad quality this long -> reposition prompt
+    QUALITY_ABORT_SECONDS: float = 6.0  # bad quality this long -> abort; 0 disables
+    QUALITY_ABORT_WITHIN_SECONDS: float = 15.0  # only abort early in the recording
+
+    # Heart Rate Segmentation Configuration
+    SEGMENTATION_ENABLED: bool = True
+    SEGMENTATION_WINDOW_SECONDS: float = 6.0  # envelope history for rate estimation
 
     # AI Model Configuration
     MODEL_PATH: str = "models/heart_sound_model.onnx"
+    MODEL_VARIANT: str = "fp32"  # fp32, int8_dynamic or int8_static (tools/quantize_model.py)
+    MODEL_INPUT_LENGTH: int = 160000  # samples per model input (10 s at 16 kHz)
+    MODEL_INPUT_FEATURES: str = "waveform"  # waveform, log_mel or mfcc
+    MODEL_EAGER_LOAD: bool = True  # load and warm up the model at startup
+    MODEL_WARMUP_RUNS: int = 2  # synthetic inferences run after loading
+
+    # ONNX Runtime Configuration
+    ORT_INTRA_OP_THREADS: int = 3  # leave one of the Pi's 4 cores for audio capture
+    ORT_INTER_OP_THREADS: int = 1
+    ORT_EXECUTION_MODE: str = "sequential"  # sequential or parallel
+    ORT_GRAPH_OPTIMIZATION: str = "all"  # disable, basic, extended or all
+    ORT_CACHE_ENABLED: bool = True  # persist the optimized graph between starts
+    ORT_CACHE_DIR: str = "models/cache"
+
+    # Windowed Inference Configuration
+    INFERENCE_WINDOW_HOP_SECONDS: float = 5.0  # hop between model windows
+    INFERENCE_MAX_WINDOWS: int = 16  # batch size cap; wider hop beyond this
+    INFERENCE_AGGREGATION: str = "quality"  # mean, max or quality (quality-weighted mean)
+    INFERENCE_BATCH_WINDOW_MS: float = 20.0  # wait for concurrent requests to batch
+    INFERENCE_MAX_BATCH: int = 4  # recordings per model call; 1 disables batching
+    INFERENCE_WORKERS: int = 1  # model calls running at once on the inference threads
+    INFERENCE_MAX_QUEUE: int = 8  # waiting requests beyond this are rejected as busy
+
+    # Result Cache Configuration (byte-identical audio reuses the stored result)
+    RESULT_CACHE_SIZE: int = 128  # results kept; 0 disables the cache
+    RESULT_CACHE_PERSIST: bool = False  # also keep results on disk across restarts
+    RESULT_CACHE_DIR: str = "cache/results"
+
+    # Feature Extraction Configuration (time-frequency model inputs)
+    FEATURE_N_FFT: int = 1024
+    FEATURE_HOP_LENGTH: int = 160  # 10 ms at 16 kHz
+    FEATURE_N_MELS: int = 40
+    FEATURE_FMIN: float = 20.0
+    FEATURE_FMAX: float = 1000.0
+    FEATURE_N_MFCC: int = 20
 
     # Supabase Configuration (optional, for cloud sync)
     SUPABASE_URL: Optional[str] = None
@@ -5,19 +5,47 @@ HeartSound Core Package
 
 Exports:
 - AudioRecorder: Audio capture class
+- AudioRingBuffer: Lock-free capture ring buffer
+- CaptureService: Shared always-open capture device
+- CaptureBackend: Pluggable capture backend (sounddevice / PyAudio)
+- HeartSoundSimulator: Synthetic heart sound generator
+- SignalQualityMonitor: Live signal quality index
+- HeartRateSegmenter: Streaming heart rate and S1/S2 segmentation
 - HeartSoundClassifier: AI inference class
 - run_inference: Async inference function
+- InvalidAudioError: Raised for recordings that cannot be analysed
+- ResultCache: LRU of results for byte-identical recordings
+- InferenceBatcher: Micro-batching queue shared across sessions
+- InferenceBusyError: Raised when the inference queue is full
+- create_session: Tuned ONNX Runtime session with optimized-model cache
+- ModelRegistry: Model hot swap and traffic split between versions
 - generate_connect_qr: QR code generation
 """
 
 from core.audio import AudioRecorder
+from core.ring_buffer import AudioRingBuffer, RingReader
+from core.audio_backends import CaptureBackend, CAPTURE_BACKENDS
+from core.capture import CaptureService, get_capture_service
+from core.simulator import (
+    HeartSoundSimulator,
+    create_simulator,
+    SIMULATOR_PRESETS
+)
+from core.quality import SignalQualityMonitor, QUALITY_ISSUES
+from core.segmentation import HeartRateSegmenter, segment_recording
 from core.inference import (
     HeartSoundClassifier,
     get_classifier,
     run_inference,
+    InvalidAudioError,
+    ResultCache,
+    get_result_cache,
     CATEGORIES,
     RISK_LEVELS
 )
+from core.batching import InferenceBatcher, InferenceBusyError, get_inference_batcher
+from core.runtime import create_session
+from core.registry import ModelRegistry, get_model_registry
 from core.qrcode import (
     generate_connect_qr,
     generate_connect_url,
@@ -27,12 +55,34 @@ from core.qrcode import (
 __all__ = [
     # Audio
     "AudioRecorder",
+    "AudioRingBuffer",
+    "RingReader",
+    "CaptureService",
+    "get_capture_service",
+    "CaptureBackend",
+    "CAPTURE_BACKENDS",
+    "HeartSoundSimulator",
+    "create_simulator",
+    "SIMULATOR_PRESETS",
+    "SignalQualityMonitor",
+    "QUALITY_ISSUES",
+    "HeartRateSegmenter",
+    "segment_recording",
     # Inference
     "HeartSoundClassifier",
     "get_classifier",
     "run_inference",
+    "InvalidAudioError",
+    "ResultCache",
+    "get_result_cache",
     "CATEGORIES",
     "RISK_LEVELS",
+    "InferenceBatcher",
+    "InferenceBusyError",
+    "get_inference_batcher",
+    "create_session",
+    "ModelRegistry",
+    "get_model_registry",
     # QR Code
     "generate_connect_qr",
     "generate_connect_url",
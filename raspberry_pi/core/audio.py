@@ -4,19 +4,32 @@ HeartSound Audio Capture Module
 心音智鉴音频采集模块
 
 This module handles real-time audio recording from the microphone,
-with support for streaming data to WebSocket clients.
+with support for streaming data to WebSocket clients. Captured chunks
+pass through a streaming heart-sound band-pass filter before they are
+stored, so level, waveform and model input all see the filtered signal.
 """
 import asyncio
+import time
 import numpy as np
 import logging
 from typing import Optional, Callable, AsyncGenerator
 from datetime import datetime, timedelta
 
 from config import settings
+from core.frame_scheduler import FrameScheduler
+from core.quality import SignalQualityMonitor
+from core.segmentation import HeartRateSegmenter
+from core.capture import get_capture_service
+from core.ring_buffer import RingReader
+from core.simulator import HeartSoundSimulator, create_simulator
+from core.spool import RecordingSpool
+from utils.dsp import StreamingBandpass
 from utils.audio_utils import (
-    audio_to_base64_frame,
-    extract_waveform_points,
-    calculate_rms
+    AudioStats,
+    mix_channels,
+    waveform_frame,
+    pcm16_to_float32,
+    float_to_pcm16
 )
 
 logger = logging.getLogger("heartsound.audio")
@@ -33,7 +46,13 @@ class AudioRecorder:
         sample_rate: int = None,
         channels: int = None,
         chunk_size: int = None,
-        duration: int = None
+        duration: int = None,
+        session_id: Optional[str] = None,
+        spool: Optional[bool] = None,
+        simulator: Optional[HeartSoundSimulator] = None,
+        bandpass: Optional[bool] = None,
+        quality: Optional[bool] = None,
+        segmentation: Optional[bool] = None
     ):
         """
         Initialize audio recorder.
@@ -43,17 +62,42 @@ class AudioRecorder:
             channels: Number of audio channels
             chunk_size: Size of each audio chunk
             duration: Recording duration (seconds)
+            session_id: Session ID, used to name the on-disk spool
+            spool: Write samples to a memory-mapped spool file instead of RAM
+            simulator: Signal source used when no capture device is available
+            bandpass: Apply the heart-sound band-pass filter (default from settings)
+            quality: Run the live signal quality monitor (default from settings)
+            segmentation: Track heart rate and S1/S2 sounds live (default from settings)
         """
         self.sample_rate = sample_rate or settings.AUDIO_SAMPLE_RATE
         self.channels = channels or settings.AUDIO_CHANNELS
         self.chunk_size = chunk_size or settings.AUDIO_CHUNK_SIZE
         self.duration = duration or settings.DEFAULT_DURATION
+        self.session_id = session_id
+        self.spool_enabled = settings.AUDIO_SPOOL_ENABLED if spool is None else spool
+        self.bandpass_enabled = settings.AUDIO_BANDPASS_ENABLED if bandpass is None else bandpass
+        self.quality_enabled = settings.QUALITY_ENABLED if quality is None else quality
+        self.segmentation_enabled = (
+            settings.SEGMENTATION_ENABLED if segmentation is None else segmentation
+        )
 
         self._is_recording = False
-        self._audio_buffer: list[np.ndarray] = []
+        # Preallocated int16 recording buffer, shaped (frames, channels)
+        self._audio_buffer = np.zeros((0, self.channels), dtype=np.int16)
+        self._write_pos = 0
+        self._spool: Optional[RecordingSpool] = None
+        self._simulator = simulator
         self._start_time: Optional[datetime] = None
-        self._pyaudio = None
-        self._stream = None
+        self._start_monotonic: Optional[float] = None
+        self.frame_stats: dict = {}
+        self._reader: Optional[RingReader] = None
+        self._bandpass: Optional[StreamingBandpass] = None
+        # Running signal statistics, updated once per chunk
+        self.stats = AudioStats(self.channels)
+        # Live signal quality index of the raw input
+        self.quality: Optional[SignalQualityMonitor] = None
+        # Live heart rate and S1/S2 markers of the filtered signal
+        self.segmenter: Optional[HeartRateSegmenter] = None
 
         logger.info(
             f"AudioRecorder initialized: {self.sample_rate}Hz, "
@@ -67,27 +111,59 @@ class AudioRecorder:
 
     @property
     def elapsed_seconds(self) -> int:
-        """Get elapsed recording time in seconds."""
-        if self._start_time is None:
-            return 0
-        delta = datetime.now() - self._start_time
-        return int(delta.total_seconds())
+        """Get elapsed recording time in seconds (from samples captured)."""
+        return int(self._write_pos / self.sample_rate)
+
+    @property
+    def elapsed_samples(self) -> int:
+        """Get number of frames captured so far."""
+        return self._write_pos
+
+    @property
+    def total_samples(self) -> int:
+        """Get number of frames that make up the full recording."""
+        return len(self._audio_buffer)
 
     @property
     def remaining_seconds(self) -> int:
         """Get remaining recording time in seconds."""
         return max(0, self.duration - self.elapsed_seconds)
 
-    def _init_pyaudio(self):
-        """Initialize PyAudio instance (lazy loading)."""
-        if self._pyaudio is None:
-            try:
-                import pyaudio
-                self._pyaudio = pyaudio.PyAudio()
-                logger.info("PyAudio initialized successfully")
-            except ImportError:
-                logger.warning("PyAudio not available, using simulation mode")
-                self._pyaudio = None
+    @property
+    def is_simulated(self) -> bool:
+        """Check if the recording uses simulated audio."""
+        return self._reader is None
+
+    @property
+    def capture_stats(self) -> dict:
+        """Get capture queue fill level and overrun counters."""
+        if self._reader is None:
+            return {"simulated": True}
+        stats = self._reader.get_stats()
+        stats["input_overflows"] = get_capture_service().input_overflows
+        return stats
+
+    def _subscribe(self):
+        """Subscribe to the shared capture device, if one is available."""
+        service = get_capture_service()
+        if (service.sample_rate, service.channels) != (self.sample_rate, self.channels):
+            logger.warning(
+                f"Recorder format {self.sample_rate}Hz/{self.channels}ch does not "
+                f"match capture device, using simulation mode"
+            )
+            return
+        self._reader = service.subscribe(
+            f"recorder:{self.session_id or id(self)}",
+            max_seconds=settings.AUDIO_RING_BUFFER_SECONDS
+        )
+
+    def _unsubscribe(self):
+        """Release the capture subscription; the device stays open."""
+        if self._reader is not None:
+            reader, self._reader = self._reader, None
+            if reader.overruns:
+                logger.warning(f"Capture fell behind during recording: {reader.get_stats()}")
+            get_capture_service().unsubscribe(reader)
 
     async def start_recording(self) -> bool:
         """
@@ -101,56 +177,76 @@ class AudioRecorder:
             logger.warning("Recording already in progress")
             return False
 
-        self._audio_buffer = []
+        # Size the whole recording up front and write chunks in place
+        total_frames = int(self.duration * self.sample_rate)
+        self.discard_spool()
+        if self.spool_enabled:
+            try:
+                self._spool = RecordingSpool.create(
+                    settings.AUDIO_SPOOL_DIR,
+                    self.session_id or datetime.now().strftime("rec_%Y%m%d_%H%M%S_%f"),
+                    total_frames,
+                    self.channels,
+                    self.sample_rate
+                )
+            except OSError as e:
+                logger.error(f"Failed to create recording spool, using memory: {e}")
+                self._spool = None
+
+        if self._spool is not None:
+            self._audio_buffer = self._spool.data
+        else:
+            self._audio_buffer = np.zeros((total_frames, self.channels), dtype=np.int16)
+        self._write_pos = 0
+        self._bandpass = self._create_bandpass()
+        self.stats.reset()
+        self.quality = (
+            SignalQualityMonitor(self.sample_rate, self.channels)
+            if self.quality_enabled else None
+        )
+        self.segmenter = (
+            HeartRateSegmenter(self.sample_rate)
+            if self.segmentation_enabled else None
+        )
         self._start_time = datetime.now()
+        self._start_monotonic = time.monotonic()
         self._is_recording = True
 
-        self._init_pyaudio()
-
-        if self._pyaudio is not None:
-            try:
-                import pyaudio
-                self._stream = self._pyaudio.open(
-                    format=pyaudio.paInt16,
-                    channels=self.channels,
-                    rate=self.sample_rate,
-                    input=True,
-                    frames_per_buffer=self.chunk_size
-                )
-                logger.info("Audio stream opened")
-            except Exception as e:
-                logger.error(f"Failed to open audio stream: {e}")
-                self._stream = None
+        self._subscribe()
 
-        logger.info("Recording started")
+        logger.info(f"Recording started ({'simulated' if self.is_simulated else 'live'})")
         return True
 
+    def _create_bandpass(self) -> Optional[StreamingBandpass]:
+        """Create a fresh filter stage for a new recording."""
+        if not self.bandpass_enabled:
+            return None
+        return StreamingBandpass(
+            self.sample_rate,
+            low_hz=settings.AUDIO_BANDPASS_LOW_HZ,
+            high_hz=settings.AUDIO_BANDPASS_HIGH_HZ,
+            order=settings.AUDIO_BANDPASS_ORDER,
+            channels=self.channels
+        )
+
     async def stop_recording(self) -> np.ndarray:
         """
         Stop audio recording and return collected data.
         停止录音并返回采集的数据
 
         Returns:
-            Complete audio data as numpy array
+            Recorded int16 PCM samples (a view into the recording buffer, or
+            a zero-copy ``np.memmap`` view in spool mode)
         """
         self._is_recording = False
+        self._unsubscribe()
 
-        if self._stream is not None:
-            try:
-                self._stream.stop_stream()
-                self._stream.close()
-            except Exception as e:
-                logger.error(f"Error closing stream: {e}")
-            self._stream = None
-
-        logger.info(f"Recording stopped, {len(self._audio_buffer)} chunks collected")
+        logger.info(f"Recording stopped, {self._write_pos} frames collected")
 
-        if not self._audio_buffer:
-            return np.array([], dtype=np.float32)
+        if self._spool is not None:
+            await asyncio.to_thread(self._spool.finalize, self._write_pos)
 
-        # Concatenate all chunks
-        audio_data = np.concatenate(self._audio_buffer)
-        return audio_data
+        return self.get_audio_data()
 
     async def read_chunk(self) -> Optional[np.ndarray]:
         """
@@ -158,66 +254,78 @@ class AudioRecorder:
         读取单个音频块
 
         Returns:
-            Audio chunk as numpy array, or None if not recording
+            Audio chunk as float32 numpy array in [-1, 1] (shaped
+            (frames, channels) for multi-channel input), or None if not recording
         """
         if not self._is_recording:
             return None
 
-        # Check if duration exceeded
-        if self.elapsed_seconds >= self.duration:
+        # The recording ends on an exact sample count
+        frames = min(self.chunk_size, len(self._audio_buffer) - self._write_pos)
+        if frames <= 0:
             return None
 
-        if self._stream is not None:
-            try:
-                # Read from actual audio stream
-                raw_data = self._stream.read(
-                    self.chunk_size,
-                    exception_on_overflow=False
-                )
-                chunk = np.frombuffer(raw_data, dtype=np.int16).astype(np.float32)
-                chunk = chunk / 32768.0  # Normalize to [-1, 1]
-            except Exception as e:
-                logger.error(f"Error reading audio: {e}")
-                chunk = self._generate_simulated_chunk()
-        else:
-            # Simulation mode - generate fake heart sound data
-            chunk = self._generate_simulated_chunk()
+        # Chunks are written straight into the preallocated recording buffer
+        dest = self._audio_buffer[self._write_pos:self._write_pos + frames]
 
-        self._audio_buffer.append(chunk)
+        if self._reader is not None:
+            # Only await data the capture thread already delivered
+            timeout = 2 * self.chunk_size / self.sample_rate + 0.5
+            if not await self._reader.wait_for(frames, timeout=timeout):
+                logger.error("Timed out waiting for audio from capture device")
+                return None
+            frames = len(self._reader.read(frames, out=dest))
+        else:
+            # Simulation mode - generate fake heart sound data in real time
+            await self._wait_for_sample_clock(self._write_pos + frames)
+            self._fill_simulated(dest)
+
+        self.stats.update_input(dest[:frames])
+        if self.quality is not None:
+            self.quality.update(dest[:frames])
+        if self._bandpass is not None:
+            # Filter in place, carrying state over from the previous chunk
+            dest[:frames] = self._bandpass.process(dest[:frames])
+        self.stats.update(dest[:frames])
+
+        self._write_pos += frames
+        if self._spool is not None:
+            self._spool.frames_written = self._write_pos
+            interval = int(settings.AUDIO_SPOOL_CHECKPOINT_SECONDS * self.sample_rate)
+            if self._spool.checkpoint_due(self._write_pos, interval):
+                # Sidecar write off the event loop that serves the frame stream
+                await asyncio.to_thread(self._spool.checkpoint, self._write_pos)
+
+        chunk = pcm16_to_float32(self._channel_view(dest[:frames]))
+        if self.segmenter is not None:
+            self.segmenter.update(mix_channels(chunk, settings.AUDIO_CHANNEL_MIX))
         return chunk
 
+    async def _wait_for_sample_clock(self, sample_index: int):
+        """Sleep until ``sample_index`` would have been captured in real time."""
+        due = self._start_monotonic + sample_index / self.sample_rate
+        delay = due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _fill_simulated(self, dest: np.ndarray):
+        """Write a simulated chunk into the recording buffer."""
+        chunk = self._generate_simulated_chunk()[:len(dest)]
+        # Same signal on every channel
+        dest[:len(chunk)] = float_to_pcm16(chunk)[:, np.newaxis]
+
     def _generate_simulated_chunk(self) -> np.ndarray:
         """
         Generate simulated heart sound chunk for testing.
         生成模拟心音数据用于测试
         """
-        t = np.linspace(0, self.chunk_size / self.sample_rate, self.chunk_size)
-
-        # Simulate heartbeat pattern with multiple frequency components
-        # S1 (lub) around 40-80 Hz, S2 (dub) around 50-100 Hz
-        elapsed = self.elapsed_seconds
-        phase = (elapsed * 1.2) % 1.0  # ~72 BPM heart rate
-
-        # Generate heartbeat-like pattern
-        s1_freq = 60  # Hz
-        s2_freq = 80  # Hz
+        if self._simulator is None:
+            self._simulator = create_simulator(self.sample_rate)
+        return self._simulator.next_block(self.chunk_size)
 
-        signal = np.zeros_like(t)
-
-        # S1 sound (first heart sound)
-        if phase < 0.15:
-            envelope = np.exp(-((t - 0.05) ** 2) / 0.001)
-            signal += 0.7 * envelope * np.sin(2 * np.pi * s1_freq * t)
-
-        # S2 sound (second heart sound)
-        elif 0.35 < phase < 0.5:
-            envelope = np.exp(-((t - 0.05) ** 2) / 0.0008)
-            signal += 0.5 * envelope * np.sin(2 * np.pi * s2_freq * t)
-
-        # Add some noise
-        signal += 0.05 * np.random.randn(len(t))
-
-        return signal.astype(np.float32)
+    def _channel_view(self, block: np.ndarray) -> np.ndarray:
+        """Flatten mono blocks; keep multi-channel blocks as (frames, channels)."""
+        return block.reshape(-1) if self.channels == 1 else block
 
     def get_audio_data(self) -> np.ndarray:
         """
@@ -225,57 +333,95 @@ class AudioRecorder:
         获取所有录制的音频数据
 
         Returns:
-            Complete audio data as numpy array
+            Recorded int16 PCM samples (a view, no copy), shaped
+            (frames, channels) for multi-channel input; float conversion and
+            channel mixing are deferred to inference preprocessing
         """
-        if not self._audio_buffer:
-            return np.array([], dtype=np.float32)
-        return np.concatenate(self._audio_buffer)
+        return self._channel_view(self._audio_buffer[:self._write_pos])
+
+    def discard_spool(self):
+        """Delete the on-disk spool once the recording is no longer needed."""
+        if self._spool is not None:
+            self._audio_buffer = np.zeros((0, self.channels), dtype=np.int16)
+            self._write_pos = 0
+            self._spool.discard()
+            self._spool = None
 
     async def stream_frames(
         self,
-        frame_interval: float = 0.033  # ~30fps
+        frame_rate: Optional[float] = None,
+        per_channel: bool = True
     ) -> AsyncGenerator[dict, None]:
         """
         Stream audio frames for WebSocket transmission.
         流式传输音频帧用于WebSocket
 
+        Frames are cut from the recording buffer on the sample clock, so
+        the UI frame rate is independent of the capture chunk size. The
+        recording ends once exactly ``duration * sample_rate`` samples
+        have been captured.
+
         Args:
-            frame_interval: Time between frames in seconds
+            frame_rate: Target UI frames per second (default AUDIO_FRAME_RATE)
+            per_channel: Include per-channel levels and waveforms for
+                multi-channel recordings
 
         Yields:
-            Frame dict with waveform and amplitude data
+            Frame dict with waveform (NumPy points) and amplitude data;
+            see utils.frame_codec for the wire formats
         """
+        scheduler = FrameScheduler(
+            self.sample_rate,
+            target_fps=frame_rate or settings.AUDIO_FRAME_RATE,
+            latency_samples=self.chunk_size
+        )
+        scheduler.start(self._start_monotonic)
+        self.frame_stats = scheduler.get_stats()
+
         while self._is_recording:
             chunk = await self.read_chunk()
+            final = chunk is None or self._write_pos >= len(self._audio_buffer)
 
-            if chunk is None:
-                break
+            for start, end in scheduler.schedule(self._write_pos, final=final):
+                delay = scheduler.delay_until_due(end)
+                if delay > 0:
+                    await asyncio.sleep(delay)
 
-            # Create frame for WebSocket
-            frame = audio_to_base64_frame(chunk, self.sample_rate)
-            frame["timestamp"] = datetime.now().isoformat()
-            frame["remaining_seconds"] = self.remaining_seconds
+                samples = pcm16_to_float32(self._channel_view(self._audio_buffer[start:end]))
 
-            yield frame
+                # Create frame for WebSocket
+                frame = waveform_frame(
+                    samples,
+                    self.sample_rate,
+                    per_channel=per_channel,
+                    channel_mix=settings.AUDIO_CHANNEL_MIX
+                )
+                frame["timestamp"] = datetime.now().isoformat()
+                frame["elapsed_seconds"] = round(end / self.sample_rate, 3)
+                frame["remaining_seconds"] = max(
+                    0, self.duration - int(end / self.sample_rate)
+                )
+
+                frame["quality"] = self.quality.report if self.quality else None
+                if self.segmenter is not None:
+                    bpm = self.segmenter.bpm
+                    frame["bpm"] = round(bpm) if bpm is not None else None
+                    frame["beats"] = self.segmenter.pop_beats()
 
-            await asyncio.sleep(frame_interval)
+                scheduler.mark_emitted()
+                self.frame_stats = scheduler.get_stats()
+                yield frame
+
+            if final:
+                break
+
+        logger.info(f"Frame streaming finished: {self.frame_stats}")
 
     def cleanup(self):
         """Clean up resources."""
-        if self._stream is not None:
-            try:
-                self._stream.stop_stream()
-                self._stream.close()
-            except Exception:
-                pass
-            self._stream = None
-
-        if self._pyaudio is not None:
-            try:
-                self._pyaudio.terminate()
-            except Exception:
-                pass
-            self._pyaudio = None
+        self._is_recording = False
+        self._unsubscribe()
+        self.discard_spool()
 
         logger.info("AudioRecorder cleaned up")
 
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Capture Backends
+心音智鉴音频采集后端
+
+Pluggable audio input backends used by the shared capture service. Each
+backend opens the input device in callback mode and hands int16 blocks
+shaped (frames, channels) to a single consumer callback.
+"""
+import logging
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger("heartsound.audio_backends")
+
+# Consumer callback: receives int16 samples shaped (frames, channels)
+BlockCallback = Callable[[np.ndarray], None]
+
+
+class CaptureBackend:
+    """
+    Base class for audio capture backends.
+    音频采集后端基类
+    """
+
+    name = "base"
+
+    def __init__(
+        self,
+        sample_rate: int,
+        channels: int,
+        block_size: int,
+        device: Optional[Union[int, str]] = None
+    ):
+        """
+        Initialize backend.
+
+        Args:
+            sample_rate: Requested sample rate (Hz)
+            channels: Number of input channels
+            block_size: Frames per callback
+            device: Input device index or name (None for system default)
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.block_size = block_size
+        self.device = device
+        self.input_overflows = 0
+        self.latency = 0.0  # seconds, as reported by the driver
+        self.device_name = "default"
+
+    def native_sample_rate(self) -> Optional[int]:
+        """
+        Query the device's native sample rate.
+        查询设备原生采样率
+
+        Returns:
+            Rate in Hz, or None if unknown
+
+        Raises:
+            ImportError: If the backend library is not installed
+        """
+        return None
+
+    def open(self, callback: BlockCallback):
+        """
+        Open the input stream and start delivering blocks.
+        打开输入流并开始回调
+
+        Raises:
+            ImportError: If the backend library is not installed
+            OSError/RuntimeError: If the device cannot be opened
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Stop and close the input stream."""
+        raise NotImplementedError
+
+    def describe(self) -> dict:
+        """Get backend parameters for logs and status endpoints."""
+        return {
+            "backend": self.name,
+            "device": self.device_name,
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "block_size": self.block_size,
+            "latency_ms": round(self.latency * 1000, 1),
+        }
+
+
+class SoundDeviceBackend(CaptureBackend):
+    """
+    sounddevice (PortAudio) backend using the NumPy callback API.
+    基于sounddevice回调/NumPy接口的采集后端
+
+    Blocks arrive as int16 arrays that are copied exactly once, into the
+    capture ring buffer.
+    """
+
+    name = "sounddevice"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stream = None
+
+    def native_sample_rate(self) -> Optional[int]:
+        import sounddevice as sd
+
+        info = sd.query_devices(self.device, kind="input")
+        return int(info["default_samplerate"])
+
+    def open(self, callback: BlockCallback):
+        import sounddevice as sd
+
+        def _callback(indata, frames, time_info, status):
+            if status.input_overflow:
+                self.input_overflows += 1
+            callback(indata)
+
+        self._stream = sd.InputStream(
+            samplerate=self.sample_rate,
+            channels=self.channels,
+            dtype="int16",
+            blocksize=self.block_size,
+            device=self.device,
+            latency="low",
+            callback=_callback
+        )
+        try:
+            self._stream.start()
+        except Exception:
+            self._stream.close()
+            self._stream = None
+            raise
+
+        self.latency = float(self._stream.latency)
+        self.block_size = self._stream.blocksize or self.block_size
+        device_info = sd.query_devices(self._stream.device)
+        self.device_name = device_info.get("name", str(self._stream.device))
+
+    def close(self):
+        if self._stream is not None:
+            try:
+                self._stream.stop()
+                self._stream.close()
+            except Exception as e:
+                logger.error(f"Error closing sounddevice stream: {e}")
+            self._stream = None
+
+
+class PyAudioBackend(CaptureBackend):
+    """
+    PyAudio backend using a stream callback.
+    基于PyAudio回调的采集后端
+    """
+
+    name = "pyaudio"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pyaudio = None
+        self._stream = None
+
+    def native_sample_rate(self) -> Optional[int]:
+        import pyaudio
+
+        pa = pyaudio.PyAudio()
+        try:
+            self._pyaudio = pa
+            device_index = self._resolve_device()
+            if device_index is None:
+                info = pa.get_default_input_device_info()
+            else:
+                info = pa.get_device_info_by_index(device_index)
+            return int(info["defaultSampleRate"])
+        finally:
+            self._pyaudio = None
+            pa.terminate()
+
+    def open(self, callback: BlockCallback):
+        import pyaudio
+
+        channels = self.channels
+
+        def _callback(in_data, frame_count, time_info, status):
+            if status & pyaudio.paInputOverflow:
+                self.input_overflows += 1
+            callback(np.frombuffer(in_data, dtype=np.int16).reshape(-1, channels))
+            return (None, pyaudio.paContinue)
+
+        self._pyaudio = pyaudio.PyAudio()
+        try:
+            device_index = self._resolve_device()
+            self._stream = self._pyaudio.open(
+                format=pyaudio.paInt16,
+                channels=self.channels,
+                rate=self.sample_rate,
+                input=True,
+                input_device_index=device_index,
+                frames_per_buffer=self.block_size,
+                stream_callback=_callback
+            )
+        except Exception:
+            self.close()
+            raise
+
+        self.latency = float(self._stream.get_input_latency())
+        if device_index is None:
+            info = self._pyaudio.get_default_input_device_info()
+        else:
+            info = self._pyaudio.get_device_info_by_index(device_index)
+        self.device_name = info.get("name", "default")
+
+    def _resolve_device(self) -> Optional[int]:
+        """Map a device name to a PyAudio device index."""
+        if self.device is None or isinstance(self.device, int):
+            return self.device
+        for index in range(self._pyaudio.get_device_count()):
+            info = self._pyaudio.get_device_info_by_index(index)
+            if self.device in info.get("name", "") and info.get("maxInputChannels", 0) > 0:
+                return index
+        raise OSError(f"Input device not found: {self.device}")
+
+    def close(self):
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception as e:
+                logger.error(f"Error closing PyAudio stream: {e}")
+            self._stream = None
+
+        if self._pyaudio is not None:
+            try:
+                self._pyaudio.terminate()
+            except Exception:
+                pass
+            self._pyaudio = None
+
+
+# Backend registry, in "auto" preference order
+CAPTURE_BACKENDS: dict[str, type[CaptureBackend]] = {
+    "sounddevice": SoundDeviceBackend,
+    "pyaudio": PyAudioBackend,
+}
+
+
+def backend_candidates(name: str) -> list[type[CaptureBackend]]:
+    """
+    Resolve a backend setting to the backend classes to try, in order.
+    根据配置解析需要尝试的采集后端
+
+    Args:
+        name: "auto", a key of CAPTURE_BACKENDS, or "simulated"
+
+    Raises:
+        ValueError: For unknown backend names
+    """
+    name = name.strip().lower()
+    if name == "auto":
+        return list(CAPTURE_BACKENDS.values())
+    if name == "simulated":
+        return []
+    if name not in CAPTURE_BACKENDS:
+        raise ValueError(f"Unknown audio backend: {name}")
+    return [CAPTURE_BACKENDS[name]]
+
+
+def parse_device(device: Optional[str]) -> Optional[Union[int, str]]:
+    """Interpret a device setting as an index when it is numeric."""
+    if device is None or device == "":
+        return None
+    return int(device) if device.isdigit() else device
@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Inference Micro-Batching
+心音智鉴推理微批处理模块
+
+Concurrent analyses (clinic mode, batch re-analysis, the manual analyze
+endpoint) are queued instead of each calling the model on its own. A
+single worker task waits for the first request, collects whatever else
+arrives within ``INFERENCE_BATCH_WINDOW_MS`` (up to
+``INFERENCE_MAX_BATCH`` requests), runs them as one batched model call
+on the dedicated inference threads and resolves every caller's future.
+A batch holding requests routed to different model versions (see
+core.registry) makes one call per version.
+
+Model calls never use the event loop's default thread pool, which the
+rest of the app shares for blocking I/O. At most ``INFERENCE_WORKERS``
+batches run at once; while they do, new requests wait in the queue and
+are picked up as larger batches. Admission is bounded: once
+``INFERENCE_MAX_QUEUE`` requests are waiting, further submissions fail
+with InferenceBusyError carrying an estimated retry delay.
+"""
+import asyncio
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+
+from config import settings
+from core.inference import HeartSoundClassifier, get_classifier
+from core.quality import SignalQualityMonitor
+from models.schemas import DetectionResult
+from utils.audio_utils import AudioStats
+
+logger = logging.getLogger("heartsound.batching")
+
+
+class InferenceBusyError(RuntimeError):
+    """
+    Raised when the inference queue is full.
+    推理队列已满时抛出
+
+    Attributes:
+        retry_after: Suggested delay before retrying, in whole seconds
+        queued: Requests waiting when this one was rejected
+    """
+
+    def __init__(self, retry_after: int, queued: int):
+        super().__init__(f"Inference queue full ({queued} waiting), retry after {retry_after}s")
+        self.retry_after = retry_after
+        self.queued = queued
+
+
+class InferenceBatcher:
+    """
+    Queue that groups concurrent inference requests into batches.
+    将并发推理请求合并为批次的队列
+    """
+
+    def __init__(
+        self,
+        classifier: Optional[HeartSoundClassifier] = None,
+        window_ms: Optional[float] = None,
+        max_batch: Optional[int] = None,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None
+    ):
+        """
+        Initialize batcher.
+
+        Args:
+            classifier: Classifier to run (default: the global classifier)
+            window_ms: How long to wait for more requests after the first
+            max_batch: Maximum requests per model call
+            workers: Inference threads, i.e. batches running at once
+            max_queue: Waiting requests admitted before rejecting as busy
+        """
+        self._classifier = classifier
+        self.window_ms = settings.INFERENCE_BATCH_WINDOW_MS if window_ms is None else window_ms
+        self.max_batch = max(1, max_batch or settings.INFERENCE_MAX_BATCH)
+        self.workers = max(1, workers or settings.INFERENCE_WORKERS)
+        self.max_queue = max(1, max_queue or settings.INFERENCE_MAX_QUEUE)
+
+        # Queue, worker and slots belong to the event loop that first submits
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running: set[asyncio.Task] = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.failed_batches = 0
+        # Admitted requests not yet handed to a model call
+        self.queued = 0
+        self.in_flight = 0
+        self.max_batch_seen = 0
+        self._batch_sizes: dict[int, int] = {}
+        self._wait_total = 0.0
+        self._run_total = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for a batch."""
+        return self.queued
+
+    def retry_after(self) -> int:
+        """Estimated seconds until the current queue has been served."""
+        batches_ahead = math.ceil((self.queued + 1) / self.max_batch)
+        rounds = math.ceil(batches_ahead / self.workers)
+        run_seconds = self._run_total / self.batches if self.batches else 0.0
+        return max(1, math.ceil(rounds * run_seconds))
+
+    async def submit(
+        self,
+        audio_data: np.ndarray,
+        stats: Optional[AudioStats] = None,
+        quality: Optional[SignalQualityMonitor] = None,
+        classifier: Optional[HeartSoundClassifier] = None
+    ) -> DetectionResult:
+        """
+        Queue one analysis and wait for its result.
+        提交一次分析并等待结果
+
+        Args:
+            audio_data: Audio data as numpy array
+            stats: Running statistics of the recording, if available
+            quality: Signal quality monitor of the recording, if available
+            classifier: Model version to run (default: the batcher's
+                classifier, else the global one when the batch runs)
+
+        Returns:
+            DetectionResult with classification results
+
+        Raises:
+            InferenceBusyError: If INFERENCE_MAX_QUEUE requests are already waiting
+        """
+        self._ensure_worker()
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise InferenceBusyError(self.retry_after(), self.queued)
+
+        future = self._loop.create_future()
+        self.requests += 1
+        self.queued += 1
+        self._queue.put_nowait(
+            (audio_data, stats, quality, future, time.monotonic(), classifier)
+        )
+        return await future
+
+    async def call(self, func: Callable, *args):
+        """
+        Run a blocking function on the inference threads (e.g. warm-up),
+        bypassing the queue.
+        在推理线程上运行阻塞函数
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self._get_executor(), func, *args
+        )
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Dedicated inference threads, created on first use."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="inference"
+            )
+        return self._executor
+
+    def _ensure_worker(self):
+        """Start the worker on the running loop if it is not running there."""
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and not self._worker.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._running = set()
+        self.queued = 0
+        self.in_flight = 0
+        self._worker = loop.create_task(self._run())
+
+    async def _collect(self) -> list[tuple]:
+        """Wait for one request, then gather more within the batch window."""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.window_ms / 1000.0
+
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        """Worker loop: collect a batch whenever an inference thread is free."""
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            self.queued -= len(batch)
+            # Callers that gave up no longer need a result
+            batch = [item for item in batch if not item[3].done()]
+            if not batch:
+                self._slots.release()
+                continue
+
+            task = self._loop.create_task(self._execute(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, batch: list[tuple]):
+        """Run one batch, then free its inference slot."""
+        started = time.monotonic()
+        self._wait_total += sum(started - item[4] for item in batch)
+        self.in_flight += len(batch)
+        try:
+            await self._resolve(batch)
+        finally:
+            self.in_flight -= len(batch)
+            self._slots.release()
+            for item in batch:
+                # Only left unresolved when cancelled by stop()
+                if not item[3].done():
+                    item[3].cancel()
+
+        self._run_total += time.monotonic() - started
+        self.batches += 1
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+        if len(batch) > 1:
+            logger.info(f"Ran {len(batch)} inference requests in one batch")
+
+    async def _resolve(self, batch: list[tuple]):
+        """Run a batch, one model call per model version it contains."""
+        # None stands for the global classifier, which is only looked up
+        # (and possibly loaded) on the inference thread
+        groups: dict[int, tuple[Optional[HeartSoundClassifier], list[tuple]]] = {}
+        for item in batch:
+            classifier = item[5] or self._classifier
+            groups.setdefault(id(classifier), (classifier, []))[1].append(item)
+        for classifier, items in groups.values():
+            await self._resolve_with(classifier, items)
+
+    @staticmethod
+    def _predict(classifier: Optional[HeartSoundClassifier], requests: list[tuple]) -> list:
+        """Inference thread job: predict a batch on the given or global model."""
+        return (classifier or get_classifier()).predict_batch(requests)
+
+    async def _resolve_with(self, classifier: Optional[HeartSoundClassifier], batch: list[tuple]):
+        """Run a batch on one model and settle its futures; retry singly if it fails."""
+        try:
+            results = await self._loop.run_in_executor(
+                self._get_executor(),
+                self._predict,
+                classifier,
+                [item[:3] for item in batch]
+            )
+        except Exception as e:
+            logger.error(f"Batched inference failed ({len(batch)} requests): {e}")
+            self.failed_batches += 1
+            if len(batch) > 1:
+                # Keep one bad recording from failing the others
+                for item in batch:
+                    await self._resolve_with(classifier, [item])
+                return
+            results = None
+            error = e
+
+        for index, item in enumerate(batch):
+            future = item[3]
+            if future.done():
+                continue
+            if results is None:
+                future.set_exception(error)
+            elif isinstance(results[index], Exception):
+                # Per-recording failure (e.g. InvalidAudioError)
+                future.set_exception(results[index])
+            else:
+                future.set_result(results[index])
+
+    async def stop(self):
+        """
+        Cancel the worker and shut the inference threads down; queued and
+        running requests fail with CancelledError.
+        """
+        if self._worker is not None and self._loop is not asyncio.get_running_loop():
+            # Worker of another (finished) event loop: nothing left to cancel
+            self._worker = None
+            self._queue = None
+            self._running = set()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        running = list(self._running)
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        if self._queue is not None:
+            while not self._queue.empty():
+                future = self._queue.get_nowait()[3]
+                if not future.done():
+                    future.cancel()
+        self.queued = 0
+        if self._executor is not None:
+            # A model call already running finishes in the background
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> dict:
+        """Get queue depth, admission and batch size metrics."""
+        served = sum(size * count for size, count in self._batch_sizes.items())
+        batches = self.batches
+        return {
+            "window_ms": self.window_ms,
+            "max_batch": self.max_batch,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "batches": batches,
+            "failed_batches": self.failed_batches,
+            "mean_batch_size": round(served / batches, 2) if batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "batch_sizes": dict(sorted(self._batch_sizes.items())),
+            "mean_queue_wait_ms": round(1000 * self._wait_total / served, 2) if served else 0.0,
+            "mean_batch_run_ms": round(1000 * self._run_total / batches, 2) if batches else 0.0,
+        }
+
+
+# Global batcher instance (lazy initialization)
+_batcher: Optional[InferenceBatcher] = None
+
+
+def get_inference_batcher() -> InferenceBatcher:
+    """
+    Get global inference batcher instance.
+    获取全局推理批处理实例
+    """
+    global _batcher
+    if _batcher is None:
+        _batcher = InferenceBatcher()
+    return _batcher
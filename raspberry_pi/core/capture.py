@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Shared Capture Service
+心音智鉴共享音频采集服务
+
+Keeps the input device open for the lifetime of the process and fans
+captured audio out to any number of subscribers (detection recorders,
+the voice assistant, level monitors). The PortAudio callback thread
+writes into one AudioRingBuffer; every subscriber reads through its own
+bounded RingReader cursor. The device itself is driven by a pluggable
+backend selected by ``AUDIO_BACKEND`` (see core.audio_backends).
+
+The device is opened at its native rate (or ``AUDIO_DEVICE_SAMPLE_RATE``)
+and converted to ``AUDIO_SAMPLE_RATE`` in the callback by a streaming
+polyphase resampler, instead of relying on the ALSA plug layer.
+"""
+import logging
+import threading
+from typing import Optional
+
+from config import settings
+from core.audio_backends import CaptureBackend, backend_candidates, parse_device
+from core.ring_buffer import AudioRingBuffer, RingReader
+from utils.dsp import StreamingResampler
+
+logger = logging.getLogger("heartsound.capture")
+
+# Ring slack beyond the longest subscriber lag, in callback blocks, so a
+# reader at its lag bound never reads the slots being written next
+RING_MARGIN_BLOCKS = 4
+
+
+class CaptureService:
+    """
+    Always-open capture device with multi-subscriber fan-out.
+    常开采集设备，支持多订阅者分发
+    """
+
+    def __init__(
+        self,
+        sample_rate: Optional[int] = None,
+        channels: Optional[int] = None,
+        block_size: Optional[int] = None,
+        buffer_seconds: Optional[float] = None,
+        backend: Optional[str] = None
+    ):
+        """
+        Initialize capture service.
+
+        Args:
+            sample_rate: Sample rate delivered to subscribers (Hz)
+            channels: Number of input channels
+            block_size: Frames per callback, at the output sample rate
+            buffer_seconds: Ring buffer length shared by all subscribers
+            backend: Backend name ("auto", "sounddevice", "pyaudio", "simulated")
+        """
+        self.sample_rate = sample_rate or settings.AUDIO_SAMPLE_RATE
+        self.channels = channels or settings.AUDIO_CHANNELS
+        self.block_size = block_size or settings.AUDIO_CHUNK_SIZE
+        self.buffer_seconds = buffer_seconds or settings.AUDIO_RING_BUFFER_SECONDS
+        self.backend_name = backend or settings.AUDIO_BACKEND
+
+        self._lock = threading.Lock()
+        self._backend: Optional[CaptureBackend] = None
+        self._ring: Optional[AudioRingBuffer] = None
+        self._resampler: Optional[StreamingResampler] = None
+        self._open_failed = False
+
+    @property
+    def is_running(self) -> bool:
+        """Check if the input device is open."""
+        return self._backend is not None
+
+    @property
+    def max_lag(self) -> int:
+        """Longest subscriber queue bound in frames (buffer_seconds)."""
+        return max(int(self.buffer_seconds * self.sample_rate), self.block_size)
+
+    @property
+    def input_overflows(self) -> int:
+        """Number of driver-reported input overflows."""
+        return self._backend.input_overflows if self._backend else 0
+
+    def start(self) -> bool:
+        """
+        Open the input device if it is not open yet.
+        打开采集设备（如尚未打开）
+
+        Returns:
+            True if a real capture device is streaming
+        """
+        with self._lock:
+            if self._backend is not None:
+                return True
+            if self._open_failed:
+                return False
+
+            capacity = self.max_lag + RING_MARGIN_BLOCKS * self.block_size
+            self._ring = AudioRingBuffer(capacity=capacity, channels=self.channels)
+
+            for backend_cls in backend_candidates(self.backend_name):
+                backend = backend_cls(
+                    self.sample_rate,
+                    self.channels,
+                    self.block_size,
+                    device=parse_device(settings.AUDIO_INPUT_DEVICE)
+                )
+                try:
+                    self._configure_rate(backend)
+                    backend.open(self._on_block)
+                except ImportError as e:
+                    logger.info(f"Capture backend {backend.name} not installed: {e}")
+                    continue
+                except Exception as e:
+                    logger.error(f"Capture backend {backend.name} failed to open device: {e}")
+                    continue
+
+                self._backend = backend
+                info = backend.describe()
+                logger.info(
+                    f"Capture device opened: backend={info['backend']}, "
+                    f"device={info['device']}, {info['sample_rate']}Hz, "
+                    f"{info['channels']}ch, block={info['block_size']} frames, "
+                    f"latency={info['latency_ms']}ms"
+                )
+                if self._resampler is not None:
+                    logger.info(
+                        f"Resampling capture {backend.sample_rate}Hz -> {self.sample_rate}Hz "
+                        f"({self._resampler.taps_per_phase} taps/phase)"
+                    )
+                return True
+
+            self._ring = None
+            self._resampler = None
+            self._open_failed = True
+            logger.warning(
+                f"⚠️ No capture backend available (AUDIO_BACKEND={self.backend_name}), "
+                f"recordings will use SIMULATED audio"
+            )
+            return False
+
+    def _configure_rate(self, backend: CaptureBackend):
+        """Pick the device rate and set up resampling to the output rate."""
+        device_rate = (
+            settings.AUDIO_DEVICE_SAMPLE_RATE
+            or backend.native_sample_rate()
+            or self.sample_rate
+        )
+        backend.sample_rate = device_rate
+        backend.block_size = max(1, round(self.block_size * device_rate / self.sample_rate))
+
+        if device_rate == self.sample_rate:
+            self._resampler = None
+        else:
+            self._resampler = StreamingResampler(device_rate, self.sample_rate, self.channels)
+
+    def _on_block(self, block):
+        """Backend callback: resample if needed and publish to subscribers."""
+        if self._resampler is not None:
+            block = self._resampler.process(block)
+        self._ring.write(block)
+
+    def subscribe(self, name: str, max_seconds: Optional[float] = None) -> Optional[RingReader]:
+        """
+        Attach a subscriber with its own bounded queue and cursor.
+        添加订阅者（独立的有界队列和读取游标）
+
+        Args:
+            name: Subscriber name, for logs and stats
+            max_seconds: Queue bound; older audio is dropped beyond this lag
+                (at most, and by default, buffer_seconds)
+
+        Returns:
+            RingReader, or None if no capture device is available
+        """
+        if not self.start():
+            return None
+        max_lag = self.max_lag
+        if max_seconds:
+            max_lag = min(int(max_seconds * self.sample_rate), max_lag)
+        reader = self._ring.add_reader(name=name, max_lag=max_lag)
+        logger.info(f"Capture subscriber added: {name}")
+        return reader
+
+    def unsubscribe(self, reader: Optional[RingReader]):
+        """Detach a subscriber; the device stays open."""
+        if reader is not None:
+            reader.close()
+            logger.info(f"Capture subscriber removed: {reader.name}")
+
+    def stop(self):
+        """Close the input device."""
+        with self._lock:
+            self._close_locked()
+            self._open_failed = False
+
+    def _close_locked(self):
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+            logger.info("Capture device closed")
+        self._ring = None
+        self._resampler = None
+
+    def get_stats(self) -> dict:
+        """Get device state and per-subscriber queue statistics."""
+        ring = self._ring
+        backend = self._backend
+        resampler = self._resampler
+        return {
+            "running": self.is_running,
+            "simulated": backend is None,
+            "backend": backend.describe() if backend else {"backend": "simulated"},
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "block_size": self.block_size,
+            "resampler": resampler.get_stats() if resampler else None,
+            "input_overflows": self.input_overflows,
+            "frames_captured": ring.frames_written if ring else 0,
+            "subscribers": [r.get_stats() for r in ring.readers] if ring else [],
+        }
+
+
+# Global capture service instance (lazy initialization)
+_capture_service: Optional[CaptureService] = None
+
+
+def get_capture_service() -> CaptureService:
+    """
+    Get global capture service instance.
+    获取全局采集服务实例
+    """
+    global _capture_service
+    if _capture_service is None:
+        _capture_service = CaptureService()
+    return _capture_service
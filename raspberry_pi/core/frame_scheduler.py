@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Frame Scheduler
+心音智鉴波形帧调度模块
+
+Decouples the UI frame rate from the capture chunk size. Frames are cut
+from the recording on a sample clock: each frame covers
+``sample_rate / target_fps`` samples, so one capture chunk can be split
+into several frames, and a backlog of frames is coalesced into one when
+the consumer falls behind.
+"""
+import time
+from typing import Optional
+
+
+class FrameScheduler:
+    """
+    Sample-clock driven UI frame scheduler.
+    基于采样时钟的波形帧调度器
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        target_fps: float = 30.0,
+        latency_samples: int = 0,
+        max_backlog_frames: int = 3
+    ):
+        """
+        Initialize scheduler.
+
+        Args:
+            sample_rate: Audio sample rate (Hz)
+            target_fps: Target UI frame rate
+            latency_samples: Display delay in samples; usually one capture
+                chunk, so frames split from a chunk are spread evenly
+            max_backlog_frames: Coalesce pending frames above this backlog
+        """
+        self.sample_rate = sample_rate
+        self.target_fps = target_fps
+        self.samples_per_frame = sample_rate / target_fps
+        self.latency = latency_samples / sample_rate
+        self.max_backlog_frames = max_backlog_frames
+
+        self._next_index = 1        # index of the next frame boundary
+        self._emitted_samples = 0   # end sample of the last emitted frame
+        self._start_time: Optional[float] = None
+        self._first_emit: Optional[float] = None
+        self._last_emit: Optional[float] = None
+        self.frames_emitted = 0
+        self.coalesced_frames = 0
+
+    def start(self, start_time: Optional[float] = None):
+        """Anchor the sample clock to a monotonic start time."""
+        self._start_time = time.monotonic() if start_time is None else start_time
+
+    def _boundary(self, index: int) -> int:
+        """Sample index of the end of frame ``index``."""
+        return int(round(index * self.samples_per_frame))
+
+    def schedule(self, samples_available: int, final: bool = False) -> list[tuple[int, int]]:
+        """
+        Cut frames from newly captured samples.
+        根据已采集的样本切分波形帧
+
+        Args:
+            samples_available: Total samples captured so far
+            final: Flush a trailing partial frame (end of recording)
+
+        Returns:
+            List of (start_sample, end_sample) ranges to emit, in order
+        """
+        frames = []
+        start = self._emitted_samples
+
+        # Number of complete frames waiting
+        end_index = self._next_index
+        while self._boundary(end_index) <= samples_available:
+            end_index += 1
+        pending = end_index - self._next_index
+
+        if pending > self.max_backlog_frames:
+            # Consumer fell behind: merge the backlog into a single frame
+            end = self._boundary(end_index - 1)
+            frames.append((start, end))
+            self.coalesced_frames += pending - 1
+            start = end
+        else:
+            for index in range(self._next_index, end_index):
+                end = self._boundary(index)
+                frames.append((start, end))
+                start = end
+
+        self._next_index = end_index
+        self._emitted_samples = start
+
+        if final and samples_available > start:
+            frames.append((start, samples_available))
+            self._emitted_samples = samples_available
+
+        return frames
+
+    def delay_until_due(self, end_sample: int) -> float:
+        """
+        Seconds to wait before the frame ending at ``end_sample`` is due.
+        距离该帧应发送时刻的等待秒数
+        """
+        if self._start_time is None:
+            self.start()
+        due = self._start_time + end_sample / self.sample_rate + self.latency
+        return max(0.0, due - time.monotonic())
+
+    def mark_emitted(self):
+        """Record that a frame was sent, for frame rate statistics."""
+        now = time.monotonic()
+        if self._first_emit is None:
+            self._first_emit = now
+        self._last_emit = now
+        self.frames_emitted += 1
+
+    @property
+    def actual_fps(self) -> float:
+        """Measured frame rate over the frames emitted so far."""
+        if self.frames_emitted < 2 or self._last_emit == self._first_emit:
+            return 0.0
+        return (self.frames_emitted - 1) / (self._last_emit - self._first_emit)
+
+    def get_stats(self) -> dict:
+        """Get target vs. actual frame rate statistics."""
+        return {
+            "target_fps": round(self.target_fps, 1),
+            "actual_fps": round(self.actual_fps, 1),
+            "frames_emitted": self.frames_emitted,
+            "coalesced_frames": self.coalesced_frames,
+            "samples_per_frame": round(self.samples_per_frame, 1),
+        }
@@ -4,16 +4,37 @@ HeartSound AI Inference Module
 心音智鉴AI推理模块
 
 This module handles heart sound classification using ONNX models.
+
+The whole recording is analysed: it is split into overlapping
+model-sized windows that run as one batched session call, and the
+per-window probabilities are aggregated into the final result.
+
+Results are cached by audio content and model, so byte-identical
+resubmissions (network retries, re-analysis, test uploads) are answered
+without preprocessing or inference.
 """
+import hashlib
 import os
+import threading
+import time
 import numpy as np
 import logging
-from typing import Optional
+from collections import OrderedDict, deque
+from typing import Optional, Union
 from pathlib import Path
 
 from config import settings
-from utils.audio_utils import preprocess_for_inference, is_audio_valid
-from models.schemas import DetectionResult, HealthAdvice
+from core.quality import SignalQualityMonitor
+from core.runtime import create_session, resolve_model_path
+from utils.audio_utils import (
+    AudioStats,
+    preprocess_windows_into,
+    window_starts,
+    is_audio_valid,
+    mix_channels
+)
+from utils.features import FeatureExtractor, FEATURE_TYPES
+from models.schemas import DetectionResult, HealthAdvice, WindowPrediction
 
 logger = logging.getLogger("heartsound.inference")
 
@@ -36,6 +57,12 @@ RISK_LEVELS = {
     "aortic_stenosis": "danger"
 }
 
+# Ways of combining per-window probabilities (INFERENCE_AGGREGATION)
+AGGREGATIONS = ("mean", "max", "quality")
+
+# Recent model calls kept per classifier for latency percentiles
+LATENCY_HISTORY = 500
+
 # Health advice for each category
 HEALTH_ADVICE_MAP = {
     "normal": HealthAdvice(
@@ -86,23 +113,102 @@ HEALTH_ADVICE_MAP = {
 }
 
 
+def aggregate_probabilities(
+    probabilities: np.ndarray,
+    mode: str = "mean",
+    weights: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Combine per-window class probabilities into one distribution.
+    合并各窗口的分类概率
+
+    Args:
+        probabilities: Array shaped (windows, classes)
+        mode: "mean", "max" (per-class maximum, renormalized) or
+            "quality" (mean weighted by ``weights``)
+        weights: Per-window quality scores for "quality"; NaN marks
+            windows without a score, which get the mean known score
+
+    Returns:
+        Probabilities shaped (classes,)
+
+    Raises:
+        ValueError: For unknown modes
+    """
+    if mode == "mean":
+        return probabilities.mean(axis=0)
+    if mode == "max":
+        peak = probabilities.max(axis=0)
+        return peak / peak.sum()
+    if mode == "quality":
+        if weights is None or np.all(np.isnan(weights)):
+            return probabilities.mean(axis=0)
+        weights = np.where(np.isnan(weights), np.nanmean(weights), weights)
+        if weights.sum() <= 0:
+            return probabilities.mean(axis=0)
+        return np.average(probabilities, axis=0, weights=weights)
+    raise ValueError(f"Unknown aggregation mode: {mode}")
+
+
+class InvalidAudioError(ValueError):
+    """
+    Raised for recordings that cannot be analysed (too short, too quiet).
+    录音无效（过短或信号过弱）时抛出
+
+    No diagnosis is made for such recordings; ``reason`` is the
+    user-facing explanation from is_audio_valid.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
 class HeartSoundClassifier:
     """
     Heart sound classification using ONNX model.
     基于ONNX模型的心音分类器
     """
 
-    def __init__(self, model_path: Optional[str] = None):
+    def __init__(self, model_path: Optional[str] = None, version: Optional[str] = None):
         """
         Initialize classifier.
 
         Args:
             model_path: Path to ONNX model file
+            version: Model version label (default MODEL_VERSION)
         """
-        self.model_path = model_path or settings.MODEL_PATH
+        self.version = version or settings.MODEL_VERSION
+        self.variant = settings.MODEL_VARIANT
+        self.model_path = model_path or resolve_model_path(settings.MODEL_PATH, self.variant)
+        self.input_length = settings.MODEL_INPUT_LENGTH
+        self.input_features = settings.MODEL_INPUT_FEATURES
+        if self.input_features not in FEATURE_TYPES:
+            raise ValueError(f"Unknown model input features: {self.input_features}")
+        self.aggregation = settings.INFERENCE_AGGREGATION
+        if self.aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation mode: {self.aggregation}")
+        # Cached STFT/mel/DCT matrices for time-frequency models
+        self._features = (
+            FeatureExtractor() if self.input_features != "waveform" else None
+        )
+        # Reusable (windows, input_length) input tensor, one per worker
+        # thread; grows to the largest batch seen and is sliced per call
+        self._buffers = threading.local()
         self._session = None
         self._input_name = None
         self._output_name = None
+        # Batch size the model was exported with (None if dynamic)
+        self._fixed_batch: Optional[int] = None
+        # Session options and optimized-model cache details
+        self.runtime_info: dict = {}
+        self.load_ms: Optional[float] = None
+        # Duration of each warm-up inference (ms)
+        self.warmup_ms: list[float] = []
+        # (duration ms, recordings) of recent predict_batch calls
+        self._latency: deque[tuple[float, int]] = deque(maxlen=LATENCY_HISTORY)
+        self.predict_calls = 0
+        self.predicted_recordings = 0
         self._model_loaded = False
 
         logger.info(f"HeartSoundClassifier initialized, model: {self.model_path}")
@@ -118,6 +224,7 @@ class HeartSoundClassifier:
         if self._model_loaded:
             return True
 
+        started = time.monotonic()
         model_file = Path(self.model_path)
 
         # Check if model file exists
@@ -128,20 +235,19 @@ class HeartSoundClassifier:
             return True
 
         try:
-            import onnxruntime as ort
-
-            # Create inference session
-            self._session = ort.InferenceSession(
-                str(model_file),
-                providers=['CPUExecutionProvider']
-            )
+            # Create tuned inference session (optimized graph cached on disk)
+            self._session, self.runtime_info = create_session(str(model_file))
 
             # Get input/output names
-            self._input_name = self._session.get_inputs()[0].name
+            model_input = self._session.get_inputs()[0]
+            self._input_name = model_input.name
             self._output_name = self._session.get_outputs()[0].name
+            batch_dim = model_input.shape[0] if model_input.shape else None
+            self._fixed_batch = batch_dim if isinstance(batch_dim, int) else None
 
             self._model_loaded = True
-            logger.info(f"Model loaded successfully: {self.model_path}")
+            self.load_ms = round(1000 * (time.monotonic() - started), 1)
+            logger.info(f"Model loaded successfully: {self.model_path} ({self.load_ms}ms)")
             return True
 
         except ImportError:
@@ -153,45 +259,146 @@ class HeartSoundClassifier:
             logger.error(f"Failed to load model: {e}")
             return False
 
-    def predict(self, audio_data: np.ndarray) -> DetectionResult:
+    def predict(
+        self,
+        audio_data: np.ndarray,
+        stats: Optional[AudioStats] = None,
+        quality: Optional[SignalQualityMonitor] = None
+    ) -> DetectionResult:
         """
         Perform prediction on audio data.
         对音频数据进行预测
 
         Args:
-            audio_data: Audio data as numpy array
+            audio_data: Audio data as numpy array, 1-D or (frames, channels);
+                multi-channel input is reduced per AUDIO_CHANNEL_MIX
+            stats: Running statistics collected while recording; used for
+                validation instead of rescanning the audio
+            quality: Signal quality monitor of the recording; its score
+                history weights the windows for "quality" aggregation
+
+        Returns:
+            DetectionResult with classification results and the
+            per-window timeline
+
+        Raises:
+            InvalidAudioError: If the recording is too short or too quiet
+        """
+        result = self.predict_batch([(audio_data, stats, quality)])[0]
+        if isinstance(result, InvalidAudioError):
+            raise result
+        return result
+
+    def predict_batch(
+        self,
+        requests: list[tuple]
+    ) -> list[Union[DetectionResult, InvalidAudioError]]:
+        """
+        Predict several recordings with one model call.
+        一次模型调用预测多段录音
+
+        The windows of all valid recordings are stacked into one batch
+        tensor, run together, and split back per recording.
+
+        Args:
+            requests: ``(audio_data, stats, quality)`` tuples, as for predict
 
         Returns:
-            DetectionResult with classification results
+            One entry per request, in order: its DetectionResult, or an
+            InvalidAudioError for a recording that cannot be analysed.
+            Results not produced by the model (simulation mode, or a
+            failed model run) have ``simulated`` set.
         """
+        started = time.monotonic()
+        results = self._predict_batch(requests)
+        self._latency.append((1000 * (time.monotonic() - started), len(requests)))
+        self.predict_calls += 1
+        self.predicted_recordings += len(requests)
+        return results
+
+    def _predict_batch(
+        self,
+        requests: list[tuple]
+    ) -> list[Union[DetectionResult, InvalidAudioError]]:
+        """Validate, window, run and aggregate a batch of recordings."""
         if not self._model_loaded:
             self.load_model()
 
-        # Validate audio
-        is_valid, reason = is_audio_valid(audio_data)
-        if not is_valid:
-            logger.warning(f"Invalid audio: {reason}")
-            # Return default "normal" result with low confidence
-            return self._create_result("normal", 50.0, self._get_default_probs())
+        results: list[Union[DetectionResult, InvalidAudioError, None]] = [None] * len(requests)
+        # (request index, mono audio, window starts, quality monitor)
+        prepared = []
+        for index, (audio_data, stats, quality) in enumerate(requests):
+            audio_data = mix_channels(audio_data, settings.AUDIO_CHANNEL_MIX)
+
+            # Validate audio
+            is_valid, reason = is_audio_valid(audio_data, stats=stats)
+            if not is_valid:
+                logger.warning(f"Invalid audio: {reason}")
+                # No diagnosis for a recording we know is unusable
+                results[index] = InvalidAudioError(reason)
+                continue
 
-        # Preprocess audio
-        processed = preprocess_for_inference(audio_data)
+            prepared.append((index, audio_data, self._window_starts(len(audio_data)), quality))
+
+        if not prepared:
+            return results
+
+        processed = self._model_input([(audio, starts) for _, audio, starts, _ in prepared])
 
         # Run inference
+        window_probs = None
         if self._session is not None:
             try:
-                outputs = self._session.run(
-                    [self._output_name],
-                    {self._input_name: processed}
-                )
-                logits = outputs[0][0]  # [batch, num_classes] -> [num_classes]
-                probabilities = self._softmax(logits)
+                window_probs = self._run_session(processed)
             except Exception as e:
                 logger.error(f"Inference failed: {e}")
-                probabilities = self._simulate_inference(audio_data)
-        else:
-            # Simulation mode
-            probabilities = self._simulate_inference(audio_data)
+
+        row = 0
+        for index, audio_data, starts, quality in prepared:
+            if window_probs is not None:
+                probs = window_probs[row:row + len(starts)]
+            else:
+                # Simulation mode
+                probs = np.stack([
+                    self._simulate_inference(audio_data[start:start + self.input_length])
+                    for start in starts
+                ])
+            row += len(starts)
+            result = self._aggregate(audio_data, starts, probs, quality)
+            result.simulated = window_probs is None
+            results[index] = result
+        return results
+
+    def build_input(self, audio_data: np.ndarray) -> np.ndarray:
+        """
+        Model input for one recording, as predict would build it.
+        构建单段录音的模型输入
+
+        Used by calibration and comparison tooling. The result is a view
+        of the reusable input tensor; copy it to keep it.
+        """
+        audio_data = mix_channels(audio_data, settings.AUDIO_CHANNEL_MIX)
+        return self._model_input([(audio_data, self._window_starts(len(audio_data)))])
+
+    def _window_starts(self, num_samples: int) -> np.ndarray:
+        """Overlapping model windows over the whole recording."""
+        return window_starts(
+            num_samples,
+            self.input_length,
+            max(1, int(settings.INFERENCE_WINDOW_HOP_SECONDS * settings.AUDIO_SAMPLE_RATE)),
+            settings.INFERENCE_MAX_WINDOWS
+        )
+
+    def _aggregate(
+        self,
+        audio_data: np.ndarray,
+        starts: np.ndarray,
+        window_probs: np.ndarray,
+        quality: Optional[SignalQualityMonitor]
+    ) -> DetectionResult:
+        """Combine one recording's window probabilities into its result."""
+        weights = self._window_quality(starts, len(audio_data), quality)
+        probabilities = aggregate_probabilities(window_probs, self.aggregation, weights)
 
         # Get prediction
         categories = list(CATEGORIES.keys())
@@ -202,9 +409,95 @@ class HeartSoundClassifier:
         category = categories[max_idx]
         confidence = float(probabilities[max_idx]) * 100
 
-        logger.info(f"Prediction: {category} ({confidence:.1f}%)")
+        logger.info(
+            f"Prediction: {category} ({confidence:.1f}%) "
+            f"from {len(starts)} windows ({self.aggregation})"
+        )
 
-        return self._create_result(category, confidence, probs_dict)
+        result = self._create_result(category, confidence, probs_dict)
+        result.windows = self._timeline(starts, len(audio_data), window_probs, weights)
+        return result
+
+    def _run_session(self, batch: np.ndarray) -> np.ndarray:
+        """Run all windows through the model; returns (windows, classes) probabilities."""
+        if self._fixed_batch is None or self._fixed_batch == len(batch):
+            logits = self._session.run([self._output_name], {self._input_name: batch})[0]
+        else:
+            # Model exported with a fixed batch size: one window per call
+            logits = np.concatenate([
+                self._session.run([self._output_name], {self._input_name: batch[i:i + 1]})[0]
+                for i in range(len(batch))
+            ])
+        return self._softmax(logits)
+
+    def _model_input(self, recordings: list[tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+        """
+        Build the batched model input from ``(audio, window starts)`` pairs:
+        normalized waveform windows shaped (windows, input_length), or
+        their log-mel / MFCC features shaped (windows, features, frames).
+        """
+        # Preprocess every window into this thread's reusable input tensor
+        total = sum(len(starts) for _, starts in recordings)
+        waveforms = self._input_tensor(total)
+        row = 0
+        for audio_data, starts in recordings:
+            preprocess_windows_into(audio_data, starts, waveforms[row:row + len(starts)])
+            row += len(starts)
+
+        if self._features is None:
+            return waveforms
+        return np.stack([self._features.extract(row, self.input_features) for row in waveforms])
+
+    def _window_quality(
+        self,
+        starts: np.ndarray,
+        num_samples: int,
+        quality: Optional[SignalQualityMonitor]
+    ) -> Optional[np.ndarray]:
+        """Mean quality score per window (NaN where none was recorded)."""
+        if quality is None:
+            return None
+        sample_rate = settings.AUDIO_SAMPLE_RATE
+        ends = np.minimum(starts + self.input_length, num_samples)
+        scores = [
+            quality.score_between(start / sample_rate, end / sample_rate)
+            for start, end in zip(starts, ends)
+        ]
+        return np.array([np.nan if score is None else score for score in scores])
+
+    def _timeline(
+        self,
+        starts: np.ndarray,
+        num_samples: int,
+        window_probs: np.ndarray,
+        weights: Optional[np.ndarray]
+    ) -> list[WindowPrediction]:
+        """Compact per-window predictions for the result."""
+        sample_rate = settings.AUDIO_SAMPLE_RATE
+        categories = list(CATEGORIES.keys())
+        timeline = []
+        for i, start in enumerate(starts):
+            top = int(np.argmax(window_probs[i]))
+            weight = None
+            if weights is not None and not np.isnan(weights[i]):
+                weight = round(float(weights[i]), 3)
+            timeline.append(WindowPrediction(
+                start_seconds=round(start / sample_rate, 2),
+                end_seconds=round(min(start + self.input_length, num_samples) / sample_rate, 2),
+                category=categories[top],
+                confidence=round(float(window_probs[i][top]) * 100, 1),
+                quality=weight
+            ))
+        return timeline
+
+    def _input_tensor(self, windows: int = 1) -> np.ndarray:
+        """Get the first ``windows`` rows of the calling thread's preallocated input tensor."""
+        tensor = getattr(self._buffers, "input", None)
+        if tensor is None or windows > len(tensor):
+            # Grow only: smaller batches reuse the leading rows
+            tensor = np.zeros((windows, self.input_length), dtype=np.float32)
+            self._buffers.input = tensor
+        return tensor[:windows]
 
     def _create_result(
         self,
@@ -227,8 +520,8 @@ class HeartSoundClassifier:
 
     def _softmax(self, x: np.ndarray) -> np.ndarray:
         """Compute softmax probabilities."""
-        exp_x = np.exp(x - np.max(x))
-        return exp_x / exp_x.sum()
+        exp_x = np.exp(x - np.max(x, axis=-1, keepdims=True))
+        return exp_x / exp_x.sum(axis=-1, keepdims=True)
 
     def _simulate_inference(self, audio_data: np.ndarray) -> np.ndarray:
         """
@@ -242,21 +535,235 @@ class HeartSoundClassifier:
         probs = np.random.dirichlet([5, 1, 1, 1, 0.5])  # Bias towards first (normal)
         return probs
 
-    def _get_default_probs(self) -> dict[str, float]:
-        """Get default probability distribution."""
-        categories = list(CATEGORIES.keys())
-        probs = [0.5, 0.15, 0.15, 0.1, 0.1]  # Default with normal bias
-        return {cat: prob for cat, prob in zip(categories, probs)}
+    def warm_up(self, runs: Optional[int] = None) -> list[float]:
+        """
+        Run inferences on synthetic input so the first patient does not
+        pay for lazy allocations and cold caches.
+        使用合成输入预热模型
+
+        Args:
+            runs: Number of warm-up inferences (default MODEL_WARMUP_RUNS)
+
+        Returns:
+            Duration of each run in milliseconds
+        """
+        if not self._model_loaded and not self.load_model():
+            return []
+
+        runs = settings.MODEL_WARMUP_RUNS if runs is None else runs
+        noise = np.random.default_rng(0).standard_normal(self.input_length).astype(np.float32)
+        starts = np.zeros(1, dtype=np.int64)
+
+        self.warmup_ms = []
+        for _ in range(runs):
+            started = time.monotonic()
+            batch = self._model_input([(noise, starts)])
+            if self._session is not None:
+                self._run_session(batch)
+            self.warmup_ms.append(round(1000 * (time.monotonic() - started), 1))
+
+        logger.info(f"Model warm-up finished: {self.warmup_ms} ms")
+        return self.warmup_ms
+
+    def get_latency_stats(self) -> dict:
+        """Get call counts and latency percentiles of recent predictions."""
+        stats = {"calls": self.predict_calls, "recordings": self.predicted_recordings}
+        samples = list(self._latency)
+        if samples:
+            durations = np.array([ms for ms, _ in samples])
+            recordings = sum(count for _, count in samples)
+            stats.update({
+                "mean_ms": round(float(durations.mean()), 2),
+                "p50_ms": round(float(np.percentile(durations, 50)), 2),
+                "p95_ms": round(float(np.percentile(durations, 95)), 2),
+                "ms_per_recording": round(float(durations.sum()) / recordings, 2),
+            })
+        return stats
+
+    def get_status(self) -> dict:
+        """Get load state, runtime details and warm-up timings."""
+        return {
+            "loaded": self._model_loaded,
+            "simulated": self._model_loaded and self._session is None,
+            "version": self.version,
+            "model_path": self.model_path,
+            "variant": self.variant,
+            "load_ms": self.load_ms,
+            "warmup_ms": self.warmup_ms,
+            "runtime": self.runtime_info,
+        }
 
     def cleanup(self):
         """Clean up resources."""
         self._session = None
         self._model_loaded = False
+        self._buffers = threading.local()
         logger.info("HeartSoundClassifier cleaned up")
 
 
-# Global classifier instance (lazy initialization)
+def model_tag(version: Optional[str] = None) -> str:
+    """Model version and settings that determine a result, for cache keys."""
+    return "/".join(str(value) for value in (
+        version or settings.MODEL_VERSION,
+        settings.MODEL_VARIANT,
+        settings.MODEL_INPUT_FEATURES,
+        settings.INFERENCE_AGGREGATION,
+        settings.INFERENCE_WINDOW_HOP_SECONDS,
+        settings.INFERENCE_MAX_WINDOWS,
+    ))
+
+
+class ResultCache:
+    """
+    Bounded LRU of detection results keyed by audio content and model.
+    按音频内容和模型缓存检测结果的LRU缓存
+
+    Keys are a BLAKE2b hash of the raw audio buffer (with its dtype and
+    shape) and the model tag. With a directory, every entry is also
+    written there as JSON, and the most recent entries are loaded back on
+    first use after a restart. Stored and returned results are copies,
+    so callers may annotate the result they get.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, directory: Optional[str] = None):
+        """
+        Initialize cache.
+
+        Args:
+            capacity: Maximum results kept; 0 disables the cache
+            directory: Persist entries here (memory only if None)
+        """
+        self.capacity = max(0, settings.RESULT_CACHE_SIZE if capacity is None else capacity)
+        self.directory = Path(directory) if directory else None
+        self._entries: OrderedDict[str, DetectionResult] = OrderedDict()
+        self._lock = threading.Lock()
+        self._loaded = self.directory is None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Check if results are cached at all."""
+        return self.capacity > 0
+
+    @staticmethod
+    def key(audio_data: np.ndarray, tag: Optional[str] = None) -> str:
+        """
+        Cache key of a recording for a model.
+        计算录音在当前模型下的缓存键
+        """
+        audio = np.ascontiguousarray(audio_data)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update((tag or model_tag()).encode())
+        digest.update(f"{audio.dtype.str}{audio.shape}".encode())
+        digest.update(audio.data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[DetectionResult]:
+        """Cached result for a key (a copy), or None."""
+        with self._lock:
+            self._load()
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return result.model_copy(deep=True)
+
+    def put(self, key: str, result: DetectionResult):
+        """Store a result, evicting the least recently used beyond capacity."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._load()
+            self._entries[key] = result.model_copy(deep=True)
+            self._entries.move_to_end(key)
+            self._write(key, result)
+            while len(self._entries) > self.capacity:
+                evicted, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                self._remove(evicted)
+
+    def clear(self):
+        """Drop every entry, including persisted ones."""
+        with self._lock:
+            self._load()
+            for key in list(self._entries):
+                self._remove(key)
+            self._entries.clear()
+
+    def _path(self, key: str) -> Path:
+        """File of a persisted entry."""
+        return self.directory / f"{key}.json"
+
+    def _load(self):
+        """Load persisted entries, newest last, on first use."""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            files = sorted(self.directory.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        except OSError as e:
+            logger.warning(f"Result cache directory unusable, keeping results in memory: {e}")
+            self.directory = None
+            return
+
+        for path in files[:max(0, len(files) - self.capacity)]:
+            path.unlink(missing_ok=True)
+        for path in files[len(files) - min(len(files), self.capacity):]:
+            try:
+                self._entries[path.stem] = DetectionResult.model_validate_json(path.read_bytes())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable cached result {path.name}: {e}")
+                path.unlink(missing_ok=True)
+        if self._entries:
+            logger.info(f"Loaded {len(self._entries)} cached results from {self.directory}")
+
+    def _write(self, key: str, result: DetectionResult):
+        """Persist an entry atomically (no-op without a directory)."""
+        if self.directory is None:
+            return
+        path = self._path(key)
+        partial = path.with_name(path.name + ".partial")
+        try:
+            partial.write_text(result.model_dump_json(), encoding="utf-8")
+            os.replace(partial, path)
+        except OSError as e:
+            logger.warning(f"Failed to persist cached result: {e}")
+
+    def _remove(self, key: str):
+        """Delete a persisted entry (no-op without a directory)."""
+        if self.directory is not None:
+            self._path(key).unlink(missing_ok=True)
+
+    def get_stats(self) -> dict:
+        """Get hit, miss and eviction counters."""
+        lookups = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "size": len(self._entries),
+            "persistent": self.directory is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global classifier instance (loaded at startup, or lazily on first use)
 _classifier: Optional[HeartSoundClassifier] = None
+_classifier_lock = threading.Lock()
+
+# Startup preload state: idle | loading | ready | failed
+_preload_state = "idle"
+
+
+# Global result cache instance (lazy initialization)
+_result_cache: Optional[ResultCache] = None
 
 
 def get_classifier() -> HeartSoundClassifier:
@@ -265,33 +772,144 @@ def get_classifier() -> HeartSoundClassifier:
     获取全局分类器实例
     """
     global _classifier
-    if _classifier is None:
-        _classifier = HeartSoundClassifier()
-        _classifier.load_model()
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = HeartSoundClassifier()
+            _classifier.load_model()
+        return _classifier
+
+
+def get_active_classifier() -> Optional[HeartSoundClassifier]:
+    """Global classifier if it has been created, without loading it."""
     return _classifier
 
 
-async def run_inference(audio_data: np.ndarray) -> DetectionResult:
+def swap_classifier(classifier: HeartSoundClassifier) -> Optional[HeartSoundClassifier]:
+    """
+    Atomically replace the global classifier (model hot swap).
+    原子替换全局分类器（模型热切换）
+
+    Requests already holding the previous classifier finish on it; its
+    session is freed once they drop their reference.
+
+    Returns:
+        The previous classifier, if any
+    """
+    global _classifier, _preload_state
+    with _classifier_lock:
+        previous, _classifier = _classifier, classifier
+    _preload_state = "ready"
+    return previous
+
+
+async def preload_classifier(warmup_runs: Optional[int] = None) -> HeartSoundClassifier:
+    """
+    Load and warm up the global classifier off the event loop.
+    在后台加载并预热全局分类器
+
+    Called from the application lifespan so the first analysis after a
+    reboot does not wait for session construction and a cold first run.
+    Runs on the inference threads, so their input buffers are warm too.
+    """
+    from core.batching import get_inference_batcher
+
+    global _preload_state
+    _preload_state = "loading"
+    batcher = get_inference_batcher()
+    try:
+        classifier = await batcher.call(get_classifier)
+        await batcher.call(classifier.warm_up, warmup_runs)
+    except Exception as e:
+        _preload_state = "failed"
+        logger.error(f"Model preload failed: {e}")
+        raise
+    _preload_state = "ready" if classifier.get_status()["loaded"] else "failed"
+    return classifier
+
+
+def get_model_status() -> dict:
+    """
+    Get readiness of the global classifier, for the health endpoint.
+    获取模型就绪状态
+    """
+    classifier = _classifier
+    status = {"state": _preload_state, "ready": False}
+    if classifier is not None:
+        status.update(classifier.get_status())
+        # Ready once loaded, unless the startup warm-up is still running
+        status["ready"] = status["loaded"] and _preload_state != "loading"
+    return status
+
+
+def release_classifier():
+    """
+    Release the global classifier's session (application shutdown).
+    释放全局分类器
+    """
+    global _classifier, _preload_state
+    with _classifier_lock:
+        if _classifier is not None:
+            _classifier.cleanup()
+            _classifier = None
+    _preload_state = "idle"
+
+
+def get_result_cache() -> ResultCache:
+    """
+    Get global result cache instance.
+    获取全局结果缓存实例
+    """
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(
+            directory=settings.RESULT_CACHE_DIR if settings.RESULT_CACHE_PERSIST else None
+        )
+    return _result_cache
+
+
+async def run_inference(
+    audio_data: np.ndarray,
+    stats: Optional[AudioStats] = None,
+    quality: Optional[SignalQualityMonitor] = None
+) -> DetectionResult:
     """
     Run inference on audio data (async wrapper).
     对音频数据运行推理（异步包装）
 
+    The model registry picks the model version (active, or a candidate
+    receiving a share of traffic). A recording already analysed by that
+    version is answered from the result cache. Others are queued on the
+    shared micro-batcher, which runs concurrent analyses together in one
+    model call on the dedicated inference threads. Simulated results are
+    not cached.
+
     Args:
         audio_data: Audio data as numpy array
+        stats: Running statistics of the recording, if available
+        quality: Signal quality monitor of the recording, if available
 
     Returns:
         DetectionResult with classification results
-    """
-    import asyncio
-
-    classifier = get_classifier()
-
-    # Run CPU-bound inference in thread pool
-    loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(
-        None,
-        classifier.predict,
-        audio_data
-    )
 
+    Raises:
+        InferenceBusyError: If the inference queue is full
+        InvalidAudioError: If the recording is too short or too quiet
+    """
+    from core.batching import get_inference_batcher
+    from core.registry import get_model_registry
+
+    version, classifier = get_model_registry().route()
+    cache = get_result_cache()
+    key = None
+    if cache.enabled:
+        key = cache.key(audio_data, model_tag(version))
+        cached = cache.get(key)
+        if cached is not None:
+            logger.info(f"Result cache hit: {cached.category} ({version}, {key[:12]})")
+            return cached
+
+    result = await get_inference_batcher().submit(audio_data, stats, quality, classifier)
+    # Only model output is worth reusing; a simulated result is random
+    if key is not None and not result.simulated:
+        cache.put(key, result)
     return result
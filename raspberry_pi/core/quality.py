@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Signal Quality Index
+心音智鉴信号质量评估模块
+
+Windowed signal-quality engine that runs during capture on the raw
+(unfiltered) microphone signal. Every hop it scores the most recent
+window for stethoscope contact, SNR, clipping, speech and friction, so a
+bad placement can be flagged within the first seconds of a recording.
+"""
+import logging
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+from config import settings
+from utils.audio_utils import mix_channels, pcm16_to_float32
+
+logger = logging.getLogger("heartsound.quality")
+
+# Frequency bands (Hz) used for the spectral checks
+HEART_BAND = (20.0, 400.0)
+SPEECH_BAND = (400.0, 3000.0)
+FRICTION_BAND = (3000.0, 8000.0)
+
+# Thresholds
+CONTACT_MIN_RMS = 0.002      # heart-band RMS below this means no contact
+CLIP_LEVEL = 0.999           # |sample| at or above this counts as clipped
+MAX_CLIPPED_RATIO = 0.01
+MAX_SPEECH_RATIO = 0.35      # share of energy in the speech band
+MAX_FRICTION_RATIO = 0.2     # share of energy above 3 kHz
+MIN_SNR_DB = 6.0
+
+# Evaluations kept in the score history (one hour at a 0.5 s hop)
+MAX_HISTORY = 7200
+
+# Issue codes, in priority order, with user prompts
+QUALITY_ISSUES = {
+    "no_contact": "未检测到心音，请将听诊头贴紧胸壁",
+    "clipping": "信号过载，请减轻按压力度",
+    "speech": "检测到说话声，请保持安静",
+    "friction": "检测到摩擦噪声，请保持听诊头静止",
+    "low_snr": "环境噪声较大，请调整听诊位置",
+}
+
+
+class SignalQualityMonitor:
+    """
+    Sliding-window signal quality index.
+    滑动窗口信号质量评估器
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        channels: int = 1,
+        window_seconds: Optional[float] = None,
+        hop_seconds: Optional[float] = None,
+        min_score: Optional[float] = None
+    ):
+        """
+        Initialize monitor.
+
+        Args:
+            sample_rate: Sample rate (Hz)
+            channels: Number of input channels (mixed down for analysis)
+            window_seconds: Analysis window; should span at least one heartbeat
+            hop_seconds: Interval between evaluations
+            min_score: Scores below this count as bad quality
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.window_size = int((window_seconds or settings.QUALITY_WINDOW_SECONDS) * sample_rate)
+        self.hop_size = int((hop_seconds or settings.QUALITY_HOP_SECONDS) * sample_rate)
+        self.min_score = settings.QUALITY_MIN_SCORE if min_score is None else min_score
+
+        # 25 ms energy frames for the SNR estimate
+        self._energy_frame = max(1, int(0.025 * sample_rate))
+
+        freqs = np.fft.rfftfreq(self.window_size, 1.0 / sample_rate)
+        self._bands = {
+            name: (freqs >= low) & (freqs < high)
+            for name, (low, high) in (
+                ("heart", HEART_BAND), ("speech", SPEECH_BAND), ("friction", FRICTION_BAND)
+            )
+        }
+        self._spectrum_window = np.hanning(self.window_size).astype(np.float32)
+        self.reset()
+
+    def reset(self):
+        """Clear the analysis window and history."""
+        self._window = np.zeros(self.window_size, dtype=np.float32)
+        self._filled = 0
+        self._since_eval = 0
+        self._samples_seen = 0
+        self.report: Optional[dict] = None
+        self.bad_seconds = 0.0
+        self.evaluations = 0
+        self.bad_evaluations = 0
+        # (at_seconds, score) of every evaluation, for per-window weighting
+        self.history: deque = deque(maxlen=MAX_HISTORY)
+
+    def update(self, raw_block: np.ndarray) -> Optional[dict]:
+        """
+        Add raw device samples; evaluate when a hop has elapsed.
+        添加原始采样，每个步长评估一次
+
+        Args:
+            raw_block: Unfiltered samples, int16 or float, flat or (frames, channels)
+
+        Returns:
+            The new quality report if one was produced, else None
+        """
+        block = mix_channels(raw_block.reshape(-1, self.channels))
+        block = pcm16_to_float32(block)[-self.window_size:]
+        n = len(block)
+        if n == 0:
+            return None
+
+        # Slide the window left and append
+        self._window[:-n] = self._window[n:]
+        self._window[-n:] = block
+        self._filled = min(self.window_size, self._filled + n)
+        self._since_eval += n
+        self._samples_seen += n
+
+        # First report once one hop of audio is in; full windows afterwards
+        hops = self._since_eval // self.hop_size
+        if hops == 0:
+            return None
+        self._since_eval -= hops * self.hop_size
+        return self._evaluate(hops * self.hop_size / self.sample_rate)
+
+    def _evaluate(self, elapsed: float) -> dict:
+        """Score the current window."""
+        data = self._window[-self._filled:]
+
+        clipped_ratio = float(np.count_nonzero(np.abs(data) >= CLIP_LEVEL)) / len(data)
+
+        # Band energy shares from one windowed FFT
+        spectrum = np.fft.rfft(data * self._spectrum_window[-len(data):], n=self.window_size)
+        power = np.square(np.abs(spectrum))
+        total = float(power[1:].sum()) or 1e-20
+        heart_power = float(power[self._bands["heart"]].sum())
+        speech_ratio = float(power[self._bands["speech"]].sum()) / total
+        friction_ratio = float(power[self._bands["friction"]].sum()) / total
+        heart_ratio = heart_power / total
+
+        # Parseval: heart-band RMS of the (Hann-windowed) signal
+        window_power = float(np.mean(np.square(self._spectrum_window[-len(data):])))
+        heart_rms = np.sqrt(2.0 * heart_power / (len(data) * self.window_size * window_power))
+
+        # SNR from short-frame energies: heart sound bursts vs. the floor between them
+        frames = len(data) // self._energy_frame
+        if frames >= 4:
+            energy = np.mean(
+                np.square(data[:frames * self._energy_frame].reshape(frames, -1)), axis=1
+            )
+            floor, peak = np.percentile(energy, [20, 95])
+            snr_db = float(10 * np.log10((peak + 1e-12) / (floor + 1e-12)))
+        else:
+            snr_db = 0.0
+
+        contact = heart_rms >= CONTACT_MIN_RMS
+        if not contact:
+            issue = "no_contact"
+        elif clipped_ratio > MAX_CLIPPED_RATIO:
+            issue = "clipping"
+        elif speech_ratio > MAX_SPEECH_RATIO:
+            issue = "speech"
+        elif friction_ratio > MAX_FRICTION_RATIO:
+            issue = "friction"
+        elif snr_db < MIN_SNR_DB:
+            issue = "low_snr"
+        else:
+            issue = None
+
+        if contact:
+            snr_score = float(np.clip((snr_db - 3.0) / 12.0, 0.0, 1.0))
+            clip_score = float(np.clip(1.0 - clipped_ratio / MAX_CLIPPED_RATIO, 0.0, 1.0))
+            score = (0.5 * snr_score + 0.5 * heart_ratio) * clip_score
+        else:
+            score = 0.0
+        if issue is not None:
+            score = min(score, self.min_score * 0.99)
+
+        good = issue is None and score >= self.min_score
+        self.evaluations += 1
+        if good:
+            self.bad_seconds = 0.0
+        else:
+            self.bad_evaluations += 1
+            self.bad_seconds += elapsed
+
+        self.history.append((self._samples_seen / self.sample_rate, score))
+        self.report = {
+            "score": round(score, 3),
+            "good": good,
+            "issue": issue,
+            "message": QUALITY_ISSUES.get(issue) if issue else None,
+            "contact": bool(contact),
+            "snr_db": round(snr_db, 1),
+            "clipped_ratio": round(clipped_ratio, 5),
+            "speech_ratio": round(speech_ratio, 3),
+            "friction_ratio": round(friction_ratio, 3),
+            "bad_seconds": round(self.bad_seconds, 2),
+            "at_seconds": round(self._samples_seen / self.sample_rate, 2),
+        }
+        return self.report
+
+    def score_between(self, start_seconds: float, end_seconds: float) -> Optional[float]:
+        """
+        Mean quality score of evaluations that ended within a time span.
+        获取时间段内的平均质量评分
+
+        Returns:
+            Mean score, or None if no evaluation falls in the span
+        """
+        scores = [score for at, score in self.history if start_seconds < at <= end_seconds]
+        return float(np.mean(scores)) if scores else None
+
+    def get_stats(self) -> dict:
+        """Get evaluation counters and the latest report."""
+        return {
+            "evaluations": self.evaluations,
+            "bad_evaluations": self.bad_evaluations,
+            "latest": self.report,
+        }
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Model Registry
+心音智鉴模型注册表
+
+Rolls out a new ONNX model without restarting the service (which would
+drop active WebSocket sessions):
+
+1. ``deploy()`` loads and warms the new model on the inference threads
+   while the active model keeps serving.
+2. With ``traffic`` below 100 the new model becomes the candidate and
+   receives that percentage of new requests next to the active model.
+   Each version reports its own latency.
+3. ``promote()`` atomically makes the candidate the active model for new
+   requests. Requests already routed to the old model finish on its
+   session, which is freed once they drop their reference.
+
+Swaps last until restart: the service starts from MODEL_PATH /
+MODEL_VERSION again.
+"""
+import asyncio
+import logging
+import random
+import threading
+from pathlib import Path
+from typing import Optional
+
+from config import settings
+from core.inference import (
+    HeartSoundClassifier,
+    get_active_classifier,
+    swap_classifier
+)
+
+logger = logging.getLogger("heartsound.registry")
+
+
+class ModelRegistry:
+    """
+    Active model, optional candidate model and traffic split between them.
+    活动模型、候选模型及流量分配
+    """
+
+    def __init__(self):
+        """Initialize registry."""
+        self._lock = threading.Lock()
+        self._candidate: Optional[HeartSoundClassifier] = None
+        # Percentage of new requests routed to the candidate
+        self.candidate_traffic = 0.0
+        self._routed: dict[str, int] = {}
+        # Last deployment: version, model_path, state (loading | ready | failed), error
+        self.deployment: dict = {"state": "idle"}
+        self._deploy_task: Optional[asyncio.Task] = None
+
+    @property
+    def active_version(self) -> str:
+        """Version serving requests not routed to the candidate."""
+        active = get_active_classifier()
+        return active.version if active is not None else settings.MODEL_VERSION
+
+    @property
+    def candidate_version(self) -> Optional[str]:
+        """Version of the candidate model, if any."""
+        candidate = self._candidate
+        return candidate.version if candidate is not None else None
+
+    @property
+    def deploying(self) -> bool:
+        """Check if a background deployment is running."""
+        return self._deploy_task is not None and not self._deploy_task.done()
+
+    def route(self) -> tuple[str, Optional[HeartSoundClassifier]]:
+        """
+        Pick the model version for a new request.
+        为新请求选择模型版本
+
+        Returns:
+            (version, classifier); classifier is None for the active
+            model if it has not been loaded yet
+        """
+        with self._lock:
+            candidate, traffic = self._candidate, self.candidate_traffic
+        if candidate is not None and random.random() * 100 < traffic:
+            classifier = candidate
+        else:
+            classifier = get_active_classifier()
+        version = classifier.version if classifier is not None else settings.MODEL_VERSION
+        with self._lock:
+            self._routed[version] = self._routed.get(version, 0) + 1
+        return version, classifier
+
+    async def deploy(
+        self,
+        model_path: str,
+        version: str,
+        traffic: float = 100.0
+    ) -> HeartSoundClassifier:
+        """
+        Load and warm a model on the inference threads, then serve it.
+        后台加载并预热新模型后上线
+
+        Args:
+            model_path: ONNX model file
+            version: Version label for the new model
+            traffic: Percentage of new requests it receives; 100 makes it
+                the active model, less keeps it as the candidate
+
+        Returns:
+            The loaded classifier
+
+        Raises:
+            ValueError: For a missing file, a deployed version or a
+                traffic share outside 0-100
+            RuntimeError: If the model cannot be loaded
+        """
+        self._validate(model_path, version, traffic)
+        from core.batching import get_inference_batcher
+
+        batcher = get_inference_batcher()
+        self.deployment = {
+            "version": version, "model_path": model_path, "state": "loading", "error": None
+        }
+        classifier = HeartSoundClassifier(model_path=model_path, version=version)
+        try:
+            loaded = await batcher.call(classifier.load_model)
+            if not loaded or classifier.get_status()["simulated"]:
+                raise RuntimeError(f"Model {model_path} could not be loaded")
+            await batcher.call(classifier.warm_up)
+        except Exception as e:
+            self.deployment.update(state="failed", error=str(e))
+            logger.error(f"Deployment of model {version} failed: {e}")
+            raise
+
+        self.deployment["state"] = "ready"
+        self.install(classifier, traffic)
+        return classifier
+
+    def start_deploy(self, model_path: str, version: str, traffic: float = 100.0):
+        """
+        Run deploy() in the background; progress is reported in get_stats().
+        在后台启动模型部署
+
+        Raises:
+            ValueError: As for deploy()
+            RuntimeError: If a deployment is already running
+        """
+        if self.deploying:
+            raise RuntimeError(f"Model {self.deployment.get('version')} is still loading")
+        self._validate(model_path, version, traffic)
+
+        async def run():
+            try:
+                await self.deploy(model_path, version, traffic)
+            except Exception:
+                pass  # Recorded in self.deployment
+
+        self._deploy_task = asyncio.get_running_loop().create_task(run())
+
+    def install(self, classifier: HeartSoundClassifier, traffic: float = 100.0):
+        """
+        Serve a loaded classifier: as the active model at 100% traffic,
+        otherwise as the candidate (replacing any previous candidate).
+        上线已加载的模型
+        """
+        if traffic >= 100:
+            with self._lock:
+                if self._candidate is classifier:
+                    self._candidate, self.candidate_traffic = None, 0.0
+            previous = swap_classifier(classifier)
+            logger.info(
+                f"Model {classifier.version} is now active"
+                + (f" (replacing {previous.version})" if previous is not None else "")
+            )
+            return
+        with self._lock:
+            self._candidate, self.candidate_traffic = classifier, float(traffic)
+        logger.info(f"Model {classifier.version} serving {traffic:g}% of traffic as candidate")
+
+    def set_traffic(self, traffic: float):
+        """
+        Change the candidate's share of new requests.
+        调整候选模型流量比例
+
+        Raises:
+            ValueError: If traffic is outside 0-100
+            RuntimeError: If there is no candidate
+        """
+        if not 0 <= traffic <= 100:
+            raise ValueError("Traffic must be between 0 and 100 percent")
+        with self._lock:
+            if self._candidate is None:
+                raise RuntimeError("No candidate model deployed")
+            self.candidate_traffic = float(traffic)
+        logger.info(f"Candidate model {self.candidate_version} traffic set to {traffic:g}%")
+
+    def promote(self) -> HeartSoundClassifier:
+        """
+        Make the candidate the active model.
+        将候选模型切换为活动模型
+
+        Raises:
+            RuntimeError: If there is no candidate
+        """
+        candidate = self._candidate
+        if candidate is None:
+            raise RuntimeError("No candidate model deployed")
+        self.install(candidate, 100.0)
+        return candidate
+
+    def discard(self) -> Optional[HeartSoundClassifier]:
+        """
+        Stop routing traffic to the candidate and drop it (rollback).
+        撤下候选模型
+        """
+        with self._lock:
+            candidate, self._candidate = self._candidate, None
+            self.candidate_traffic = 0.0
+        if candidate is not None:
+            logger.info(f"Candidate model {candidate.version} discarded")
+        return candidate
+
+    async def stop(self):
+        """Cancel a running deployment and drop the candidate (shutdown)."""
+        if self.deploying and self._deploy_task.get_loop() is asyncio.get_running_loop():
+            self._deploy_task.cancel()
+            await asyncio.gather(self._deploy_task, return_exceptions=True)
+        self._deploy_task = None
+        self.discard()
+
+    def _validate(self, model_path: str, version: str, traffic: float):
+        """Check deploy() arguments before loading anything."""
+        if not 0 <= traffic <= 100:
+            raise ValueError("Traffic must be between 0 and 100 percent")
+        if not Path(model_path).is_file():
+            raise ValueError(f"Model file not found: {model_path}")
+        if version in (self.active_version, self.candidate_version):
+            raise ValueError(f"Model version {version} is already deployed")
+
+    def _describe(
+        self,
+        classifier: Optional[HeartSoundClassifier],
+        version: str,
+        traffic: float
+    ) -> dict:
+        """Serving details and latency of one version."""
+        return {
+            "version": version,
+            "model_path": classifier.model_path if classifier is not None else None,
+            "traffic_percent": round(traffic, 2),
+            "routed": self._routed.get(version, 0),
+            "latency": classifier.get_latency_stats() if classifier is not None else {},
+        }
+
+    def get_stats(self) -> dict:
+        """Get versions served, traffic split, per-version latency and deployment state."""
+        with self._lock:
+            candidate, traffic = self._candidate, self.candidate_traffic
+        active = get_active_classifier()
+        return {
+            "active": self._describe(active, self.active_version, 100.0 - traffic),
+            "candidate": (
+                self._describe(candidate, candidate.version, traffic)
+                if candidate is not None else None
+            ),
+            "deployment": dict(self.deployment),
+        }
+
+
+# Global registry instance (lazy initialization)
+_registry: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    """
+    Get global model registry instance.
+    获取全局模型注册表实例
+    """
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
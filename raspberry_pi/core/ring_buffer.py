@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Audio Ring Buffer
+心音智鉴音频环形缓冲区
+
+Preallocated single-producer / multi-consumer ring buffer used to hand
+audio from the capture thread (PortAudio callback) to the asyncio loop
+without locks and without blocking the event loop. Every consumer owns a
+RingReader with its own cursor, so one capture stream can be fanned out
+to any number of subscribers.
+"""
+import asyncio
+import logging
+import threading
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger("heartsound.ring_buffer")
+
+
+class RingReader:
+    """
+    Independent read cursor on an AudioRingBuffer.
+    环形缓冲区的独立读取游标
+
+    Only the owning consumer advances ``_read_index``. When the reader
+    falls more than ``max_lag`` frames behind the writer, the oldest data
+    is skipped and counted as an overrun; so are frames the writer
+    overwrites while they are being copied. Keep ``max_lag`` a few blocks
+    below the ring capacity so a reader at its bound stays clear of the
+    slots being written.
+    """
+
+    def __init__(self, ring: "AudioRingBuffer", name: str = "", max_lag: Optional[int] = None):
+        """
+        Initialize reader.
+
+        Args:
+            ring: Ring buffer to read from
+            name: Subscriber name, for logs and stats
+            max_lag: Bounded queue size in frames (default: ring capacity)
+        """
+        self.name = name
+        self.max_lag = min(max_lag or ring.capacity, ring.capacity)
+        self._ring = ring
+        # New readers start at the live position
+        self._read_index = ring.frames_written
+
+        # Overrun counters (consumer fell behind the producer)
+        self.overruns = 0
+        self.dropped_frames = 0
+
+        # Event loop wake-up for async consumers
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event: Optional[asyncio.Event] = None
+
+    def available(self) -> int:
+        """Number of frames ready to be read."""
+        return min(self._ring.frames_written - self._read_index, self.max_lag)
+
+    def read(self, num_frames: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Read up to ``num_frames`` frames.
+        读取音频帧
+
+        Args:
+            num_frames: Maximum number of frames to read
+            out: Optional destination array shaped (num_frames, channels)
+
+        Returns:
+            Array shaped (frames, channels); may be shorter than requested
+        """
+        ring = self._ring
+        if out is None:
+            out = np.empty((num_frames, ring.channels), dtype=ring.dtype)
+
+        while True:
+            self._skip_overrun()
+            start = self._read_index
+            n = min(num_frames, ring.frames_written - start)
+            ring.copy_out(start, out[:n])
+
+            # Slots the producer started overwriting while we copied hold
+            # torn data: drop those frames and copy again from after them
+            torn = ring.frames_reserved - ring.capacity - start
+            if torn <= 0:
+                self._read_index = start + n
+                return out[:n]
+            self._drop(torn)
+
+    def _drop(self, lost: int):
+        """Skip ``lost`` frames and count them as an overrun."""
+        self._read_index += lost
+        self.overruns += 1
+        self.dropped_frames += lost
+        logger.warning(f"Ring buffer overrun ({self.name or 'reader'}), dropped {lost} frames")
+
+    def _skip_overrun(self):
+        """Advance the read cursor past data that exceeds the queue bound."""
+        lag = self._ring.frames_written - self._read_index
+        if lag > self.max_lag:
+            self._drop(lag - self.max_lag)
+
+    def notify(self):
+        """Wake up the async consumer (called from the producer thread)."""
+        loop, event = self._loop, self._event
+        if loop is not None and event is not None:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Event loop already closed
+                pass
+
+    async def wait_for(self, num_frames: int, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until at least ``num_frames`` frames are buffered.
+        等待缓冲区中至少有指定数量的帧
+
+        Args:
+            num_frames: Number of frames required
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if the data is available, False on timeout
+        """
+        num_frames = min(num_frames, self.max_lag)
+        if self.available() >= num_frames:
+            return True
+
+        loop = asyncio.get_running_loop()
+        if self._event is None or self._loop is not loop:
+            self._event = asyncio.Event()
+            self._loop = loop
+
+        deadline = None if timeout is None else loop.time() + timeout
+
+        while self.available() < num_frames:
+            self._event.clear()
+            # Re-check after clearing to avoid missing a wake-up
+            if self.available() >= num_frames:
+                break
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return self.available() >= num_frames
+
+        return True
+
+    def reset(self):
+        """Discard all buffered data and reset counters."""
+        self._read_index = self._ring.frames_written
+        self.overruns = 0
+        self.dropped_frames = 0
+
+    def close(self):
+        """Detach from the ring buffer."""
+        self._ring.remove_reader(self)
+
+    def get_stats(self) -> dict:
+        """Get queue fill level and overrun counters."""
+        return {
+            "name": self.name,
+            "capacity": self.max_lag,
+            "buffered_frames": self.available(),
+            "overruns": self.overruns,
+            "dropped_frames": self.dropped_frames,
+        }
+
+
+class AudioRingBuffer:
+    """
+    Lock-free ring buffer for PCM frames with per-reader cursors.
+    无锁音频环形缓冲区（支持多读者）
+
+    The producer (capture thread) only advances ``_write_index``; readers
+    only advance their own cursors. Both are monotonically increasing
+    frame counters, so each reader's backlog is simply their difference.
+    The reader list is replaced copy-on-write, so the producer can iterate
+    it without a lock; adding and removing readers (from any thread) is
+    serialized by a small lock so concurrent changes are not lost.
+
+    For single-consumer use, a default reader is attached on first use
+    and its ``read``/``available``/``wait_for`` methods are exposed
+    directly.
+    """
+
+    def __init__(self, capacity: int, channels: int = 1, dtype=np.int16):
+        """
+        Initialize ring buffer.
+
+        Args:
+            capacity: Number of frames the buffer can hold
+            channels: Number of interleaved channels per frame
+            dtype: Sample data type
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self.capacity = capacity
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        self._data = np.zeros((capacity, channels), dtype=dtype)
+        self._write_index = 0
+        # End of the write in progress; slots below it minus capacity may
+        # already be overwritten before _write_index is published
+        self._write_reserved = 0
+        self._readers: tuple[RingReader, ...] = ()
+        self._readers_lock = threading.Lock()
+        self._default: Optional[RingReader] = None
+
+    @property
+    def frames_written(self) -> int:
+        """Total number of frames written since creation."""
+        return self._write_index
+
+    @property
+    def frames_reserved(self) -> int:
+        """Frames written plus those of the write in progress."""
+        return self._write_reserved
+
+    @property
+    def readers(self) -> tuple[RingReader, ...]:
+        """Currently attached readers."""
+        return self._readers
+
+    def add_reader(self, name: str = "", max_lag: Optional[int] = None) -> RingReader:
+        """Attach a new reader positioned at the live write index."""
+        reader = RingReader(self, name=name, max_lag=max_lag)
+        with self._readers_lock:
+            self._readers = self._readers + (reader,)
+        return reader
+
+    def remove_reader(self, reader: RingReader):
+        """Detach a reader."""
+        with self._readers_lock:
+            self._readers = tuple(r for r in self._readers if r is not reader)
+
+    def write(self, block: np.ndarray) -> int:
+        """
+        Write a block of frames (called from the producer thread).
+        写入音频帧（由采集线程调用）
+
+        Args:
+            block: Samples, either flat interleaved or shaped (frames, channels)
+
+        Returns:
+            Number of frames written
+        """
+        block = block.reshape(-1, self.channels)
+        n = len(block)
+        if n == 0:
+            return 0
+
+        # Announce the slots about to be overwritten before touching them
+        self._write_reserved = self._write_index + n
+
+        if n > self.capacity:
+            # Only the newest ``capacity`` frames can be kept
+            block = block[-self.capacity:]
+            self._write_index += n - self.capacity
+            n = self.capacity
+
+        start = self._write_index % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = block[:first]
+        if first < n:
+            self._data[:n - first] = block[first:]
+
+        # Publish only after the data is in place
+        self._write_index += n
+        for reader in self._readers:
+            reader.notify()
+        return n
+
+    def copy_out(self, start_index: int, out: np.ndarray):
+        """Copy ``len(out)`` frames starting at absolute frame ``start_index``."""
+        n = len(out)
+        start = start_index % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._data[start:start + first]
+        if first < n:
+            out[first:] = self._data[:n - first]
+
+    # Single-consumer convenience API (default reader)
+
+    @property
+    def _default_reader(self) -> RingReader:
+        if self._default is None:
+            self._default = self.add_reader("default")
+            self._default._read_index = 0
+        return self._default
+
+    @property
+    def overruns(self) -> int:
+        return self._default_reader.overruns
+
+    @property
+    def dropped_frames(self) -> int:
+        return self._default_reader.dropped_frames
+
+    def available(self) -> int:
+        """Number of frames ready for the default reader."""
+        return self._default_reader.available()
+
+    def read(self, num_frames: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Read frames with the default reader."""
+        return self._default_reader.read(num_frames, out=out)
+
+    async def wait_for(self, num_frames: int, timeout: Optional[float] = None) -> bool:
+        """Wait for frames on the default reader."""
+        return await self._default_reader.wait_for(num_frames, timeout=timeout)
+
+    def reset(self):
+        """Discard data buffered for the default reader."""
+        self._default_reader.reset()
+
+    def get_stats(self) -> dict:
+        """Get buffer fill level and overrun counters."""
+        return {
+            "capacity": self.capacity,
+            "buffered_frames": self.available(),
+            "frames_written": self._write_index,
+            "overruns": self.overruns,
+            "dropped_frames": self.dropped_frames,
+            "readers": len(self._readers),
+        }
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound ONNX Runtime Session Factory
+心音智鉴ONNX Runtime会话构建模块
+
+Builds inference sessions with explicit thread, execution-mode and
+graph-optimization settings, so the model does not oversubscribe the
+Pi's cores alongside audio capture.
+
+Graph optimization is done once per model: the optimized graph is saved
+(``optimized_model_filepath``) under ``ORT_CACHE_DIR`` with a name keyed
+by the model's content hash, the onnxruntime version and the
+optimization level. Later starts load the cached graph with optimization
+disabled. Changing the model file, upgrading onnxruntime or changing the
+level all lead to a fresh cache entry. Graphs optimized at the "all"
+level may contain hardware-specific kernels, which is fine here because
+the cache lives on the device that produced it.
+"""
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from config import settings
+
+logger = logging.getLogger("heartsound.runtime")
+
+# Model variants selectable with MODEL_VARIANT (see tools/quantize_model.py)
+MODEL_VARIANTS = ("fp32", "int8_dynamic", "int8_static")
+
+# Setting value -> ort.GraphOptimizationLevel member
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+# Setting value -> ort.ExecutionMode member
+EXECUTION_MODES = {
+    "sequential": "ORT_SEQUENTIAL",
+    "parallel": "ORT_PARALLEL",
+}
+
+
+def variant_model_path(model_path: str, variant: str) -> str:
+    """
+    File name of a model variant: ``model.onnx`` -> ``model.int8_dynamic.onnx``.
+    获取模型变体的文件路径
+
+    Raises:
+        ValueError: For unknown variants
+    """
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown model variant: {variant}")
+    if variant == "fp32":
+        return model_path
+    path = Path(model_path)
+    return str(path.with_name(f"{path.stem}.{variant}{path.suffix}"))
+
+
+def resolve_model_path(model_path: str, variant: Optional[str] = None) -> str:
+    """
+    Model file to load for a variant, falling back to fp32 if the
+    variant has not been generated.
+    解析模型变体路径（变体不存在时回退到fp32）
+    """
+    variant = variant or settings.MODEL_VARIANT
+    path = variant_model_path(model_path, variant)
+    if path != model_path and not Path(path).exists() and Path(model_path).exists():
+        logger.warning(
+            f"Model variant {variant} not found at {path}, using fp32 model "
+            f"(generate it with tools/quantize_model.py)"
+        )
+        return model_path
+    return path
+
+
+def model_hash(model_path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of a model file's contents.
+    计算模型文件的SHA-256
+    """
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def optimized_model_path(
+    model_path: str,
+    ort_version: str,
+    optimization: Optional[str] = None,
+    cache_dir: Optional[str] = None
+) -> Path:
+    """
+    Cache location of the optimized graph for a model.
+    获取优化模型的缓存路径
+
+    Args:
+        model_path: Source ONNX model
+        ort_version: onnxruntime version the graph is optimized for
+        optimization: Key of GRAPH_OPTIMIZATION_LEVELS
+        cache_dir: Cache directory
+
+    Returns:
+        ``<cache_dir>/<stem>.<hash>.<level>.ort<version>.onnx``
+    """
+    optimization = optimization or settings.ORT_GRAPH_OPTIMIZATION
+    cache_dir = Path(cache_dir or settings.ORT_CACHE_DIR)
+    stem = Path(model_path).stem
+    digest = model_hash(model_path)[:16]
+    return cache_dir / f"{stem}.{digest}.{optimization}.ort{ort_version}.onnx"
+
+
+def session_options(ort, optimization: Optional[str] = None):
+    """
+    Build SessionOptions from the ORT_* settings.
+    根据配置构建SessionOptions
+
+    Args:
+        ort: The imported onnxruntime module
+        optimization: Key of GRAPH_OPTIMIZATION_LEVELS (default from settings)
+
+    Raises:
+        ValueError: For unknown optimization levels or execution modes
+    """
+    optimization = optimization or settings.ORT_GRAPH_OPTIMIZATION
+    if optimization not in GRAPH_OPTIMIZATION_LEVELS:
+        raise ValueError(f"Unknown graph optimization level: {optimization}")
+    mode = settings.ORT_EXECUTION_MODE
+    if mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode: {mode}")
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = settings.ORT_INTRA_OP_THREADS
+    options.inter_op_num_threads = settings.ORT_INTER_OP_THREADS
+    options.execution_mode = getattr(ort.ExecutionMode, EXECUTION_MODES[mode])
+    options.graph_optimization_level = getattr(
+        ort.GraphOptimizationLevel, GRAPH_OPTIMIZATION_LEVELS[optimization]
+    )
+    return options
+
+
+def create_session(model_path: str, providers: Optional[list[str]] = None):
+    """
+    Create a tuned inference session, using the optimized-model cache.
+    创建调优的推理会话（使用优化模型缓存）
+
+    Args:
+        model_path: ONNX model file
+        providers: Execution providers (default CPU)
+
+    Returns:
+        (session, info) where info records the cache path, whether it was
+        a cache hit and the load time
+
+    Raises:
+        ImportError: If onnxruntime is not installed
+    """
+    import onnxruntime as ort
+
+    providers = providers or ["CPUExecutionProvider"]
+    started = time.monotonic()
+    info = {
+        "optimization": settings.ORT_GRAPH_OPTIMIZATION,
+        "intra_op_threads": settings.ORT_INTRA_OP_THREADS,
+        "inter_op_threads": settings.ORT_INTER_OP_THREADS,
+        "execution_mode": settings.ORT_EXECUTION_MODE,
+        "optimized_model": None,
+        "cache_hit": False,
+    }
+
+    cached = None
+    if settings.ORT_CACHE_ENABLED and settings.ORT_GRAPH_OPTIMIZATION != "disable":
+        cached = optimized_model_path(model_path, ort.__version__)
+
+    session = None
+    if cached is not None and cached.exists():
+        try:
+            # Already optimized: skip graph optimization on this start
+            session = ort.InferenceSession(
+                str(cached), sess_options=session_options(ort, "disable"), providers=providers
+            )
+            info["cache_hit"] = True
+            info["optimized_model"] = str(cached)
+        except Exception as e:
+            logger.warning(f"Optimized model cache unusable, rebuilding: {e}")
+            cached.unlink(missing_ok=True)
+
+    if session is None:
+        options = session_options(ort)
+        partial = None
+        if cached is not None:
+            try:
+                cached.parent.mkdir(parents=True, exist_ok=True)
+                partial = cached.with_name(cached.name + ".partial")
+                options.optimized_model_filepath = str(partial)
+            except OSError as e:
+                logger.warning(f"Optimized model cache disabled: {e}")
+        session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+        if partial is not None and partial.exists():
+            # Publish atomically so a crash never leaves a truncated cache entry
+            os.replace(partial, cached)
+            info["optimized_model"] = str(cached)
+            logger.info(f"Optimized model cached: {cached}")
+
+    info["load_ms"] = round(1000 * (time.monotonic() - started), 1)
+    logger.info(
+        f"ONNX session ready in {info['load_ms']}ms "
+        f"(optimization={info['optimization']}, cache_hit={info['cache_hit']}, "
+        f"threads={info['intra_op_threads']}/{info['inter_op_threads']})"
+    )
+    return session, info
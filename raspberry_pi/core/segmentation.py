@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Heart Rate & S1/S2 Segmentation
+心音智鉴心率估计与S1/S2分段模块
+
+Streaming segmentation of the (band-passed) heart sound signal:
+
+1. Average Shannon energy per 10 ms bin gives a 100 Hz envelope; only
+   the last few seconds of it are kept.
+2. The autocorrelation of that envelope window gives the cardiac cycle
+   length, hence the heart rate.
+3. Envelope peaks are confirmed once their neighbourhood has been seen
+   and labelled S1 or S2 from the interval to the previous sound
+   (systole is shorter than diastole).
+
+Each chunk is processed once; state is bounded by the envelope window.
+"""
+import logging
+from collections import deque
+from typing import Optional
+
+import numpy as np
+from scipy.signal import find_peaks
+
+from config import settings
+
+logger = logging.getLogger("heartsound.segmentation")
+
+# Envelope sample rate (Hz)
+ENVELOPE_RATE = 100
+
+# Minimum spacing of heart sounds (S1 -> S2 stays above ~0.15 s even when fast)
+MIN_SOUND_SPACING = 0.12
+
+# Minimum normalized autocorrelation to trust a cycle length
+MIN_PERIODICITY = 0.2
+
+# A peak near half the winning lag at this fraction of its height is the
+# real cycle; the winner then spans two beats (octave error)
+OCTAVE_PEAK_RATIO = 0.85
+
+# Half-life (seconds) of the running amplitude peak used for normalization
+PEAK_HALF_LIFE = 2.0
+
+
+class HeartRateSegmenter:
+    """
+    Incremental heart rate estimator and S1/S2 detector.
+    增量式心率估计与S1/S2检测器
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        window_seconds: Optional[float] = None,
+        min_bpm: float = 40.0,
+        max_bpm: float = 200.0,
+        max_beats: int = 1000
+    ):
+        """
+        Initialize segmenter.
+
+        Args:
+            sample_rate: Sample rate of the input (Hz)
+            window_seconds: Envelope history used for rate estimation
+            min_bpm: Lowest heart rate searched
+            max_bpm: Highest heart rate searched
+            max_beats: Beat markers kept for the recording summary
+        """
+        self.sample_rate = sample_rate
+        self.bin_size = max(1, sample_rate // ENVELOPE_RATE)
+        self.envelope_rate = sample_rate / self.bin_size
+        window_seconds = window_seconds or settings.SEGMENTATION_WINDOW_SECONDS
+        self.window_bins = int(window_seconds * self.envelope_rate)
+
+        self._min_lag = int(60.0 / max_bpm * self.envelope_rate)
+        self._max_lag = int(np.ceil(60.0 / min_bpm * self.envelope_rate))
+        self._spacing = max(1, int(MIN_SOUND_SPACING * self.envelope_rate))
+        # Re-estimate the rate every half second of envelope
+        self._rate_interval = max(1, int(0.5 * self.envelope_rate))
+
+        self._max_beats = max_beats
+        self.reset()
+
+    def reset(self):
+        """Clear all state for a new recording."""
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._peak = 0.0
+        self._envelope = np.zeros(self.window_bins)
+        self._filled = 0
+        self._bins_total = 0
+        self._bins_since_rate = 0
+        self._confirmed_until = 0
+        self._last_beat: Optional[tuple[int, str]] = None
+        self._new_beats: list[dict] = []
+        self.beats: deque = deque(maxlen=self._max_beats)
+        self.bpm: Optional[float] = None
+        self._bpm_history: deque = deque(maxlen=240)
+
+    def update(self, block: np.ndarray):
+        """
+        Add the next mono float chunk.
+        添加下一段单声道音频
+
+        Args:
+            block: float samples in [-1, 1]
+        """
+        if len(block) == 0:
+            return
+
+        # Running peak with exponential decay, for Shannon energy normalization
+        decay = 0.5 ** (len(block) / (PEAK_HALF_LIFE * self.sample_rate))
+        chunk_peak = max(float(block.max()), -float(block.min()))
+        self._peak = max(chunk_peak, self._peak * decay)
+        if self._peak <= 0:
+            energy = np.zeros(len(block), dtype=np.float32)
+        else:
+            squared = np.square(block / self._peak, dtype=np.float32)
+            energy = -squared * np.log(squared + 1e-10)
+
+        # Average Shannon energy per envelope bin; keep the partial bin
+        samples = np.concatenate((self._pending, energy)) if len(self._pending) else energy
+        num_bins = len(samples) // self.bin_size
+        self._pending = samples[num_bins * self.bin_size:].copy()
+        if num_bins == 0:
+            return
+        bins = samples[:num_bins * self.bin_size].reshape(num_bins, self.bin_size).mean(axis=1)
+        self._append_envelope(bins)
+
+        self._detect_sounds()
+        self._bins_since_rate += num_bins
+        if self._bins_since_rate >= self._rate_interval:
+            self._bins_since_rate = 0
+            self._estimate_rate()
+
+    def _append_envelope(self, bins: np.ndarray):
+        """Append envelope bins to the bounded history."""
+        bins = bins[-self.window_bins:]
+        n = len(bins)
+        self._envelope[:-n] = self._envelope[n:]
+        self._envelope[-n:] = bins
+        self._filled = min(self.window_bins, self._filled + n)
+        self._bins_total += n
+
+    def _shortest_cycle(self, search: np.ndarray, index: int) -> int:
+        """
+        Step down from the strongest lag to half of it while a comparable
+        peak is there, so two beats are not reported as one.
+        避免自相关倍频误差（心率减半）
+        """
+        while True:
+            half = (self._min_lag + index) / 2 - self._min_lag
+            low, high = max(int(np.floor(half)) - 1, 1), int(np.ceil(half)) + 1
+            if high >= index or low > high:
+                return index
+            candidate = low + int(np.argmax(search[low:high + 1]))
+            is_peak = search[candidate - 1] <= search[candidate] >= search[candidate + 1]
+            if not is_peak or search[candidate] < OCTAVE_PEAK_RATIO * search[index]:
+                return index
+            index = candidate
+
+    def _estimate_rate(self):
+        """Estimate the cycle length from the envelope autocorrelation."""
+        envelope = self._envelope[-self._filled:]
+        if len(envelope) < 2 * self._max_lag:
+            return
+
+        centred = envelope - envelope.mean()
+        spectrum = np.fft.rfft(centred, n=2 * len(centred))
+        autocorr = np.fft.irfft(np.square(np.abs(spectrum)))[:len(centred)]
+        if autocorr[0] <= 0:
+            return
+        autocorr /= autocorr[0]
+
+        search = autocorr[self._min_lag:self._max_lag + 1]
+        index = int(np.argmax(search))
+        if search[index] < MIN_PERIODICITY:
+            return
+        index = self._shortest_cycle(search, index)
+
+        # Parabolic interpolation around the peak
+        lag = float(self._min_lag + index)
+        if 0 < index < len(search) - 1:
+            a, b, c = search[index - 1], search[index], search[index + 1]
+            denominator = a - 2 * b + c
+            if denominator != 0:
+                lag += 0.5 * (a - c) / denominator
+
+        self.bpm = 60.0 * self.envelope_rate / lag
+        self._bpm_history.append(self.bpm)
+
+    def _detect_sounds(self):
+        """Confirm envelope peaks whose neighbourhood is complete."""
+        envelope = self._envelope[-self._filled:]
+        start = self._bins_total - self._filled
+        # Peaks closer than one spacing to the end may still grow
+        limit = self._bins_total - self._spacing
+        if limit <= self._confirmed_until:
+            return
+
+        floor = float(np.median(envelope))
+        height = floor + 0.3 * (float(envelope.max()) - floor)
+        peaks, _ = find_peaks(envelope, height=height, distance=self._spacing)
+
+        for peak in peaks + start:
+            if peak < self._confirmed_until or peak >= limit:
+                continue
+            if self._last_beat is not None and peak - self._last_beat[0] < self._spacing:
+                continue
+            self._add_beat(int(peak))
+        self._confirmed_until = limit
+
+    def _add_beat(self, index: int):
+        """Label a confirmed heart sound as S1 or S2."""
+        sound = "S1"
+        if self._last_beat is not None:
+            last_index, last_sound = self._last_beat
+            interval = (index - last_index) / self.envelope_rate
+            # Systole (S1 -> S2) is shorter than half a cycle
+            max_systole = 0.5 * 60.0 / self.bpm if self.bpm else 0.45
+            if last_sound == "S1" and interval < max_systole:
+                sound = "S2"
+
+        self._last_beat = (index, sound)
+        marker = {"time": round((index + 0.5) / self.envelope_rate, 3), "sound": sound}
+        self.beats.append(marker)
+        self._new_beats.append(marker)
+
+    def pop_beats(self) -> list[dict]:
+        """Get beat markers confirmed since the last call."""
+        beats, self._new_beats = self._new_beats, []
+        return beats
+
+    def summary(self) -> dict:
+        """Get the recording-level heart rate and all beat markers."""
+        bpm = float(np.median(self._bpm_history)) if self._bpm_history else None
+        return {
+            "bpm": round(bpm, 1) if bpm is not None else None,
+            "beats": list(self.beats),
+        }
+
+
+def segment_recording(audio_data: np.ndarray, sample_rate: int, chunk_size: int = 4096) -> dict:
+    """
+    Segment a complete recording by streaming it through the segmenter.
+    对完整录音进行分段（流式处理）
+
+    Args:
+        audio_data: Mono float samples in [-1, 1]
+        sample_rate: Sample rate (Hz)
+        chunk_size: Samples per update
+
+    Returns:
+        Dict with ``bpm`` and ``beats`` (see HeartRateSegmenter.summary)
+    """
+    segmenter = HeartRateSegmenter(sample_rate)
+    for start in range(0, len(audio_data), chunk_size):
+        segmenter.update(audio_data[start:start + chunk_size])
+    return segmenter.summary()
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Signal Simulator
+心音智鉴心音信号模拟器
+
+Generates synthetic heart sounds for simulation mode and load tests.
+One cardiac cycle is rendered per preset up front; streaming output is
+then just a slice of that template at a continuous sample phase plus a
+slice of a pre-generated noise bank, so each block costs two copies.
+"""
+import logging
+from typing import Optional
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger("heartsound.simulator")
+
+# Noise bank length; long enough that repetition is not audible/visible
+NOISE_BANK_SECONDS = 2.0
+
+# Available pathology presets and their Chinese labels
+SIMULATOR_PRESETS = {
+    "normal": "正常心音",
+    "systolic_murmur": "收缩期杂音",
+    "diastolic_murmur": "舒张期杂音",
+    "s3": "第三心音(S3)",
+    "s4": "第四心音(S4)",
+    "aortic_stenosis": "主动脉狭窄",
+}
+
+
+def _tone_burst(
+    t: np.ndarray,
+    center: float,
+    width: float,
+    freq: float,
+    amplitude: float
+) -> np.ndarray:
+    """Gaussian-windowed sine burst (S1/S2/S3/S4 sounds)."""
+    envelope = np.exp(-0.5 * ((t - center) / width) ** 2)
+    return amplitude * envelope * np.sin(2 * np.pi * freq * (t - center))
+
+
+def _band_noise(
+    rng: np.random.Generator,
+    num_samples: int,
+    sample_rate: int,
+    low_hz: float,
+    high_hz: float
+) -> np.ndarray:
+    """White noise band-limited with an FFT mask (murmur texture)."""
+    spectrum = np.fft.rfft(rng.standard_normal(num_samples))
+    freqs = np.fft.rfftfreq(num_samples, 1.0 / sample_rate)
+    spectrum[(freqs < low_hz) | (freqs > high_hz)] = 0
+    noise = np.fft.irfft(spectrum, n=num_samples)
+    peak = np.abs(noise).max()
+    return noise / peak if peak > 0 else noise
+
+
+def build_cycle_template(
+    preset: str = "normal",
+    bpm: float = 72.0,
+    sample_rate: int = 16000,
+    seed: Optional[int] = None
+) -> np.ndarray:
+    """
+    Render one cardiac cycle for a preset.
+    生成单个心动周期模板
+
+    Args:
+        preset: One of SIMULATOR_PRESETS
+        bpm: Heart rate in beats per minute
+        sample_rate: Sample rate (Hz)
+        seed: Seed for murmur texture
+
+    Returns:
+        float32 array of one cycle, peak-normalized to 1.0
+    """
+    if preset not in SIMULATOR_PRESETS:
+        raise ValueError(f"Unknown simulator preset: {preset}")
+
+    rng = np.random.default_rng(seed)
+    period = 60.0 / bpm
+    n = int(round(period * sample_rate))
+    t = np.arange(n, dtype=np.float64) / sample_rate
+
+    # Systole shortens less than diastole as heart rate rises
+    s1_time = 0.05
+    s2_time = s1_time + min(0.45 * period, 0.32)
+
+    s2_amplitude = 0.3 if preset == "aortic_stenosis" else 0.6
+    signal = _tone_burst(t, s1_time, 0.012, 50.0, 1.0)
+    signal += _tone_burst(t, s2_time, 0.009, 70.0, s2_amplitude)
+
+    systole = (t > s1_time + 0.03) & (t < s2_time - 0.02)
+    diastole = (t > s2_time + 0.02) & (t < s2_time + 0.02 + 0.4 * (period - s2_time))
+
+    if preset == "systolic_murmur":
+        # Holosystolic plateau murmur
+        noise = _band_noise(rng, n, sample_rate, 100.0, 300.0)
+        signal += 0.25 * noise * systole
+
+    elif preset == "diastolic_murmur":
+        # Early diastolic decrescendo murmur
+        noise = _band_noise(rng, n, sample_rate, 100.0, 400.0)
+        start = s2_time + 0.02
+        decay = np.clip(1.0 - (t - start) / (0.4 * (period - s2_time)), 0.0, 1.0)
+        signal += 0.2 * noise * decay * diastole
+
+    elif preset == "s3":
+        # Low-pitched early diastolic filling sound
+        signal += _tone_burst(t, s2_time + 0.14, 0.015, 30.0, 0.35)
+
+    elif preset == "s4":
+        # Low-pitched presystolic atrial sound just before the next S1
+        signal += _tone_burst(t, period - 0.08, 0.015, 30.0, 0.3)
+
+    elif preset == "aortic_stenosis":
+        # Crescendo-decrescendo (diamond) ejection murmur
+        noise = _band_noise(rng, n, sample_rate, 150.0, 400.0)
+        start, end = s1_time + 0.03, s2_time - 0.02
+        mid = (start + end) / 2
+        diamond = np.clip(1.0 - np.abs(t - mid) / ((end - start) / 2), 0.0, 1.0)
+        signal += 0.45 * noise * diamond
+
+    peak = np.abs(signal).max()
+    if peak > 0:
+        signal /= peak
+    return signal.astype(np.float32)
+
+
+class HeartSoundSimulator:
+    """
+    Streaming heart sound generator.
+    流式心音信号生成器
+    """
+
+    def __init__(
+        self,
+        preset: str = "normal",
+        bpm: float = 72.0,
+        snr_db: float = 20.0,
+        sample_rate: int = 16000,
+        amplitude: float = 0.7,
+        seed: Optional[int] = None
+    ):
+        """
+        Initialize simulator.
+
+        Args:
+            preset: Pathology preset, one of SIMULATOR_PRESETS
+            bpm: Heart rate in beats per minute
+            snr_db: Signal-to-noise ratio of added white noise (dB)
+            sample_rate: Sample rate (Hz)
+            amplitude: Peak amplitude of the heart sound template
+            seed: Seed for reproducible output
+        """
+        self.preset = preset
+        self.bpm = bpm
+        self.snr_db = snr_db
+        self.sample_rate = sample_rate
+
+        rng = np.random.default_rng(seed)
+        self._template = amplitude * build_cycle_template(
+            preset, bpm, sample_rate, seed=int(rng.integers(2 ** 31))
+        )
+
+        signal_rms = float(np.sqrt(np.mean(self._template.astype(np.float64) ** 2)))
+        noise_std = signal_rms / (10 ** (snr_db / 20.0))
+        bank_size = int(NOISE_BANK_SECONDS * sample_rate) + 1
+        self._noise = (noise_std * rng.standard_normal(bank_size)).astype(np.float32)
+
+        # Continuous sample positions within the template and noise bank
+        self._phase = 0
+        self._noise_pos = 0
+
+    @property
+    def cycle_samples(self) -> int:
+        """Number of samples in one cardiac cycle."""
+        return len(self._template)
+
+    @staticmethod
+    def _copy_wrapped(source: np.ndarray, pos: int, out: np.ndarray) -> int:
+        """Copy ``len(out)`` samples from a cyclic source; return the new position."""
+        filled = 0
+        n = len(out)
+        while filled < n:
+            take = min(len(source) - pos, n - filled)
+            out[filled:filled + take] = source[pos:pos + take]
+            filled += take
+            pos = (pos + take) % len(source)
+        return pos
+
+    def next_block(self, num_samples: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Generate the next block of samples.
+        生成下一段心音采样
+
+        Args:
+            num_samples: Number of samples
+            out: Optional float32 destination array
+
+        Returns:
+            float32 array of ``num_samples`` samples
+        """
+        if out is None:
+            out = np.empty(num_samples, dtype=np.float32)
+        out = out[:num_samples]
+
+        self._phase = self._copy_wrapped(self._template, self._phase, out)
+
+        noise = np.empty(num_samples, dtype=np.float32)
+        self._noise_pos = self._copy_wrapped(self._noise, self._noise_pos, noise)
+        out += noise
+        return out
+
+    def generate(self, duration_seconds: float) -> np.ndarray:
+        """Generate a complete recording of the given duration."""
+        return self.next_block(int(duration_seconds * self.sample_rate))
+
+
+def create_simulator(
+    sample_rate: Optional[int] = None,
+    preset: Optional[str] = None,
+    bpm: Optional[float] = None,
+    snr_db: Optional[float] = None,
+    seed: Optional[int] = None
+) -> HeartSoundSimulator:
+    """
+    Create a simulator, filling unset parameters from settings.
+    创建模拟器，未指定的参数使用配置默认值
+    """
+    return HeartSoundSimulator(
+        preset=preset or settings.SIMULATOR_PRESET,
+        bpm=bpm or settings.SIMULATOR_BPM,
+        snr_db=settings.SIMULATOR_SNR_DB if snr_db is None else snr_db,
+        sample_rate=sample_rate or settings.AUDIO_SAMPLE_RATE,
+        seed=settings.SIMULATOR_SEED if seed is None else seed
+    )
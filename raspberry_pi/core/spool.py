@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Recording Spool
+心音智鉴录音落盘缓存模块
+
+Recordings in progress can be written into a memory-mapped raw PCM file
+instead of process memory. Each spool consists of:
+
+- ``<spool_id>.pcm``: int16 little-endian samples, shaped (frames, channels)
+- ``<spool_id>.json``: sidecar with format info and a checkpointed frame count
+
+Spools left behind by a crash or power loss are found at startup and
+re-analyzed.
+"""
+import os
+import re
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger("heartsound.spool")
+
+PCM_SUFFIX = ".pcm"
+META_SUFFIX = ".json"
+
+
+def _safe_spool_id(spool_id: str) -> str:
+    """Restrict spool IDs to file-name safe characters."""
+    return re.sub(r"[^A-Za-z0-9_-]", "_", spool_id)[:64] or "recording"
+
+
+class RecordingSpool:
+    """
+    Memory-mapped on-disk buffer for one recording.
+    单次录音的内存映射落盘缓存
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        spool_id: str,
+        total_frames: int,
+        channels: int,
+        sample_rate: int,
+        created_at: Optional[str] = None
+    ):
+        self.directory = Path(directory)
+        self.spool_id = _safe_spool_id(spool_id)
+        self.total_frames = total_frames
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.created_at = created_at or datetime.now().isoformat()
+        self.state = "recording"
+        self.frames_written = 0
+        self.data: Optional[np.memmap] = None
+        self._last_checkpoint = 0
+
+    @property
+    def pcm_path(self) -> Path:
+        return self.directory / f"{self.spool_id}{PCM_SUFFIX}"
+
+    @property
+    def meta_path(self) -> Path:
+        return self.directory / f"{self.spool_id}{META_SUFFIX}"
+
+    @classmethod
+    def create(
+        cls,
+        directory: str,
+        spool_id: str,
+        total_frames: int,
+        channels: int,
+        sample_rate: int
+    ) -> "RecordingSpool":
+        """
+        Create a new spool file sized for the full recording.
+        创建录音缓存文件
+
+        Returns:
+            RecordingSpool whose ``data`` is a writable memmap
+        """
+        spool = cls(Path(directory), spool_id, total_frames, channels, sample_rate)
+        spool.directory.mkdir(parents=True, exist_ok=True)
+        spool.data = np.memmap(
+            spool.pcm_path,
+            dtype="<i2",
+            mode="w+",
+            shape=(max(total_frames, 1), channels)
+        )
+        spool._write_meta()
+        logger.info(f"Recording spool created: {spool.pcm_path}")
+        return spool
+
+    @classmethod
+    def load(cls, meta_path: Path) -> "RecordingSpool":
+        """
+        Open an existing spool read-only.
+        以只读方式打开已有的录音缓存
+
+        Raises:
+            ValueError: If the sidecar or PCM file is missing or corrupt
+        """
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            spool = cls(
+                Path(meta_path).parent,
+                meta["spool_id"],
+                int(meta["total_frames"]),
+                int(meta["channels"]),
+                int(meta["sample_rate"]),
+                meta.get("created_at")
+            )
+            spool.state = meta.get("state", "recording")
+            spool.frames_written = int(meta.get("frames_written", 0))
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid spool metadata {meta_path}: {e}")
+
+        if not spool.pcm_path.exists():
+            raise ValueError(f"Spool data missing: {spool.pcm_path}")
+
+        frames_on_disk = spool.pcm_path.stat().st_size // (2 * spool.channels)
+        if frames_on_disk == 0:
+            raise ValueError(f"Spool data empty: {spool.pcm_path}")
+
+        spool.data = np.memmap(
+            spool.pcm_path,
+            dtype="<i2",
+            mode="r",
+            shape=(frames_on_disk, spool.channels)
+        )
+
+        if spool.state == "recording":
+            # The checkpoint may lag the crash; extend to the last non-silent frame
+            nonzero = np.flatnonzero(spool.data.reshape(-1))
+            if nonzero.size:
+                last_frame = int(nonzero[-1]) // spool.channels + 1
+                spool.frames_written = max(spool.frames_written, last_frame)
+
+        spool.frames_written = min(spool.frames_written, frames_on_disk)
+        return spool
+
+    def checkpoint_due(self, frames_written: int, interval_frames: int) -> bool:
+        """Check if ``interval_frames`` new frames were written since the last checkpoint."""
+        return frames_written - self._last_checkpoint >= interval_frames
+
+    def checkpoint(self, frames_written: int):
+        """
+        Record progress in the sidecar.
+        记录录制进度
+
+        Samples are not flushed here: dirty pages of the memory map
+        survive a crash of the process, and finalize() flushes them.
+        Blocking file I/O; async callers run it in a worker thread.
+
+        Args:
+            frames_written: Frames recorded so far
+        """
+        self.frames_written = frames_written
+        self._last_checkpoint = frames_written
+        self._write_meta()
+
+    def finalize(self, frames_written: int):
+        """Flush samples and mark the recording complete (blocking file I/O)."""
+        self.state = "recorded"
+        if self.data is not None:
+            self.data.flush()
+        self.checkpoint(frames_written)
+
+    def get_audio_data(self) -> np.ndarray:
+        """Get recorded samples as a zero-copy memmap view (mono flattened)."""
+        if self.data is None:
+            return np.array([], dtype=np.int16)
+        data = self.data[:self.frames_written]
+        return data.reshape(-1) if self.channels == 1 else data
+
+    def discard(self):
+        """Delete the spool files."""
+        self.data = None
+        for path in (self.pcm_path, self.meta_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"Failed to remove spool file {path}: {e}")
+
+    def _write_meta(self):
+        """Atomically write the sidecar file."""
+        meta = {
+            "spool_id": self.spool_id,
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "total_frames": self.total_frames,
+            "frames_written": self.frames_written,
+            "state": self.state,
+            "created_at": self.created_at,
+        }
+        tmp_path = self.meta_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+
+def find_orphaned_spools(directory: str) -> list[RecordingSpool]:
+    """
+    Find spools left behind by an unclean shutdown.
+    查找异常退出后遗留的录音缓存
+
+    Corrupt spools are logged and removed.
+    """
+    spool_dir = Path(directory)
+    if not spool_dir.is_dir():
+        return []
+
+    spools = []
+    for meta_path in sorted(spool_dir.glob(f"*{META_SUFFIX}")):
+        try:
+            spools.append(RecordingSpool.load(meta_path))
+        except ValueError as e:
+            logger.warning(f"Removing unrecoverable spool: {e}")
+            meta_path.unlink(missing_ok=True)
+            meta_path.with_suffix(PCM_SUFFIX).unlink(missing_ok=True)
+    return spools
@@ -4,6 +4,7 @@ HeartSound Raspberry Pi FastAPI Application
 心音智鉴树莓派后端主入口
 """
 import time
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -15,6 +16,11 @@ from config import settings
 from api.device import router as device_router
 from api.detection import router as detection_router
 from api.websocket import router as websocket_router
+from api.detection import recover_orphaned_recordings
+from core.batching import get_inference_batcher
+from core.capture import get_capture_service
+from core.inference import get_model_status, preload_classifier, release_classifier
+from core.registry import get_model_registry
 
 # Configure logging
 logging.basicConfig(
@@ -30,8 +36,31 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info(f"🚀 HeartSound API starting on {settings.HOST}:{settings.PORT}")
     logger.info(f"📱 Device ID: {settings.DEVICE_ID}")
+
+    # Keep the input device open for the whole process lifetime
+    capture_service = get_capture_service()
+    await asyncio.to_thread(capture_service.start)
+
+    # Load and warm up the model in the background; /health reports readiness
+    preload_task = None
+    if settings.MODEL_EAGER_LOAD:
+        preload_task = asyncio.create_task(preload_classifier())
+
+    recovery_task = None
+    if settings.AUDIO_SPOOL_ENABLED:
+        # Re-analyze recordings interrupted by a crash, without delaying startup
+        recovery_task = asyncio.create_task(recover_orphaned_recordings())
     yield
     # Shutdown
+    if recovery_task is not None and not recovery_task.done():
+        recovery_task.cancel()
+    if preload_task is not None:
+        # Let a running load finish before its session is released
+        await asyncio.gather(preload_task, return_exceptions=True)
+    await get_model_registry().stop()
+    await get_inference_batcher().stop()
+    release_classifier()
+    capture_service.stop()
     logger.info("👋 HeartSound API shutting down")
 
 
@@ -123,8 +152,9 @@ async def root():
 
 @app.get("/health", tags=["Root"])
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy"}
+    """Health check endpoint, with model readiness and warm-up timings"""
+    model = get_model_status()
+    return {"status": "healthy", "ready": model["ready"], "model": model}
 
 
 # ============================================================================
@@ -4,9 +4,13 @@ from models.schemas import (
     DeviceInfo,
     PingResponse,
     DeviceStatus,
+    ModelDeployRequest,
+    ModelTrafficRequest,
     ErrorResponse,
     DetectionStartRequest,
     DetectionStartResponse,
+    BeatMarker,
+    WindowPrediction,
     DetectionResult,
     DetectionResultResponse,
     HealthAdvice
@@ -16,9 +20,13 @@ __all__ = [
     "DeviceInfo",
     "PingResponse",
     "DeviceStatus",
+    "ModelDeployRequest",
+    "ModelTrafficRequest",
     "ErrorResponse",
     "DetectionStartRequest",
     "DetectionStartResponse",
+    "BeatMarker",
+    "WindowPrediction",
     "DetectionResult",
     "DetectionResultResponse",
     "HealthAdvice"
@@ -61,6 +61,21 @@ class DeviceStatus(BaseModel):
     recording_start_time: Optional[datetime] = None
 
 
+class ModelDeployRequest(BaseModel):
+    """Model hot-swap deployment request model"""
+    model_file: str = Field(..., description="模型文件名(位于模型目录中)")
+    version: str = Field(..., min_length=1, max_length=32, description="模型版本")
+    traffic: float = Field(
+        default=100.0, ge=0, le=100,
+        description="新请求分配到该模型的百分比(100为直接切换)"
+    )
+
+
+class ModelTrafficRequest(BaseModel):
+    """Candidate model traffic split request model"""
+    traffic: float = Field(..., ge=0, le=100, description="候选模型流量百分比")
+
+
 # ============================================================================
 # Error Models
 # ============================================================================
@@ -106,6 +121,21 @@ class HealthAdvice(BaseModel):
     action: str = Field(..., description="行动建议")
 
 
+class BeatMarker(BaseModel):
+    """Heart sound marker model"""
+    time: float = Field(..., ge=0, description="时间点(秒)")
+    sound: Literal["S1", "S2"] = Field(..., description="心音类型")
+
+
+class WindowPrediction(BaseModel):
+    """Per-window prediction model"""
+    start_seconds: float = Field(..., ge=0, description="窗口起始时间")
+    end_seconds: float = Field(..., ge=0, description="窗口结束时间")
+    category: str = Field(..., description="分类结果")
+    confidence: float = Field(..., ge=0, le=100, description="置信度")
+    quality: Optional[float] = Field(None, description="信号质量评分")
+
+
 class DetectionResult(BaseModel):
     """Detection result model"""
     category: str = Field(..., description="分类结果")
@@ -116,6 +146,10 @@ class DetectionResult(BaseModel):
     )
     probabilities: dict[str, float] = Field(..., description="概率分布")
     health_advice: HealthAdvice = Field(..., description="健康建议")
+    bpm: Optional[float] = Field(None, description="心率(次/分)")
+    beats: Optional[list[BeatMarker]] = Field(None, description="S1/S2心音标记")
+    windows: Optional[list[WindowPrediction]] = Field(None, description="分段分析时间线")
+    simulated: bool = Field(False, description="模拟结果(未经模型推理)")
 
 
 class DetectionResultResponse(BaseModel):
@@ -0,0 +1,702 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Audio Pipeline Tests
+心音智鉴音频采集链路测试用例
+"""
+import asyncio
+import json
+import threading
+
+import numpy as np
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from core.audio import AudioRecorder
+from core.audio_backends import (
+    CaptureBackend, PyAudioBackend, SoundDeviceBackend, backend_candidates, parse_device
+)
+from core.capture import CaptureService
+from core.frame_scheduler import FrameScheduler
+from core.quality import SignalQualityMonitor
+from core.segmentation import HeartRateSegmenter, segment_recording
+from core.ring_buffer import AudioRingBuffer
+from core.simulator import HeartSoundSimulator, SIMULATOR_PRESETS
+from core.spool import RecordingSpool, find_orphaned_spools
+from utils.audio_utils import (
+    AudioStats,
+    audio_to_base64_frame,
+    calculate_rms,
+    channel_rms,
+    extract_waveform_batch,
+    extract_waveform_points,
+    float_to_pcm16,
+    is_audio_valid,
+    mix_channels
+)
+from utils.dsp import StreamingBandpass
+
+
+class TestAudioRingBuffer:
+    """Tests for the capture ring buffer."""
+
+    def test_write_read_wraparound(self):
+        """Test data survives wrapping around the end of the buffer."""
+        ring = AudioRingBuffer(capacity=8)
+        ring.write(np.arange(6, dtype=np.int16))
+        assert ring.read(4).ravel().tolist() == [0, 1, 2, 3]
+
+        ring.write(np.arange(6, 12, dtype=np.int16))
+        assert ring.available() == 8
+        assert ring.read(8).ravel().tolist() == list(range(4, 12))
+        assert ring.overruns == 0
+
+    def test_overrun_counts_dropped_frames(self):
+        """Test a lagging reader skips overwritten data and counts it."""
+        ring = AudioRingBuffer(capacity=4)
+        ring.write(np.arange(10, dtype=np.int16))
+
+        data = ring.read(4)
+        assert data.ravel().tolist() == [6, 7, 8, 9]
+        assert ring.overruns == 1
+        assert ring.dropped_frames == 6
+
+    def test_frames_lapped_during_read_are_not_returned(self):
+        """Test frames the producer overwrites mid-copy are dropped and re-read."""
+        ring = AudioRingBuffer(capacity=8)
+        reader = ring.add_reader("lagging")
+        ring.write(np.arange(8, dtype=np.int16))
+        copy_out = ring.copy_out
+
+        def lapped_copy(start_index, out):
+            # Producer overwrites the three oldest slots while we copy
+            ring.copy_out = copy_out
+            ring.write(np.arange(100, 103, dtype=np.int16))
+            copy_out(start_index, out)
+
+        ring.copy_out = lapped_copy
+        out = np.zeros((8, 1), dtype=np.int16)
+        data = reader.read(8, out=out)
+
+        assert data.ravel().tolist() == [3, 4, 5, 6, 7, 100, 101, 102]
+        # Written to the start of the caller's buffer
+        assert np.shares_memory(data, out) and np.array_equal(out[:len(data)], data)
+        assert (reader.overruns, reader.dropped_frames) == (1, 3)
+
+    def test_readers_have_independent_cursors(self):
+        """Test fan-out: each subscriber sees the full stream at its own pace."""
+        ring = AudioRingBuffer(capacity=16)
+        fast = ring.add_reader("fast")
+        slow = ring.add_reader("slow", max_lag=4)
+
+        ring.write(np.arange(8, dtype=np.int16))
+        assert fast.read(8).ravel().tolist() == list(range(8))
+
+        # The slow reader's bounded queue only keeps the newest 4 frames
+        assert slow.read(8).ravel().tolist() == [4, 5, 6, 7]
+        assert slow.dropped_frames == 4
+        assert fast.dropped_frames == 0
+
+        slow.close()
+        assert ring.readers == (fast,)
+
+    def test_wait_for_data_from_thread(self):
+        """Test async consumer wakes up when the capture thread writes."""
+        ring = AudioRingBuffer(capacity=64)
+
+        async def consume():
+            timer = threading.Timer(
+                0.05, ring.write, args=(np.ones(32, dtype=np.int16),)
+            )
+            timer.start()
+            ready = await ring.wait_for(32, timeout=2.0)
+            timer.join()
+            return ready
+
+        assert asyncio.run(consume())
+        assert ring.read(32).sum() == 32
+
+    def test_wait_for_timeout(self):
+        """Test waiting returns False when no data arrives."""
+        ring = AudioRingBuffer(capacity=16)
+        assert not asyncio.run(ring.wait_for(8, timeout=0.05))
+
+    def test_concurrent_subscribe_keeps_every_reader(self):
+        """Test readers added and removed from many threads are not lost."""
+        ring = AudioRingBuffer(capacity=16)
+        keep = []
+
+        def churn(i):
+            for _ in range(200):
+                ring.remove_reader(ring.add_reader(f"tmp{i}"))
+            keep.append(ring.add_reader(f"keep{i}"))
+
+        threads = [threading.Thread(target=churn, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert set(ring.readers) == set(keep) and len(keep) == 8
+
+
+class TestCaptureBackends:
+    """Tests for capture backend selection."""
+
+    def test_backend_candidates(self):
+        """Test auto prefers sounddevice and simulated opens nothing."""
+        assert backend_candidates("auto") == [SoundDeviceBackend, PyAudioBackend]
+        assert backend_candidates("PyAudio") == [PyAudioBackend]
+        assert backend_candidates("simulated") == []
+        with pytest.raises(ValueError):
+            backend_candidates("alsa")
+
+    def test_parse_device(self):
+        """Test numeric device settings become indices."""
+        assert parse_device(None) is None
+        assert parse_device("2") == 2
+        assert parse_device("USB Audio") == "USB Audio"
+
+    def test_simulated_backend_falls_back(self):
+        """Test the service reports simulated audio when no device opens."""
+        service = CaptureService(sample_rate=4000, block_size=256, backend="simulated")
+        assert service.start() is False
+        assert service.subscribe("test") is None
+        stats = service.get_stats()
+        assert stats["simulated"] is True
+        assert stats["backend"]["backend"] == "simulated"
+
+    def test_backend_blocks_reach_subscribers(self):
+        """Test blocks from a backend callback are fanned out to readers."""
+
+        class FakeBackend(CaptureBackend):
+            name = "fake"
+
+            def open(self, callback):
+                self.callback = callback
+                self.latency = 0.008
+
+            def close(self):
+                pass
+
+        import core.audio_backends as backends
+        backends.CAPTURE_BACKENDS["fake"] = FakeBackend
+        try:
+            service = CaptureService(sample_rate=4000, block_size=256, backend="fake")
+            reader = service.subscribe("test", max_seconds=10.0)
+            # Subscribers stay clear of the slots being written
+            assert reader.max_lag == service.max_lag == 8000
+            assert service._ring.capacity >= reader.max_lag + 2 * 256
+            block = np.arange(256, dtype=np.int16).reshape(-1, 1)
+            service._backend.callback(block)
+
+            assert np.array_equal(reader.read(256), block)
+            assert service.get_stats()["backend"]["latency_ms"] == 8.0
+            service.stop()
+            assert not service.is_running
+        finally:
+            del backends.CAPTURE_BACKENDS["fake"]
+
+    def test_native_rate_is_resampled(self):
+        """Test a device at its native rate is resampled to the output rate."""
+
+        class NativeRateBackend(CaptureBackend):
+            name = "native"
+
+            def native_sample_rate(self):
+                return 12000
+
+            def open(self, callback):
+                self.callback = callback
+
+            def close(self):
+                pass
+
+        import core.audio_backends as backends
+        backends.CAPTURE_BACKENDS["native"] = NativeRateBackend
+        try:
+            service = CaptureService(sample_rate=4000, block_size=256, backend="native")
+            reader = service.subscribe("test")
+            backend = service._backend
+            assert backend.sample_rate == 12000
+            assert backend.block_size == 768
+
+            backend.callback(np.full((768, 1), 1000, dtype=np.int16))
+            assert reader.available() == 256
+            assert service.get_stats()["resampler"]["ratio"] == "1/3"
+            service.stop()
+        finally:
+            del backends.CAPTURE_BACKENDS["native"]
+
+
+class TestAudioRecorderBuffer:
+    """Tests for the preallocated int16 recording buffer."""
+
+    def test_recording_is_int16_view(self):
+        """Test chunks land in one contiguous int16 buffer."""
+        recorder = AudioRecorder(duration=1, chunk_size=1024)
+
+        async def record():
+            await recorder.start_recording()
+            chunks = []
+            for _ in range(3):
+                chunks.append(await recorder.read_chunk())
+            return chunks, await recorder.stop_recording()
+
+        chunks, audio = asyncio.run(record())
+
+        assert chunks[0].dtype == np.float32
+        assert audio.dtype == np.int16
+        assert len(audio) == 3 * 1024
+        assert np.shares_memory(audio, recorder.get_audio_data())
+        assert len(recorder._audio_buffer) == recorder.sample_rate
+
+    def test_recording_stops_when_buffer_full(self):
+        """Test the recorder never writes past duration * sample_rate."""
+        recorder = AudioRecorder(sample_rate=2000, duration=1, chunk_size=512)
+
+        async def record():
+            await recorder.start_recording()
+            while await recorder.read_chunk() is not None:
+                pass
+            return await recorder.stop_recording()
+
+        audio = asyncio.run(record())
+        assert len(audio) == 2000
+
+    def test_bandpass_applied_per_chunk(self):
+        """Test stored audio equals the whole raw recording filtered at once."""
+        def record(bandpass):
+            simulator = HeartSoundSimulator(sample_rate=4000, seed=3)
+            recorder = AudioRecorder(
+                sample_rate=4000, duration=1, chunk_size=300,
+                simulator=simulator, bandpass=bandpass
+            )
+
+            async def run():
+                await recorder.start_recording()
+                while await recorder.read_chunk() is not None:
+                    pass
+                return await recorder.stop_recording()
+
+            return asyncio.run(run())
+
+        raw = record(False)
+        filtered = record(True)
+        expected = StreamingBandpass(4000).process(raw)[:, 0]
+        assert np.abs(filtered.astype(np.int32) - expected).max() <= 1
+
+    def test_rms_of_int16_matches_float(self):
+        """Test RMS is scale-consistent between int16 and float input."""
+        signal = 0.5 * np.sin(np.linspace(0, 20 * np.pi, 4000)).astype(np.float32)
+        assert calculate_rms(float_to_pcm16(signal)) == pytest.approx(
+            calculate_rms(signal), rel=1e-3
+        )
+
+
+class TestMultiChannel:
+    """Tests for the (frames, channels) capture path."""
+
+    def test_stereo_recording_keeps_channel_axis(self):
+        """Test multi-channel chunks are not flattened into interleaved data."""
+        recorder = AudioRecorder(sample_rate=4000, channels=2, duration=1, chunk_size=400)
+
+        async def record():
+            await recorder.start_recording()
+            chunk = await recorder.read_chunk()
+            while await recorder.read_chunk() is not None:
+                pass
+            return chunk, await recorder.stop_recording()
+
+        chunk, audio = asyncio.run(record())
+        assert chunk.shape == (400, 2)
+        assert audio.shape == (4000, 2)
+        assert np.array_equal(audio[:, 0], audio[:, 1])
+
+    def test_mix_channels(self):
+        """Test mixdown, best-channel and fixed-channel selection."""
+        audio = np.zeros((100, 2), dtype=np.int16)
+        audio[:, 0] = 1000
+        audio[:, 1] = 3000
+
+        mixed = mix_channels(audio, "mean")
+        assert mixed.dtype == np.int16 and np.all(mixed == 2000)
+        assert np.all(mix_channels(audio, "best") == 3000)
+        assert np.all(mix_channels(audio, "0") == 1000)
+        mono = audio[:, 0].copy()
+        assert mix_channels(mono) is mono
+        with pytest.raises(ValueError):
+            mix_channels(audio, "2")
+
+    def test_per_channel_levels_and_waveforms(self):
+        """Test RMS and waveform points are computed per channel."""
+        t = np.linspace(0, 1, 1000, endpoint=False)
+        audio = np.stack([0.1 * np.sin(2 * np.pi * 5 * t), 0.5 * np.sin(2 * np.pi * 5 * t)], axis=1)
+
+        assert channel_rms(audio) == pytest.approx([0.1 / np.sqrt(2), 0.5 / np.sqrt(2)], rel=1e-3)
+
+        frame = audio_to_base64_frame(audio.astype(np.float32), 4000)
+        assert len(frame["channels"]) == 2
+        assert frame["channels"][1]["amplitude"] > frame["channels"][0]["amplitude"]
+        assert frame["channels"][0]["waveform"] == frame["channels"][1]["waveform"]
+        assert len(frame["waveform"]) == 50
+
+
+    def test_frames_use_configured_mix(self, monkeypatch):
+        """Test the live waveform shows the channel mix that is analysed."""
+        monkeypatch.setattr(settings, "AUDIO_CHANNEL_MIX", "1")
+        recorder = AudioRecorder(sample_rate=4000, channels=2, duration=1, chunk_size=400)
+        fill = recorder._fill_simulated
+
+        def right_only(dest):
+            fill(dest)
+            dest[:, 0] = 0
+
+        recorder._fill_simulated = right_only
+
+        async def stream():
+            await recorder.start_recording()
+            return [frame async for frame in recorder.stream_frames(frame_rate=10)]
+
+        frame = asyncio.run(stream())[-1]
+        assert frame["channel_amplitudes"][0] == 0
+        assert frame["amplitude"] == pytest.approx(frame["channel_amplitudes"][1])
+        assert np.allclose(frame["waveform"], frame["channel_waveforms"][1])
+
+
+class TestAudioStats:
+    """Tests for incremental recording statistics."""
+
+    def test_chunked_matches_full_scan(self):
+        """Test running sums equal statistics of the whole recording."""
+        rng = np.random.default_rng(4)
+        audio = (8000 * rng.standard_normal((5000, 2)) + 300).astype(np.int16)
+        audio[100:110, 1] = 32767
+
+        stats = AudioStats(channels=2)
+        for start in range(0, len(audio), 777):
+            stats.update_input(audio[start:start + 777])
+            stats.update(audio[start:start + 777])
+
+        assert stats.rms == pytest.approx(calculate_rms(audio), rel=1e-9)
+        assert stats.channel_rms == pytest.approx(channel_rms(audio), rel=1e-9)
+        assert stats.peak[1] == pytest.approx(32767 / 32768)
+        assert stats.clipped[1] >= 10
+        assert stats.dc_offset == pytest.approx(audio.mean(axis=0) / 32768, rel=1e-9)
+
+        signs = np.signbit(audio)
+        expected = np.count_nonzero(signs[1:] != signs[:-1], axis=0)
+        assert np.array_equal(stats.zero_crossings, expected)
+
+    def test_recorder_validates_from_stats(self):
+        """Test the recorder's stats describe its recording."""
+        recorder = AudioRecorder(sample_rate=4000, duration=1, chunk_size=512, bandpass=False)
+
+        async def record():
+            await recorder.start_recording()
+            while await recorder.read_chunk() is not None:
+                pass
+            return await recorder.stop_recording()
+
+        audio = asyncio.run(record())
+        assert recorder.stats.frames == len(audio)
+        assert recorder.stats.rms == pytest.approx(calculate_rms(audio), rel=1e-9)
+        assert is_audio_valid(audio, min_duration_samples=2000, stats=recorder.stats)[0]
+        assert not is_audio_valid(audio, stats=AudioStats())[0]
+
+
+class TestSignalQuality:
+    """Tests for the live signal quality monitor."""
+
+    @staticmethod
+    def _run(signal, sample_rate=16000):
+        monitor = SignalQualityMonitor(sample_rate)
+        for start in range(0, len(signal), 1024):
+            monitor.update(float_to_pcm16(signal[start:start + 1024]))
+        return monitor
+
+    def test_clean_heart_sound_is_good(self):
+        """Test simulated heart sounds score as good quality."""
+        monitor = self._run(HeartSoundSimulator("systolic_murmur", snr_db=20, seed=1).generate(3.0))
+        assert monitor.report["good"]
+        assert monitor.report["issue"] is None
+        assert monitor.bad_seconds == 0.0
+        assert monitor.evaluations == 6
+
+    def test_detects_problems(self):
+        """Test no-contact, clipping and speech are flagged."""
+        rng = np.random.default_rng(0)
+        t = np.arange(48000) / 16000
+        heart = HeartSoundSimulator(seed=1).generate(3.0)
+        speech = 0.3 * np.sin(2 * np.pi * 800 * t) + 0.2 * np.sin(2 * np.pi * 1500 * t)
+
+        cases = {
+            "no_contact": 1e-4 * rng.standard_normal(48000),
+            "clipping": 3 * heart,
+            "speech": speech + 0.5 * heart,
+        }
+        for issue, signal in cases.items():
+            monitor = self._run(signal)
+            assert monitor.report["issue"] == issue
+            assert not monitor.report["good"]
+            assert monitor.bad_seconds == pytest.approx(3.0)
+
+    def test_frames_carry_quality(self):
+        """Test streamed frames include the latest quality report."""
+        recorder = AudioRecorder(sample_rate=4000, duration=1, chunk_size=400)
+
+        async def stream():
+            await recorder.start_recording()
+            return [frame async for frame in recorder.stream_frames(frame_rate=10)]
+
+        frames = asyncio.run(stream())
+        assert frames[0]["quality"] is None or "score" in frames[0]["quality"]
+        assert frames[-1]["quality"]["good"]
+
+
+class TestHeartRateSegmentation:
+    """Tests for streaming heart rate estimation and S1/S2 labelling."""
+
+    @staticmethod
+    def _signal(bpm, seconds=12.0, preset="normal"):
+        audio = HeartSoundSimulator(preset, bpm=bpm, snr_db=15, seed=2).generate(seconds)
+        return StreamingBandpass(16000).process(audio)[:, 0]
+
+    @pytest.mark.parametrize("bpm", [55, 72, 110, 150, 160, 190])
+    def test_heart_rate_estimate(self, bpm):
+        """Test the estimated rate matches the simulated rate."""
+        result = segment_recording(self._signal(bpm), 16000)
+        assert result["bpm"] == pytest.approx(bpm, abs=2)
+
+    @pytest.mark.parametrize("preset", ["normal", "systolic_murmur", "s3", "aortic_stenosis"])
+    def test_fast_rate_not_halved(self, preset):
+        """Test a fast rate is not reported at half speed (octave error)."""
+        result = segment_recording(self._signal(160, preset=preset), 16000)
+        assert result["bpm"] == pytest.approx(160, abs=2)
+
+    def test_sounds_alternate(self):
+        """Test confirmed sounds alternate S1/S2 one cycle apart."""
+        result = segment_recording(self._signal(72), 16000)
+        sounds = [beat["sound"] for beat in result["beats"]]
+        assert len(sounds) >= 2 * 12
+        assert all(a != b for a, b in zip(sounds, sounds[1:]))
+
+        s1 = np.array([beat["time"] for beat in result["beats"] if beat["sound"] == "S1"])
+        assert np.median(np.diff(s1)) == pytest.approx(60 / 72, abs=0.03)
+
+    def test_chunking_does_not_change_result(self):
+        """Test arbitrary chunk sizes give the same markers."""
+        audio = self._signal(90, seconds=8.0)
+        assert segment_recording(audio, 16000, chunk_size=1000) == \
+            segment_recording(audio, 16000, chunk_size=7777)
+
+    def test_beats_popped_once(self):
+        """Test new markers are handed out once and kept in the summary."""
+        segmenter = HeartRateSegmenter(16000)
+        segmenter.update(self._signal(72, seconds=4.0))
+        popped = segmenter.pop_beats()
+        assert popped and segmenter.pop_beats() == []
+        assert segmenter.summary()["beats"] == popped
+
+    def test_frames_carry_heart_rate(self):
+        """Test streamed frames include the live BPM and beat markers."""
+        recorder = AudioRecorder(sample_rate=4000, duration=4, chunk_size=400)
+
+        async def stream():
+            await recorder.start_recording()
+            return [frame async for frame in recorder.stream_frames(frame_rate=10)]
+
+        frames = asyncio.run(stream())
+        assert frames[0]["bpm"] is None
+        assert frames[-1]["bpm"] == pytest.approx(settings.SIMULATOR_BPM, abs=3)
+        assert sum(len(frame["beats"]) for frame in frames) >= 6
+
+
+class TestWaveformExtraction:
+    """Tests for vectorized waveform point extraction."""
+
+    @staticmethod
+    def _reference(audio, num_points):
+        edges = (np.arange(num_points + 1) * len(audio)) // num_points
+        points = np.array([
+            np.abs(audio[edges[i]:edges[i + 1]].astype(np.float64)).max()
+            for i in range(num_points)
+        ])
+        return points / points.max()
+
+    @pytest.mark.parametrize("length", [50, 533, 1024, 1067])
+    def test_ragged_lengths_use_every_sample(self, length):
+        """Test bins cover the whole chunk, including a ragged tail."""
+        audio = np.random.default_rng(length).standard_normal(length)
+        audio[-1] = 10.0  # peak in the last sample must not be dropped
+
+        points = extract_waveform_points(audio, 50)
+        assert len(points) == 50
+        assert points[-1] == 1.0
+        assert np.allclose(points, self._reference(audio, 50))
+
+    def test_short_and_empty_input(self):
+        """Test inputs shorter than num_points are zero-padded."""
+        assert extract_waveform_points(np.array([0.5, -1.0]), 4) == [0.5, 1.0, 0.0, 0.0]
+        assert extract_waveform_points(np.array([], dtype=np.float32), 3) == [0.0] * 3
+
+    def test_int16_full_scale_negative(self):
+        """Test -32768 does not overflow when taking the absolute peak."""
+        audio = np.array([-32768, 16384, 0, 0], dtype=np.int16)
+        assert extract_waveform_points(audio, 2) == [1.0, 0.0]
+
+    def test_batch_matches_single(self):
+        """Test the 2-D batch variant equals per-chunk extraction."""
+        chunks = np.random.default_rng(5).standard_normal((8, 533)).astype(np.float32)
+        chunks[3] = 0.0
+
+        batch = extract_waveform_batch(chunks, 50)
+        assert batch.shape == (8, 50)
+        for row, chunk in zip(batch, chunks):
+            assert np.allclose(row, extract_waveform_points(chunk, 50))
+        assert not batch[3].any()
+
+
+class TestFrameScheduler:
+    """Tests for the sample-clock frame scheduler."""
+
+    def test_chunk_is_split_into_frames(self):
+        """Test one 64 ms chunk yields two 30 fps frames plus carry-over."""
+        scheduler = FrameScheduler(16000, target_fps=30.0)
+        frames = scheduler.schedule(1024)
+        assert frames == [(0, 533)]
+
+        frames = scheduler.schedule(2048)
+        assert frames == [(533, 1067), (1067, 1600)]
+
+    def test_backlog_is_coalesced(self):
+        """Test a large backlog is merged into one frame."""
+        scheduler = FrameScheduler(16000, target_fps=30.0, max_backlog_frames=3)
+        frames = scheduler.schedule(16000)
+        assert frames == [(0, 16000)]
+        assert scheduler.coalesced_frames == 29
+
+    def test_final_partial_frame_is_flushed(self):
+        """Test the tail of the recording is emitted at the end."""
+        scheduler = FrameScheduler(16000, target_fps=30.0)
+        frames = scheduler.schedule(600, final=True)
+        assert frames == [(0, 533), (533, 600)]
+
+    def test_recorder_ends_on_exact_sample_count(self):
+        """Test streaming stops after duration * sample_rate samples."""
+        recorder = AudioRecorder(sample_rate=4000, duration=1, chunk_size=512)
+
+        async def stream():
+            await recorder.start_recording()
+            return [frame async for frame in recorder.stream_frames(frame_rate=20)]
+
+        frames = asyncio.run(stream())
+        assert len(frames) == 20
+        assert frames[-1]["elapsed_seconds"] == 1.0
+        assert frames[-1]["remaining_seconds"] == 0
+        assert recorder.elapsed_samples == 4000
+        assert recorder.frame_stats["frames_emitted"] == 20
+
+
+class TestHeartSoundSimulator:
+    """Tests for the template-based heart sound simulator."""
+
+    def test_seeded_output_is_deterministic(self):
+        """Test equal seeds produce identical audio for every preset."""
+        for preset in SIMULATOR_PRESETS:
+            a = HeartSoundSimulator(preset, seed=7).generate(1.0)
+            b = HeartSoundSimulator(preset, seed=7).generate(1.0)
+            assert np.array_equal(a, b)
+            assert a.dtype == np.float32
+
+    def test_phase_is_continuous_across_blocks(self):
+        """Test streaming in blocks matches generating in one go."""
+        whole = HeartSoundSimulator("s3", bpm=90, seed=1).generate(2.0)
+
+        sim = HeartSoundSimulator("s3", bpm=90, seed=1)
+        blocks = np.concatenate([sim.next_block(1000) for _ in range(32)])
+        assert np.array_equal(whole, blocks)
+
+    def test_cycle_length_follows_bpm(self):
+        """Test the template covers exactly one beat."""
+        sim = HeartSoundSimulator("normal", bpm=60, sample_rate=16000, seed=0)
+        assert sim.cycle_samples == 16000
+
+    def test_unknown_preset_rejected(self):
+        """Test an invalid preset raises ValueError."""
+        with pytest.raises(ValueError):
+            HeartSoundSimulator("unknown")
+
+
+class TestRecordingSpool:
+    """Tests for the memory-mapped recording spool."""
+
+    def test_spool_returns_memmap_view(self, tmp_path, monkeypatch):
+        """Test spool mode records into a memmap and cleans up after."""
+        from config import settings
+        monkeypatch.setattr(settings, "AUDIO_SPOOL_DIR", str(tmp_path))
+        recorder = AudioRecorder(duration=1, session_id="sess_spool", spool=True)
+
+        async def record():
+            await recorder.start_recording()
+            for _ in range(2):
+                await recorder.read_chunk()
+            return await recorder.stop_recording()
+
+        audio = asyncio.run(record())
+        assert isinstance(audio.base, np.memmap) or isinstance(audio, np.memmap)
+        assert len(audio) == 2 * recorder.chunk_size
+        assert (tmp_path / "sess_spool.pcm").exists()
+
+        recorder.discard_spool()
+        assert not (tmp_path / "sess_spool.pcm").exists()
+        assert not (tmp_path / "sess_spool.json").exists()
+
+    def test_checkpoints_run_off_the_event_loop(self, tmp_path, monkeypatch):
+        """Test periodic sidecar writes happen in a worker thread without msync."""
+        from config import settings
+        monkeypatch.setattr(settings, "AUDIO_SPOOL_DIR", str(tmp_path))
+        monkeypatch.setattr(settings, "AUDIO_SPOOL_CHECKPOINT_SECONDS", 0.0)
+        recorder = AudioRecorder(duration=1, session_id="sess_ckpt", spool=True)
+        calls = []
+        checkpoint = RecordingSpool.checkpoint
+
+        def record_checkpoint(spool, frames_written):
+            calls.append((threading.current_thread() is threading.main_thread(), frames_written))
+            checkpoint(spool, frames_written)
+
+        monkeypatch.setattr(RecordingSpool, "checkpoint", record_checkpoint)
+
+        async def record():
+            await recorder.start_recording()
+            flushes = []
+            recorder._spool.data.flush = lambda: flushes.append(True)
+            for _ in range(3):
+                await recorder.read_chunk()
+            return flushes
+
+        assert asyncio.run(record()) == []
+        assert calls == [(False, (i + 1) * recorder.chunk_size) for i in range(3)]
+        meta = json.loads((tmp_path / "sess_ckpt.json").read_text())
+        assert meta["frames_written"] == 3 * recorder.chunk_size
+        recorder.discard_spool()
+
+    def test_find_orphaned_spool_after_crash(self, tmp_path):
+        """Test an interrupted spool is recovered up to the last written frame."""
+        spool = RecordingSpool.create(str(tmp_path), "sess_crash", 16000, 1, 16000)
+        spool.data[:3000, 0] = 1000
+        spool.checkpoint(2048)  # checkpoint lags the last write
+        spool.data.flush()
+        del spool
+
+        orphans = find_orphaned_spools(str(tmp_path))
+        assert len(orphans) == 1
+        assert orphans[0].spool_id == "sess_crash"
+        assert orphans[0].state == "recording"
+        assert len(orphans[0].get_audio_data()) == 3000
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -3,6 +3,8 @@
 HeartSound Device API Tests
 心音智鉴设备API单元测试
 """
+import time
+
 import pytest
 from fastapi.testclient import TestClient
 from datetime import datetime
@@ -12,6 +14,7 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from config import settings
 from main import app
 
 
@@ -87,6 +90,56 @@ class TestDevicePing:
             pytest.fail(f"Invalid timestamp format: {timestamp}")
 
 
+class TestInferenceStatus:
+    """Tests for /api/device/inference endpoint"""
+
+    def test_inference_queue_metrics(self):
+        """Test the micro-batching queue metrics are exposed"""
+        response = client.get("/api/device/inference")
+
+        assert response.status_code == 200
+
+        data = response.json()
+        for key in ("queue_depth", "in_flight", "batches", "mean_batch_size", "batch_sizes"):
+            assert key in data
+        for key in ("hits", "misses", "evictions", "size"):
+            assert key in data["result_cache"]
+
+
+class TestModelManagement:
+    """Tests for /api/device/models endpoints"""
+
+    def test_models_status(self):
+        """Test the active version and its latency are reported"""
+        response = client.get("/api/device/models")
+
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["active"]["version"] == client.get("/api/device/info").json()["model_version"]
+        assert "latency" in data["active"]
+        assert data["candidate"] is None
+
+    def test_deploy_rejects_paths_and_missing_files(self):
+        """Test only existing files in the model directory can be deployed"""
+        response = client.post(
+            "/api/device/models", json={"model_file": "../secret.onnx", "version": "v9"}
+        )
+        assert response.status_code == 400
+
+        response = client.post(
+            "/api/device/models", json={"model_file": "missing.onnx", "version": "v9"}
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"]["error"] == "invalid_model"
+
+    def test_promote_without_candidate(self):
+        """Test promoting or re-weighting with no candidate is a conflict"""
+        assert client.post("/api/device/models/promote").status_code == 409
+        response = client.put("/api/device/models/traffic", json={"traffic": 50})
+        assert response.status_code == 409
+
+
 class TestRootEndpoints:
     """Tests for root endpoints"""
 
@@ -110,6 +163,23 @@ class TestRootEndpoints:
 
         data = response.json()
         assert data["status"] == "healthy"
+        assert "ready" in data
+        assert "state" in data["model"]
+
+    def test_model_ready_after_startup(self):
+        """Test the lifespan loads and warms up the model, then releases it"""
+        with TestClient(app) as started_client:
+            for _ in range(100):
+                data = started_client.get("/health").json()
+                if data["ready"]:
+                    break
+                time.sleep(0.05)
+
+            assert data["ready"]
+            assert data["model"]["state"] == "ready"
+            assert len(data["model"]["warmup_ms"]) == settings.MODEL_WARMUP_RUNS
+
+        assert client.get("/health").json()["model"]["state"] == "idle"
 
 
 class TestCORS:
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Streaming DSP Tests
+心音智鉴流式信号处理测试用例
+"""
+import numpy as np
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.dsp import StreamingBandpass, StreamingResampler
+
+
+def _chunked(stage, signal, seed=0):
+    """Feed a signal through a streaming stage in random-sized chunks."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    pos = 0
+    while pos < len(signal):
+        n = int(rng.integers(1, 2000))
+        parts.append(stage.process(signal[pos:pos + n]))
+        pos += n
+    return np.concatenate(parts)
+
+
+class TestStreamingResampler:
+    """Tests for the stateful polyphase resampler."""
+
+    @pytest.mark.parametrize("in_rate", [48000, 44100])
+    def test_chunked_matches_one_shot(self, in_rate):
+        """Test block boundaries do not change the output."""
+        signal = np.random.default_rng(1).standard_normal(in_rate).astype(np.float32)
+
+        resampler = StreamingResampler(in_rate, 16000)
+        whole = resampler.process(signal)
+        resampler.reset()
+        chunked = _chunked(resampler, signal)
+
+        assert len(whole) == 16000
+        assert np.allclose(whole, chunked, atol=1e-5)
+
+    def test_preserves_tone(self):
+        """Test an in-band tone keeps its frequency and level."""
+        t = np.arange(44100) / 44100
+        tone = (10000 * np.sin(2 * np.pi * 100 * t)).astype(np.int16)
+
+        out = StreamingResampler(44100, 16000).process(tone)[:, 0]
+        assert out.dtype == np.int16
+
+        steady = out[1000:].astype(np.float64)
+        spectrum = np.abs(np.fft.rfft(steady * np.hanning(len(steady))))
+        peak_hz = np.argmax(spectrum) * 16000 / len(steady)
+        assert peak_hz == pytest.approx(100, abs=2)
+        assert np.sqrt(np.mean(steady ** 2)) == pytest.approx(10000 / np.sqrt(2), rel=0.02)
+
+    def test_rejects_aliasing_band(self):
+        """Test content above the output Nyquist rate is filtered out."""
+        t = np.arange(48000) / 48000
+        tone = np.sin(2 * np.pi * 12000 * t).astype(np.float32)
+
+        out = StreamingResampler(48000, 16000).process(tone)
+        assert np.abs(out[500:]).max() < 0.01
+
+    def test_multichannel_and_passthrough(self):
+        """Test channels are resampled independently; equal rates pass through."""
+        stereo = np.zeros((4800, 2), dtype=np.float32)
+        stereo[:, 1] = 0.5
+
+        out = StreamingResampler(48000, 16000, channels=2).process(stereo)
+        assert out.shape == (1600, 2)
+        assert np.allclose(out[:, 0], 0)
+
+        block = np.arange(10, dtype=np.int16)
+        out = StreamingResampler(16000, 16000).process(block)
+        assert np.array_equal(out[:, 0], block)
+
+
+class TestStreamingBandpass:
+    """Tests for the stateful heart-sound band-pass filter."""
+
+    def test_chunked_matches_one_shot(self):
+        """Test carried-over state makes chunked filtering seamless."""
+        signal = (3000 * np.random.default_rng(2).standard_normal(16000)).astype(np.int16)
+
+        bandpass = StreamingBandpass(16000)
+        whole = bandpass.process(signal)
+        bandpass.reset()
+        chunked = _chunked(bandpass, signal)
+
+        assert whole.dtype == np.int16
+        assert np.array_equal(whole, chunked)
+
+    @pytest.mark.parametrize("freq,passes", [(5, False), (100, True), (2000, False)])
+    def test_frequency_response(self, freq, passes):
+        """Test heart-sound band passes while rumble and speech band are cut."""
+        t = np.arange(16000) / 16000
+        tone = np.sin(2 * np.pi * freq * t).astype(np.float32)
+
+        out = StreamingBandpass(16000, 20.0, 400.0).process(tone)[8000:, 0]
+        gain = np.sqrt(2 * np.mean(out.astype(np.float64) ** 2))
+        assert (gain > 0.9) if passes else (gain < 0.05)
+
+    def test_dc_offset_does_not_ring(self):
+        """Test a constant offset at stream start is removed without a transient."""
+        out = StreamingBandpass(16000).process(np.full(4000, 0.3, dtype=np.float32))
+        assert np.abs(out).max() < 1e-3
+
+    def test_invalid_cutoffs(self):
+        """Test cut-offs must lie inside the Nyquist band."""
+        with pytest.raises(ValueError):
+            StreamingBandpass(800, 20.0, 400.0)
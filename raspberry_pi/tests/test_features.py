@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Feature Extraction Tests
+心音智鉴特征提取测试用例
+"""
+import numpy as np
+import pytest
+from scipy.fft import dct
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from core.inference import HeartSoundClassifier
+from utils.features import (
+    FeatureExtractor,
+    StreamingSpectrogram,
+    dct_matrix,
+    mel_filterbank,
+    stft_power,
+    stft_window
+)
+
+
+class TestFeatureExtraction:
+    """Tests for batched STFT, log-mel and MFCC features."""
+
+    def test_stft_matches_frame_loop(self):
+        """Test the strided batch STFT equals a per-frame loop."""
+        audio = np.random.default_rng(0).standard_normal(5000)
+        power = stft_power(audio, 256, 100)
+
+        window = stft_window(256)
+        starts = range(0, len(audio) - 256 + 1, 100)
+        expected = np.array([np.abs(np.fft.rfft(audio[s:s + 256] * window)) ** 2 for s in starts])
+        assert power.shape == expected.shape == (48, 129)
+        assert np.allclose(power, expected, rtol=1e-4, atol=1e-3)
+
+    def test_int16_input_is_scaled(self):
+        """Test int16 PCM gives the same spectrum as float samples."""
+        audio = np.random.default_rng(1).uniform(-0.5, 0.5, 2048)
+        pcm = np.rint(audio * 32768).astype(np.int16)
+        assert np.allclose(stft_power(pcm, 512, 256), stft_power(pcm / 32768.0, 512, 256))
+
+    def test_matrices_are_cached_and_read_only(self):
+        """Test transform matrices are built once per parameter set."""
+        bank = mel_filterbank(16000, 1024, 40, 20.0, 1000.0)
+        assert mel_filterbank(16000, 1024, 40, 20.0, 1000.0) is bank
+        assert FeatureExtractor(16000).filterbank is bank
+        assert not bank.flags.writeable
+        assert (bank.sum(axis=1) > 0).all()
+
+        with pytest.raises(ValueError):
+            mel_filterbank(16000, 1024, 40, 20.0, 9000.0)
+
+    def test_mfcc_is_orthonormal_dct(self):
+        """Test MFCCs equal scipy's orthonormal DCT-II of the log-mel bands."""
+        extractor = FeatureExtractor(16000)
+        log_mel = extractor.log_mel(np.random.default_rng(2).standard_normal(16000))
+        expected = dct(log_mel, type=2, norm="ortho", axis=0)[:extractor.n_mfcc]
+        assert np.allclose(extractor.mfcc_from_log_mel(log_mel), expected, atol=1e-3)
+        assert np.allclose(dct_matrix(8, 8) @ dct_matrix(8, 8).T, np.eye(8), atol=1e-6)
+
+    def test_tone_peaks_in_matching_band(self):
+        """Test a pure tone lands in the mel band centred nearest to it."""
+        extractor = FeatureExtractor(16000)
+        tone = np.sin(2 * np.pi * 200 * np.arange(16000) / 16000)
+        band = int(np.argmax(extractor.log_mel(tone).mean(axis=1)))
+        assert np.argmax(extractor.filterbank[band]) == pytest.approx(200 / (16000 / 1024), abs=1)
+
+    @pytest.mark.parametrize("kind", ["power", "log_mel", "mfcc"])
+    def test_streaming_matches_batch(self, kind):
+        """Test streamed columns equal the batch result for any chunking."""
+        extractor = FeatureExtractor(16000)
+        audio = np.random.default_rng(3).standard_normal(20000).astype(np.float32)
+        if kind == "power":
+            expected = stft_power(audio, extractor.n_fft, extractor.hop_length).T
+        else:
+            expected = extractor.extract(audio, kind)
+
+        stream = StreamingSpectrogram(extractor, kind)
+        rng = np.random.default_rng(4)
+        columns, pos = [], 0
+        while pos < len(audio):
+            size = int(rng.integers(1, 3000))
+            columns.append(stream.update(audio[pos:pos + size]))
+            pos += size
+
+        streamed = np.concatenate(columns, axis=1)
+        assert streamed.shape == expected.shape
+        assert stream.frames_emitted == extractor.num_frames(len(audio))
+        assert np.allclose(streamed, expected, rtol=1e-4, atol=1e-3)
+
+    def test_classifier_feature_input(self, monkeypatch):
+        """Test time-frequency models receive (windows, features, frames) tensors."""
+        monkeypatch.setattr(settings, "MODEL_INPUT_FEATURES", "log_mel")
+        monkeypatch.setattr(settings, "MODEL_INPUT_LENGTH", 16000)
+        classifier = HeartSoundClassifier(model_path="missing.onnx")
+
+        audio = np.random.default_rng(5).standard_normal(20000).astype(np.float32)
+        tensor = classifier._model_input([(audio, np.array([0, 4000]))])
+        assert tensor.shape == (2, settings.FEATURE_N_MELS, classifier._features.num_frames(16000))
+
+        monkeypatch.setattr(settings, "MODEL_INPUT_FEATURES", "spectrogram")
+        with pytest.raises(ValueError):
+            HeartSoundClassifier(model_path="missing.onnx")
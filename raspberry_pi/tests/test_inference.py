@@ -0,0 +1,612 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Inference Tests
+心音智鉴推理链路测试用例
+"""
+import asyncio
+import random
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from core.batching import InferenceBatcher, InferenceBusyError
+import core.inference
+from core.inference import (
+    HeartSoundClassifier,
+    InvalidAudioError,
+    ResultCache,
+    CATEGORIES,
+    aggregate_probabilities,
+    run_inference
+)
+from core.quality import SignalQualityMonitor
+from core.registry import ModelRegistry
+from core.runtime import (
+    create_session,
+    optimized_model_path,
+    resolve_model_path,
+    session_options,
+    variant_model_path
+)
+from core.simulator import HeartSoundSimulator
+from utils.audio_utils import (
+    normalize_audio,
+    preprocess_for_inference,
+    preprocess_into,
+    preprocess_windows_into,
+    window_starts
+)
+
+
+class TestPreprocessing:
+    """Tests for single-pass inference preprocessing."""
+
+    def test_short_input_is_normalized_and_padded(self):
+        """Test a short recording is peak-normalized then zero-padded."""
+        audio = np.array([1000, -2000, 500], dtype=np.int16)
+        out = np.full((1, 6), 9.0, dtype=np.float32)
+
+        preprocess_into(audio, out)
+        assert np.allclose(out[0], [0.5, -1.0, 0.25, 0.0, 0.0, 0.0])
+
+    def test_long_input_uses_centre_region(self):
+        """Test the centre is taken and normalized by its own peak."""
+        audio = np.zeros(10, dtype=np.float32)
+        audio[0] = 100.0  # outside the model region
+        audio[3:7] = [0.1, -0.2, 0.4, 0.2]
+
+        out = preprocess_for_inference(audio, target_length=4)
+        assert out.shape == (1, 4)
+        assert np.allclose(out[0], normalize_audio(audio[3:7]))
+
+    def test_int16_full_scale_and_silence(self):
+        """Test -32768 does not overflow and silence stays zero."""
+        out = preprocess_for_inference(np.array([-32768, 16384], dtype=np.int16), 2)
+        assert np.allclose(out[0], [-1.0, 0.5])
+
+        silent = preprocess_for_inference(np.zeros(5, dtype=np.int16), 8)
+        assert not silent.any()
+
+    def test_classifier_reuses_input_tensor(self):
+        """Test the classifier writes every analysis into one tensor."""
+        classifier = HeartSoundClassifier(model_path="missing.onnx")
+        tensor = classifier._input_tensor()
+        assert tensor.shape == (1, classifier.input_length)
+        assert classifier._input_tensor().base is tensor.base
+
+    def test_input_tensor_grows_only(self):
+        """Test alternating batch sizes share one buffer after the largest."""
+        classifier = HeartSoundClassifier(model_path="missing.onnx")
+        base = classifier._input_tensor(6).base
+        for windows in (2, 5, 1, 6, 3):
+            tensor = classifier._input_tensor(windows)
+            assert tensor.shape == (windows, classifier.input_length)
+            assert tensor.base is base
+
+        assert classifier._input_tensor(7).base is not base
+
+
+class TestWindowedInference:
+    """Tests for sliding-window batched inference over the whole recording."""
+
+    def test_windows_cover_recording(self):
+        """Test windows span the first to the last sample within the hop."""
+        starts = window_starts(30 * 16000, 160000, 80000)
+        assert starts[0] == 0 and starts[-1] + 160000 == 30 * 16000
+        assert np.diff(starts).max() <= 80000
+        assert len(starts) == 5
+
+        assert list(window_starts(1000, 160000, 80000)) == [0]
+        capped = window_starts(600 * 16000, 160000, 80000, max_windows=16)
+        assert len(capped) == 16 and capped[-1] + 160000 == 600 * 16000
+
+    def test_windows_preprocessed_independently(self):
+        """Test each batch row is one peak-normalized window."""
+        audio = np.concatenate([np.full(100, 0.1), np.full(100, 0.5)]).astype(np.float32)
+        out = preprocess_windows_into(audio, np.array([0, 100]), np.empty((2, 100), np.float32))
+        assert np.allclose(out, 1.0)
+
+    def test_aggregation_modes(self):
+        """Test mean, max and quality-weighted aggregation."""
+        probs = np.array([[0.9, 0.1], [0.3, 0.7]])
+        assert np.allclose(aggregate_probabilities(probs, "mean"), [0.6, 0.4])
+        assert np.allclose(aggregate_probabilities(probs, "max"), [0.5625, 0.4375])
+        assert np.allclose(aggregate_probabilities(probs, "quality", np.array([1.0, 0.0])), [0.9, 0.1])
+        # Unscored windows get the mean known score
+        assert np.allclose(
+            aggregate_probabilities(probs, "quality", np.array([0.2, np.nan])), [0.6, 0.4]
+        )
+        with pytest.raises(ValueError):
+            aggregate_probabilities(probs, "median")
+
+    def test_predict_returns_timeline(self):
+        """Test a long recording yields one timeline entry per window."""
+        classifier = HeartSoundClassifier(model_path="missing.onnx")
+        audio = HeartSoundSimulator(seed=1).generate(30.0)
+        result = classifier.predict(audio)
+
+        assert len(result.windows) == 5
+        assert result.windows[0].start_seconds == 0.0
+        assert result.windows[-1].end_seconds == pytest.approx(30.0)
+        assert classifier._input_tensor(5).shape == (5, classifier.input_length)
+
+    def test_quality_weights_from_monitor(self):
+        """Test windows are weighted by the recorded quality scores."""
+        classifier = HeartSoundClassifier(model_path="missing.onnx")
+        monitor = SignalQualityMonitor(16000)
+        monitor.history.extend([(5.0, 0.8), (12.0, 0.2), (25.0, 0.6)])
+
+        starts = np.array([0, 160000, 320000, 480000])
+        weights = classifier._window_quality(starts, 640000, monitor)
+        assert np.allclose(weights[:3], [0.8, 0.2, 0.6])
+        assert np.isnan(weights[3])
+
+
+class _RecordingClassifier:
+    """Stand-in classifier that records the batches it is given."""
+
+    def __init__(self, fail_on=None, gate=None):
+        self.calls = []
+        self.threads = []
+        self.fail_on = fail_on
+        # Optional threading.Event each call waits for
+        self.gate = gate
+
+    def predict_batch(self, requests):
+        self.calls.append(len(requests))
+        self.threads.append(threading.current_thread().name)
+        if self.gate is not None:
+            self.gate.wait(5)
+        if any(audio is self.fail_on for audio, _, _ in requests):
+            raise ValueError("bad recording")
+        return [float(audio[0]) for audio, _, _ in requests]
+
+
+class TestInferenceBatcher:
+    """Tests for the micro-batching inference queue."""
+
+    @staticmethod
+    def _submit_all(batcher, recordings):
+        async def run():
+            return await asyncio.gather(
+                *(batcher.submit(audio) for audio in recordings), return_exceptions=True
+            )
+        return asyncio.run(run())
+
+    def test_concurrent_requests_share_a_call(self):
+        """Test requests arriving together run as one batch, in order."""
+        classifier = _RecordingClassifier()
+        batcher = InferenceBatcher(classifier, window_ms=50, max_batch=8)
+        results = self._submit_all(batcher, [np.full(4, i, np.float32) for i in range(3)])
+
+        assert results == [0.0, 1.0, 2.0]
+        assert classifier.calls == [3]
+        stats = batcher.get_stats()
+        assert stats["batches"] == 1 and stats["mean_batch_size"] == 3
+        assert stats["queue_depth"] == 0
+
+    def test_max_batch_size(self):
+        """Test batches are split at the configured size."""
+        classifier = _RecordingClassifier()
+        batcher = InferenceBatcher(classifier, window_ms=50, max_batch=2)
+        self._submit_all(batcher, [np.zeros(4, np.float32) for _ in range(5)])
+        assert classifier.calls == [2, 2, 1]
+        assert batcher.get_stats()["batch_sizes"] == {1: 1, 2: 2}
+
+    def test_global_model_resolved_off_the_loop(self, monkeypatch):
+        """Test a batch for the global model does not block the event loop
+        while the model lock is held (e.g. by the startup preload)."""
+        monkeypatch.setattr(core.inference, "_classifier", _RecordingClassifier())
+        batcher = InferenceBatcher(window_ms=50, max_batch=8)
+        locked, release = threading.Event(), threading.Event()
+
+        def preload():
+            with core.inference._classifier_lock:
+                locked.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=preload)
+        holder.start()
+        locked.wait(5)
+
+        async def run():
+            batcher._loop = asyncio.get_running_loop()
+            future = batcher._loop.create_future()
+            item = (np.ones(4, np.float32), None, None, future, time.monotonic(), None)
+            task = asyncio.ensure_future(batcher._resolve([item]))
+            started = time.monotonic()
+            await asyncio.sleep(0.05)
+            stalled = time.monotonic() - started
+            pending = not future.done()
+            release.set()
+            await task
+            await batcher.stop()
+            return stalled, pending, future.result()
+
+        stalled, pending, result = asyncio.run(run())
+        holder.join()
+        assert stalled < 1 and pending
+        assert result == 1.0
+
+    def test_failure_isolated_to_its_request(self):
+        """Test a failing recording does not fail the rest of its batch."""
+        bad = np.full(4, 9, np.float32)
+        classifier = _RecordingClassifier(fail_on=bad)
+        batcher = InferenceBatcher(classifier, window_ms=50, max_batch=8)
+        results = self._submit_all(batcher, [np.ones(4, np.float32), bad])
+
+        assert results[0] == 1.0
+        assert isinstance(results[1], ValueError)
+        assert batcher.get_stats()["failed_batches"] == 2
+
+    def test_batch_matches_single_predictions(self):
+        """Test batched prediction equals predicting each recording alone."""
+        classifier = HeartSoundClassifier(model_path="missing.onnx")
+        recordings = [HeartSoundSimulator(seed=s).generate(12.0) for s in (1, 2)]
+        batched = classifier.predict_batch([(audio, None, None) for audio in recordings])
+        single = [classifier.predict(audio) for audio in recordings]
+
+        assert [r.probabilities for r in batched] == [r.probabilities for r in single]
+        assert [len(r.windows) for r in batched] == [2, 2]
+
+    def test_invalid_audio_gets_no_diagnosis(self):
+        """Test unusable recordings fail with their reason instead of a result."""
+        classifier = HeartSoundClassifier(model_path="missing.onnx")
+        silence = np.zeros(16000 * 6, np.float32)
+        with pytest.raises(InvalidAudioError):
+            classifier.predict(silence)
+
+        batcher = InferenceBatcher(classifier, window_ms=50, max_batch=8)
+        valid = HeartSoundSimulator(seed=1).generate(6.0)
+        results = self._submit_all(batcher, [valid, silence])
+        assert results[0].category in CATEGORIES
+        assert isinstance(results[1], InvalidAudioError) and results[1].reason
+        assert batcher.get_stats()["failed_batches"] == 0
+
+    def test_model_calls_run_on_inference_threads(self):
+        """Test batches run on the dedicated executor, not the default pool."""
+        classifier = _RecordingClassifier()
+        batcher = InferenceBatcher(classifier, window_ms=0, max_batch=1)
+        self._submit_all(batcher, [np.zeros(4, np.float32) for _ in range(2)])
+        assert all(name.startswith("inference") for name in classifier.threads)
+
+    def test_full_queue_rejected_as_busy(self):
+        """Test submissions beyond the admission limit fail fast with a retry hint."""
+        classifier = _RecordingClassifier()
+        batcher = InferenceBatcher(classifier, window_ms=0, max_batch=1, max_queue=2)
+        results = self._submit_all(batcher, [np.full(4, i, np.float32) for i in range(4)])
+
+        assert results[:2] == [0.0, 1.0]
+        assert all(isinstance(r, InferenceBusyError) for r in results[2:])
+        assert results[2].retry_after >= 1
+        stats = batcher.get_stats()
+        assert stats["rejected"] == 2 and stats["requests"] == 2
+
+    def test_queued_and_in_flight_counts(self):
+        """Test waiting requests queue behind a running batch and are counted."""
+        gate = threading.Event()
+        classifier = _RecordingClassifier(gate=gate)
+        batcher = InferenceBatcher(classifier, window_ms=0, max_batch=1, workers=1)
+
+        async def run():
+            tasks = [
+                asyncio.create_task(batcher.submit(np.full(4, i, np.float32)))
+                for i in range(3)
+            ]
+            await asyncio.sleep(0.1)
+            stats = batcher.get_stats()
+            gate.set()
+            return stats, await asyncio.gather(*tasks)
+
+        stats, results = asyncio.run(run())
+        assert stats["in_flight"] == 1 and stats["queue_depth"] == 2
+        assert results == [0.0, 1.0, 2.0]
+        assert batcher.get_stats()["in_flight"] == 0
+
+
+class TestResultCache:
+    """Tests for the content-addressed result cache."""
+
+    @staticmethod
+    def _result(category="normal"):
+        return HeartSoundClassifier(model_path="missing.onnx")._create_result(
+            category, 80.0, {category: 0.8}
+        )
+
+    def test_key_depends_on_content_and_model(self):
+        """Test identical buffers share a key; other audio or models do not."""
+        audio = HeartSoundSimulator(seed=1).generate(2.0)
+        changed = audio.copy()
+        changed[100] += 1
+
+        assert ResultCache.key(audio) == ResultCache.key(audio.copy())
+        assert ResultCache.key(audio) != ResultCache.key(changed)
+        assert ResultCache.key(audio) != ResultCache.key(audio.astype(np.float64))
+        assert ResultCache.key(audio, "v1") != ResultCache.key(audio, "v2")
+
+    def test_hit_returns_copy(self):
+        """Test a hit returns an equal result that callers may modify."""
+        cache = ResultCache(capacity=4)
+        cache.put("a", self._result())
+        first = cache.get("a")
+        first.bpm = 72.0
+
+        assert cache.get("a").bpm is None
+        assert cache.get("b") is None
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["misses"]) == (2, 1)
+
+    def test_least_recently_used_evicted(self):
+        """Test the entry not used for longest is evicted at capacity."""
+        cache = ResultCache(capacity=2)
+        cache.put("a", self._result())
+        cache.put("b", self._result())
+        cache.get("a")
+        cache.put("c", self._result())
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None and cache.get("c") is not None
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_persisted_across_restarts(self, tmp_path):
+        """Test results written to disk are loaded by a new cache."""
+        ResultCache(capacity=4, directory=str(tmp_path)).put("a", self._result("aortic_stenosis"))
+        (tmp_path / "broken.json").write_text("{")
+
+        cache = ResultCache(capacity=4, directory=str(tmp_path))
+        assert cache.get("a").category == "aortic_stenosis"
+        assert not (tmp_path / "broken.json").exists()
+
+    @staticmethod
+    def _classifier(session):
+        """Loaded classifier whose model calls go to ``session``."""
+        classifier = HeartSoundClassifier(model_path="missing.onnx", version="test")
+        classifier._model_loaded = True
+        classifier._session = session
+        classifier._input_name, classifier._output_name = "x", "y"
+        return classifier
+
+    @staticmethod
+    def _run_twice(monkeypatch, classifier, audio):
+        """Submit the same recording twice through run_inference."""
+        import core.registry
+
+        cache = ResultCache(capacity=4)
+        monkeypatch.setattr(core.inference, "_result_cache", cache)
+        monkeypatch.setattr(core.registry, "_registry", ModelRegistry())
+        monkeypatch.setattr(core.registry, "get_active_classifier", lambda: classifier)
+
+        async def run():
+            return [await run_inference(audio.copy()) for _ in range(2)]
+
+        return cache, asyncio.run(run())
+
+    def test_run_inference_skips_model_on_hit(self, monkeypatch):
+        """Test resubmitting identical audio does not reach the batcher."""
+        from core.batching import get_inference_batcher
+
+        class Session:
+            def run(self, outputs, feeds):
+                return [np.tile(np.arange(len(CATEGORIES), dtype=np.float32), (len(feeds["x"]), 1))]
+
+        audio = HeartSoundSimulator(seed=3).generate(6.0)
+        requests = get_inference_batcher().requests
+        cache, (first, second) = self._run_twice(monkeypatch, self._classifier(Session()), audio)
+
+        assert first == second and not first.simulated
+        assert get_inference_batcher().requests == requests + 1
+        assert cache.get_stats()["hits"] == 1
+
+    @pytest.mark.parametrize("mode", ["simulation", "model_error"])
+    def test_simulated_result_not_cached(self, monkeypatch, mode):
+        """Test random fallback results are never stored or served again."""
+        class Session:
+            def run(self, outputs, feeds):
+                raise RuntimeError("model failed")
+
+        classifier = self._classifier(Session() if mode == "model_error" else None)
+        audio = HeartSoundSimulator(seed=4).generate(6.0)
+        cache, (first, second) = self._run_twice(monkeypatch, classifier, audio)
+
+        assert first.simulated and second.simulated
+        assert cache.get_stats()["size"] == 0 and cache.get_stats()["hits"] == 0
+
+
+class TestOnnxRuntimeSession:
+    """Tests for tuned session options and the optimized-model cache."""
+
+    def test_session_options_from_settings(self, monkeypatch):
+        """Test thread counts, execution mode and optimization level are applied."""
+        ort = pytest.importorskip("onnxruntime")
+        monkeypatch.setattr(settings, "ORT_INTRA_OP_THREADS", 2)
+        monkeypatch.setattr(settings, "ORT_EXECUTION_MODE", "parallel")
+
+        options = session_options(ort, "basic")
+        assert options.intra_op_num_threads == 2
+        assert options.execution_mode == ort.ExecutionMode.ORT_PARALLEL
+        assert options.graph_optimization_level == ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+
+        with pytest.raises(ValueError):
+            session_options(ort, "aggressive")
+
+    def test_cache_path_keyed_by_content(self, tmp_path):
+        """Test the cache entry changes with model contents, version and level."""
+        model = tmp_path / "model.onnx"
+        model.write_bytes(b"first")
+        first = optimized_model_path(str(model), "1.17.0", "all", str(tmp_path))
+        assert first.parent == tmp_path and first.name.startswith("model.")
+
+        assert optimized_model_path(str(model), "1.18.0", "all", str(tmp_path)) != first
+        assert optimized_model_path(str(model), "1.17.0", "basic", str(tmp_path)) != first
+        model.write_bytes(b"second")
+        assert optimized_model_path(str(model), "1.17.0", "all", str(tmp_path)) != first
+
+    def test_model_variant_paths(self, tmp_path):
+        """Test variants live next to the fp32 model and fall back to it."""
+        model = tmp_path / "model.onnx"
+        assert variant_model_path(str(model), "fp32") == str(model)
+        assert variant_model_path(str(model), "int8_static") == str(tmp_path / "model.int8_static.onnx")
+        with pytest.raises(ValueError):
+            variant_model_path(str(model), "int4")
+
+        model.write_bytes(b"fp32")
+        assert resolve_model_path(str(model), "int8_dynamic") == str(model)
+        quantized = tmp_path / "model.int8_dynamic.onnx"
+        quantized.write_bytes(b"int8")
+        assert resolve_model_path(str(model), "int8_dynamic") == str(quantized)
+
+    def test_optimized_model_reused(self, tmp_path, monkeypatch):
+        """Test the first start writes the optimized graph and later starts load it."""
+        pytest.importorskip("onnxruntime")
+        onnx = pytest.importorskip("onnx")
+        from onnx import TensorProto, helper
+
+        graph = helper.make_graph(
+            [helper.make_node("Relu", ["x"], ["y"])],
+            "relu",
+            [helper.make_tensor_value_info("x", TensorProto.FLOAT, ["N", 8])],
+            [helper.make_tensor_value_info("y", TensorProto.FLOAT, ["N", 8])]
+        )
+        model_path = tmp_path / "relu.onnx"
+        onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)]), model_path)
+        monkeypatch.setattr(settings, "ORT_CACHE_DIR", str(tmp_path / "cache"))
+
+        _, first = create_session(str(model_path))
+        session, second = create_session(str(model_path))
+        assert not first["cache_hit"] and second["cache_hit"]
+        assert second["optimized_model"] == first["optimized_model"]
+        assert session.run(None, {"x": -np.ones((2, 8), np.float32)})[0].max() == 0
+
+
+class TestModelWarmUp:
+    """Tests for eager model loading and warm-up."""
+
+    def test_warm_up_records_timings(self):
+        """Test each warm-up run is timed and the input tensor is allocated."""
+        classifier = HeartSoundClassifier(model_path="missing.onnx")
+        timings = classifier.warm_up(3)
+
+        assert len(timings) == 3 and all(t >= 0 for t in timings)
+        status = classifier.get_status()
+        assert status["loaded"] and status["simulated"]
+        assert status["warmup_ms"] == timings
+        assert classifier._input_tensor(1).shape == (1, classifier.input_length)
+
+
+class TestModelRegistry:
+    """Tests for model hot swap and traffic splitting."""
+
+    @pytest.fixture
+    def active(self, monkeypatch):
+        """Simulated active model, restored after the test."""
+        classifier = HeartSoundClassifier(model_path="missing.onnx", version="v1")
+        monkeypatch.setattr(core.inference, "_classifier", classifier)
+        return classifier
+
+    def test_traffic_split(self, active):
+        """Test the candidate receives its share of new requests."""
+        registry = ModelRegistry()
+        registry.install(HeartSoundClassifier(model_path="missing.onnx", version="v2"), 25)
+        random.seed(0)
+        versions = [registry.route()[0] for _ in range(2000)]
+
+        assert 0.2 < versions.count("v2") / len(versions) < 0.3
+        stats = registry.get_stats()
+        assert stats["candidate"]["routed"] == versions.count("v2")
+        assert stats["active"]["traffic_percent"] == 75
+
+        registry.set_traffic(0)
+        assert {registry.route()[0] for _ in range(100)} == {"v1"}
+
+    def test_concurrent_routing_counts_every_request(self, active):
+        """Test requests routed from several threads are all counted."""
+        registry = ModelRegistry()
+        registry.install(HeartSoundClassifier(model_path="missing.onnx", version="v2"), 50)
+
+        def route():
+            for _ in range(2000):
+                registry.route()
+
+        threads = [threading.Thread(target=route) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = registry.get_stats()
+        assert stats["active"]["routed"] + stats["candidate"]["routed"] == 8 * 2000
+
+    def test_promote_keeps_in_flight_on_old_model(self, active):
+        """Test promotion switches new requests while routed ones keep their model."""
+        registry = ModelRegistry()
+        registry.install(HeartSoundClassifier(model_path="missing.onnx", version="v2"), 0)
+        _, in_flight = registry.route()
+        registry.promote()
+
+        assert in_flight is active
+        assert in_flight.predict(HeartSoundSimulator(seed=1).generate(6.0)).category
+        assert registry.route()[0] == "v2"
+        assert core.inference.get_classifier().version == "v2"
+        assert registry.get_stats()["candidate"] is None
+
+    def test_per_version_latency(self, active):
+        """Test each version reports latency of its own model calls."""
+        registry = ModelRegistry()
+        candidate = HeartSoundClassifier(model_path="missing.onnx", version="v2")
+        registry.install(candidate, 50)
+        candidate.predict_batch([(HeartSoundSimulator(seed=2).generate(6.0), None, None)] * 2)
+
+        stats = registry.get_stats()
+        assert stats["candidate"]["latency"]["calls"] == 1
+        assert stats["candidate"]["latency"]["recordings"] == 2
+        assert "p95_ms" in stats["candidate"]["latency"]
+        assert stats["active"]["latency"]["calls"] == 0
+
+    def test_deploy_rejects_unusable_models(self, active, tmp_path):
+        """Test missing files, deployed versions and non-ONNX files are refused."""
+        registry = ModelRegistry()
+        with pytest.raises(ValueError):
+            asyncio.run(registry.deploy(str(tmp_path / "missing.onnx"), "v2"))
+
+        broken = tmp_path / "broken.onnx"
+        broken.write_bytes(b"not a model")
+        with pytest.raises(ValueError):
+            asyncio.run(registry.deploy(str(broken), "v1"))
+        with pytest.raises(RuntimeError):
+            asyncio.run(registry.deploy(str(broken), "v2"))
+
+        assert registry.deployment["state"] == "failed"
+        assert registry.active_version == "v1"
+
+    def test_deploy_loads_and_swaps(self, active, tmp_path, monkeypatch):
+        """Test a real model is loaded, warmed and served as the new version."""
+        pytest.importorskip("onnxruntime")
+        onnx = pytest.importorskip("onnx")
+        from onnx import TensorProto, helper, numpy_helper
+
+        length = settings.MODEL_INPUT_LENGTH
+        weights = np.random.default_rng(0).standard_normal((length, 5)).astype(np.float32)
+        graph = helper.make_graph(
+            [helper.make_node("MatMul", ["x", "w"], ["y"])],
+            "linear",
+            [helper.make_tensor_value_info("x", TensorProto.FLOAT, ["N", length])],
+            [helper.make_tensor_value_info("y", TensorProto.FLOAT, ["N", 5])],
+            [numpy_helper.from_array(weights, "w")]
+        )
+        model_path = tmp_path / "linear.onnx"
+        onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)]), model_path)
+        monkeypatch.setattr(settings, "ORT_CACHE_ENABLED", False)
+
+        registry = ModelRegistry()
+        classifier = asyncio.run(registry.deploy(str(model_path), "v2"))
+
+        assert registry.active_version == "v2"
+        assert not classifier.get_status()["simulated"]
+        assert len(classifier.warmup_ms) == settings.MODEL_WARMUP_RUNS
@@ -3,6 +3,7 @@
 HeartSound WebSocket Tests
 心音智鉴WebSocket测试用例
 """
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 from starlette.testclient import TestClient as StarletteTestClient
@@ -13,6 +14,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from main import app
+from utils.frame_codec import FRAME_HEADER, FrameEncoder, decode_frame
 
 
 class TestDetectionAPI:
@@ -104,6 +106,28 @@ class TestDetectionAPI:
         assert "confidence" in data["result"]
         assert "health_advice" in data["result"]
 
+    def test_trigger_analysis_busy(self, monkeypatch):
+        """Test a full inference queue returns 503 with Retry-After."""
+        import api.detection
+        from core.batching import InferenceBusyError
+
+        async def busy(*args, **kwargs):
+            raise InferenceBusyError(retry_after=3, queued=8)
+
+        monkeypatch.setattr(api.detection, "run_inference", busy)
+        session_id = self.client.post(
+            "/api/detection/start", json={"duration": 10}
+        ).json()["session_id"]
+
+        response = self.client.post(f"/api/detection/{session_id}/analyze")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "3"
+        assert response.json()["detail"]["error"] == "inference_busy"
+        # Session left pending, so the analysis can be retried
+        monkeypatch.undo()
+        response = self.client.post(f"/api/detection/{session_id}/analyze")
+        assert response.status_code == 200
+
     def test_cancel_detection(self):
         """Test cancelling a detection session."""
         # Create session
@@ -179,6 +203,193 @@ class TestWebSocketConnection:
             assert data["type"] == "status"
             assert data["status"] == "recording"
 
+    def test_binary_frame_format(self):
+        """Test frames use the encoding negotiated at connect."""
+        client = TestClient(app)
+
+        url = "/ws/audio/test_session_004?frame_encoding=uint8&frame_transport=binary"
+        with client.websocket_connect(url) as websocket:
+            data = websocket.receive_json()
+            assert data["frame_format"]["encoding"] == "uint8"
+
+            websocket.send_json({"command": "start", "duration": 1})
+            assert websocket.receive_json()["status"] == "recording"
+
+            frame = decode_frame(websocket.receive_bytes())
+            assert frame["sequence"] == 1
+            assert frame["encoding"] == "uint8"
+            assert len(frame["waveform"]) == 50
+
+    def test_analysis_complete_flags_simulated_result(self):
+        """Test the result message tells a simulated diagnosis from a model one."""
+        client = TestClient(app)
+
+        with client.websocket_connect("/ws/audio/test_session_005") as websocket:
+            websocket.receive_json()
+            websocket.send_json({"command": "start", "duration": 1})
+
+            data = websocket.receive_json()
+            while data["type"] not in ("analysis_complete", "error"):
+                data = websocket.receive_json()
+
+        assert data["type"] == "analysis_complete"
+        # No model file in the test environment
+        assert data["result"]["simulated"] is True
+        assert data["result"]["category"]
+
+    @staticmethod
+    def _allow_test_client(monkeypatch):
+        """Treat the TestClient's host as a loopback client."""
+        import api.websocket
+        monkeypatch.setattr(
+            api.websocket, "LOOPBACK_HOSTS", api.websocket.LOOPBACK_HOSTS | {"testclient"}
+        )
+
+    def test_capture_stream_rejects_remote_clients(self):
+        """Test only loopback clients may tap the raw microphone stream."""
+        from starlette.websockets import WebSocketDisconnect
+        client = TestClient(app)
+
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            with client.websocket_connect("/ws/capture?name=remote") as websocket:
+                websocket.receive_json()
+        assert exc_info.value.code == 1008
+
+    def test_capture_stream_without_device(self, monkeypatch):
+        """Test raw capture stream reports a missing capture device."""
+        self._allow_test_client(monkeypatch)
+        client = TestClient(app)
+
+        with client.websocket_connect("/ws/capture?name=test") as websocket:
+            data = websocket.receive_json()
+            assert data["type"] == "error"
+            assert data["error"] == "no_capture_device"
+
+    def test_capture_stream_keepalive_and_release(self, monkeypatch):
+        """Test an idle capture stream sends keepalives and unsubscribes on close."""
+        import time
+        import api.websocket
+        from core.ring_buffer import AudioRingBuffer
+
+        ring = AudioRingBuffer(capacity=1600)
+
+        class IdleCapture:
+            sample_rate = 16000
+
+            def subscribe(self, name, max_seconds=None):
+                return ring.add_reader(name)
+
+            def unsubscribe(self, reader):
+                reader.close()
+
+        monkeypatch.setattr(api.websocket, "get_capture_service", lambda: IdleCapture())
+        self._allow_test_client(monkeypatch)
+        client = TestClient(app)
+
+        with client.websocket_connect("/ws/capture?name=idle") as websocket:
+            assert websocket.receive_json()["type"] == "format"
+            assert len(ring.readers) == 1
+            assert websocket.receive_bytes() == b""
+
+        deadline = time.monotonic() + 5
+        while ring.readers and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert ring.readers == ()
+
+
+class TestFrameCodec:
+    """Tests for compact waveform frame encodings."""
+
+    FRAME = {
+        "timestamp": "2026-01-01T00:00:00",
+        "waveform": np.linspace(0.0, 1.0, 50),
+        "amplitude": 0.1234,
+        "remaining_seconds": 12
+    }
+
+    def test_json_is_default(self):
+        """Test the default encoding keeps the original JSON message."""
+        message = FrameEncoder().encode(self.FRAME)
+        assert message["type"] == "audio_frame"
+        assert message["data"][-1] == 1.0
+        assert message["amplitude"] == 0.1234
+        assert "channels" not in message
+
+    def test_json_forwards_channels(self):
+        """Test multi-channel frames keep their per-channel data in JSON."""
+        from utils.audio_utils import waveform_frame
+
+        audio = np.stack([0.1 * np.ones(400), 0.5 * np.ones(400)], axis=1).astype(np.float32)
+        frame = dict(self.FRAME, **waveform_frame(audio))
+        message = FrameEncoder().encode(frame)
+
+        assert [c["amplitude"] for c in message["channels"]] == [0.1, 0.5]
+        assert len(message["channels"][0]["waveform"]) == 50
+
+    @pytest.mark.parametrize("encoding,size,tolerance", [
+        ("uint8", 50, 1 / 255), ("int16", 100, 1 / 32767), ("float16", 100, 1e-3)
+    ])
+    def test_packed_round_trip(self, encoding, size, tolerance):
+        """Test header fields and quantized points survive a round trip."""
+        encoder = FrameEncoder(encoding)
+        encoder.encode(self.FRAME)
+        packed = encoder.encode(self.FRAME)
+
+        assert len(packed) == FRAME_HEADER.size + size
+        frame = decode_frame(packed)
+        assert frame["sequence"] == 2
+        assert frame["remaining_seconds"] == 12
+        assert frame["amplitude"] == pytest.approx(0.1234, rel=1e-6)
+        assert np.allclose(frame["waveform"], self.FRAME["waveform"], atol=tolerance)
+
+    def test_packed_frames_are_mono(self):
+        """Test packed frames carry only the mixdown of multi-channel audio."""
+        from utils.audio_utils import waveform_frame
+
+        audio = np.stack([0.1 * np.ones(400), 0.5 * np.ones(400)], axis=1).astype(np.float32)
+        stereo = dict(self.FRAME, **waveform_frame(audio))
+        mono = dict(self.FRAME, **waveform_frame(audio, per_channel=False))
+
+        assert "channel_amplitudes" not in mono
+        packed = FrameEncoder("uint8").encode(stereo)
+        assert len(packed) == FRAME_HEADER.size + 50
+        assert packed == FrameEncoder("uint8").encode(mono)
+        assert decode_frame(packed)["amplitude"] == pytest.approx(0.3)
+
+    def test_quality_in_frames(self):
+        """Test the quality score travels in JSON and packed frames."""
+        frame = dict(self.FRAME, quality={"score": 0.5, "issue": "speech"})
+
+        message = FrameEncoder().encode(frame)
+        assert message["quality"] == 0.5
+        assert message["quality_issue"] == "speech"
+
+        assert decode_frame(FrameEncoder("int16").encode(frame))["quality"] == pytest.approx(0.5)
+        assert decode_frame(FrameEncoder("int16").encode(self.FRAME))["quality"] is None
+
+    def test_heart_rate_in_frames(self):
+        """Test BPM and beat markers travel in JSON and packed frames."""
+        beats = [{"time": 1.25, "sound": "S1"}]
+        frame = dict(self.FRAME, bpm=72, beats=beats)
+
+        message = FrameEncoder().encode(frame)
+        assert message["bpm"] == 72
+        assert message["beats"] == beats
+
+        assert decode_frame(FrameEncoder("uint8").encode(frame))["bpm"] == 72
+        assert decode_frame(FrameEncoder("uint8").encode(self.FRAME))["bpm"] is None
+
+    def test_base64_transport(self):
+        """Test base64 transport wraps the same bytes in JSON."""
+        message = FrameEncoder("uint8", "base64").encode(self.FRAME)
+        assert message["encoding"] == "uint8"
+        assert decode_frame(message["payload"])["sequence"] == 1
+
+    def test_invalid_format(self):
+        """Test unknown encodings are rejected."""
+        with pytest.raises(ValueError):
+            FrameEncoder.from_params({"frame_encoding": "mp3"})
+
 
 class TestCoreModules:
     """Tests for core module imports."""
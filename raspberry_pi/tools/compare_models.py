@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Model Variant Comparison
+心音智鉴模型变体对比工具
+
+Runs the fp32 model and a quantized variant on the same model inputs
+and reports whether the switch can be trusted:
+
+- agreement: share of recordings (and windows) where the variant's top
+  class equals the fp32 top class, overall and per fp32 class
+- drift: mean / max absolute probability difference and mean KL
+  divergence of the recording-level probabilities
+- latency: median and p95 per window (batch 1) and per recording
+  (all windows in one call, if the model has a dynamic batch axis)
+- model file size
+
+Usage:
+    python tools/compare_models.py --variant int8_dynamic [--simulated 60] [--json report.json]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import settings
+from core.inference import CATEGORIES
+from core.runtime import MODEL_VARIANTS, create_session, variant_model_path
+from tools.model_data import build_dataset, model_inputs
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def run_model(model_path: str, inputs: list[np.ndarray]) -> dict:
+    """Window probabilities and latencies of one model over all inputs."""
+    session, _ = create_session(model_path)
+    model_input = session.get_inputs()[0]
+    input_name, output_name = model_input.name, session.get_outputs()[0].name
+    dynamic_batch = not isinstance(model_input.shape[0], int)
+
+    # Warm-up so the first timing is not a cold start
+    session.run([output_name], {input_name: inputs[0][:1]})
+
+    window_probs, window_ms, recording_ms = [], [], []
+    for batch in inputs:
+        rows = []
+        for row in batch:
+            started = time.perf_counter()
+            rows.append(session.run([output_name], {input_name: row[np.newaxis]})[0][0])
+            window_ms.append(1000 * (time.perf_counter() - started))
+        window_probs.append(softmax(np.array(rows)))
+
+        if dynamic_batch:
+            started = time.perf_counter()
+            session.run([output_name], {input_name: batch})
+            recording_ms.append(1000 * (time.perf_counter() - started))
+
+    return {
+        "window_probs": window_probs,
+        "window_ms": np.array(window_ms),
+        "recording_ms": np.array(recording_ms),
+        "size_mb": Path(model_path).stat().st_size / 1e6,
+    }
+
+
+def latency_summary(values: np.ndarray) -> dict:
+    if len(values) == 0:
+        return {}
+    return {"median_ms": round(float(np.median(values)), 3),
+            "p95_ms": round(float(np.percentile(values, 95)), 3)}
+
+
+def compare(reference: dict, candidate: dict) -> dict:
+    """Agreement and probability drift of candidate vs. reference."""
+    categories = list(CATEGORIES)
+    ref_rec = np.array([p.mean(axis=0) for p in reference["window_probs"]])
+    cand_rec = np.array([p.mean(axis=0) for p in candidate["window_probs"]])
+    ref_top, cand_top = ref_rec.argmax(axis=1), cand_rec.argmax(axis=1)
+
+    ref_windows = np.concatenate(reference["window_probs"])
+    cand_windows = np.concatenate(candidate["window_probs"])
+
+    per_class = {}
+    for index, name in enumerate(categories):
+        mask = ref_top == index
+        if mask.any():
+            per_class[name] = {
+                "recordings": int(mask.sum()),
+                "agreement": round(float(np.mean(cand_top[mask] == index)), 4),
+            }
+
+    difference = np.abs(ref_rec - cand_rec)
+    kl = np.sum(ref_rec * np.log((ref_rec + 1e-9) / (cand_rec + 1e-9)), axis=1)
+    return {
+        "recordings": len(ref_rec),
+        "windows": len(ref_windows),
+        "agreement": round(float(np.mean(ref_top == cand_top)), 4),
+        "window_agreement": round(
+            float(np.mean(ref_windows.argmax(axis=1) == cand_windows.argmax(axis=1))), 4
+        ),
+        "per_class": per_class,
+        "mean_abs_drift": round(float(difference.mean()), 5),
+        "max_abs_drift": round(float(difference.max()), 5),
+        "mean_kl": round(float(kl.mean()), 6),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a quantized model variant with fp32")
+    parser.add_argument("--model", default=settings.MODEL_PATH, help="fp32 ONNX model")
+    parser.add_argument("--variant", choices=MODEL_VARIANTS[1:], default="int8_dynamic")
+    parser.add_argument("--recordings", help="directory of WAV files / recording spools")
+    parser.add_argument("--simulated", type=int, default=60, help="simulated recordings")
+    parser.add_argument("--seconds", type=float, default=15.0,
+                        help="length of simulated recordings")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    variant_path = variant_model_path(args.model, args.variant)
+    if not Path(variant_path).exists():
+        raise SystemExit(f"{variant_path} not found; run tools/quantize_model.py first")
+
+    recordings = build_dataset(args.recordings, args.simulated, args.seconds)
+    inputs = [batch for _, batch in model_inputs(recordings)]
+
+    reference = run_model(args.model, inputs)
+    candidate = run_model(variant_path, inputs)
+
+    report = compare(reference, candidate)
+    report["models"] = {
+        name: {
+            "path": path,
+            "size_mb": round(result["size_mb"], 2),
+            "window": latency_summary(result["window_ms"]),
+            "recording": latency_summary(result["recording_ms"]),
+        }
+        for name, path, result in (
+            ("fp32", args.model, reference),
+            (args.variant, variant_path, candidate),
+        )
+    }
+
+    print(f"{report['recordings']} recordings, {report['windows']} windows")
+    print(f"Top-1 agreement: {report['agreement']:.1%} (windows {report['window_agreement']:.1%})")
+    for name, row in report["per_class"].items():
+        print(f"  {name:<20}{row['agreement']:>8.1%}  ({row['recordings']} recordings)")
+    print(f"Probability drift: mean {report['mean_abs_drift']:.4f}, "
+          f"max {report['max_abs_drift']:.4f}, KL {report['mean_kl']:.5f}")
+    print(f"{'model':<16}{'size MB':>9}{'window p50':>12}{'p95':>9}{'recording p50':>15}")
+    for name, row in report["models"].items():
+        print(f"{name:<16}{row['size_mb']:>9.2f}"
+              f"{row['window'].get('median_ms', 0):>12.2f}{row['window'].get('p95_ms', 0):>9.2f}"
+              f"{row['recording'].get('median_ms', float('nan')):>15.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Model Tooling Data
+心音智鉴模型工具数据集
+
+Recordings for quantization calibration and model comparison: stored
+recordings (WAV files and recording spools in a directory) and/or
+simulated heart sounds covering every simulator preset. Recordings are
+turned into model inputs by the classifier itself, so the tools see
+exactly the windows and features used in production.
+"""
+import sys
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import settings
+from core.inference import HeartSoundClassifier
+from core.simulator import HeartSoundSimulator, SIMULATOR_PRESETS
+from core.spool import META_SUFFIX, RecordingSpool
+from utils.dsp import StreamingResampler
+
+
+def load_recordings(directory: str) -> list[tuple[str, np.ndarray]]:
+    """
+    Load WAV files and recording spools from a directory.
+    加载目录中的WAV文件和录音缓存
+
+    Returns:
+        (name, int16 or float samples) pairs at AUDIO_SAMPLE_RATE
+    """
+    from scipy.io import wavfile
+
+    recordings = []
+    for path in sorted(Path(directory).glob("*.wav")):
+        rate, audio = wavfile.read(path)
+        if rate != settings.AUDIO_SAMPLE_RATE:
+            channels = 1 if audio.ndim == 1 else audio.shape[1]
+            audio = StreamingResampler(rate, settings.AUDIO_SAMPLE_RATE, channels).process(audio)
+        recordings.append((path.name, audio))
+
+    for meta_path in sorted(Path(directory).glob(f"*{META_SUFFIX}")):
+        try:
+            spool = RecordingSpool.load(meta_path)
+        except ValueError as e:
+            print(f"Skipping {meta_path.name}: {e}")
+            continue
+        recordings.append((spool.spool_id, np.array(spool.get_audio_data())))
+    return recordings
+
+
+def simulated_recordings(
+    count: int,
+    seconds: float = 15.0,
+    seed: int = 0
+) -> list[tuple[str, np.ndarray]]:
+    """
+    Simulated recordings cycling through every preset, with varied rate
+    and noise level.
+    生成覆盖全部预设的模拟录音
+    """
+    rng = np.random.default_rng(seed)
+    presets = list(SIMULATOR_PRESETS)
+    recordings = []
+    for i in range(count):
+        preset = presets[i % len(presets)]
+        simulator = HeartSoundSimulator(
+            preset,
+            bpm=float(rng.uniform(55, 110)),
+            sample_rate=settings.AUDIO_SAMPLE_RATE,
+            snr_db=float(rng.uniform(10, 30)),
+            seed=int(rng.integers(2 ** 31))
+        )
+        recordings.append((f"{preset}-{i}", simulator.generate(seconds)))
+    return recordings
+
+
+def build_dataset(
+    recordings_dir: Optional[str],
+    simulated: int,
+    seconds: float = 15.0
+) -> list[tuple[str, np.ndarray]]:
+    """Stored recordings (if a directory is given) plus simulated ones."""
+    recordings = load_recordings(recordings_dir) if recordings_dir else []
+    recordings += simulated_recordings(simulated, seconds)
+    if not recordings:
+        raise SystemExit("No recordings: pass --recordings and/or --simulated N")
+    return recordings
+
+
+def model_inputs(
+    recordings: list[tuple[str, np.ndarray]],
+    classifier: Optional[HeartSoundClassifier] = None
+) -> list[tuple[str, np.ndarray]]:
+    """
+    Model input windows of each recording, as the classifier builds them.
+    按分类器的方式构建各录音的模型输入窗口
+
+    Returns:
+        (name, batch array shaped (windows, ...)) pairs
+    """
+    classifier = classifier or HeartSoundClassifier(model_path="unused.onnx")
+    return [(name, classifier.build_input(audio).copy()) for name, audio in recordings]
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound INT8 Model Quantization
+心音智鉴模型INT8量化工具
+
+Produces the INT8 variants selected with ``MODEL_VARIANT``:
+
+- ``int8_dynamic``: weights quantized offline, activations quantized at
+  run time. No calibration data needed.
+- ``int8_static``: weights and activations quantized offline (QDQ format,
+  uint8 activations / int8 weights). Activation ranges are calibrated on
+  model inputs built from stored and/or simulated recordings.
+
+The output is written next to the fp32 model as
+``<model>.<variant>.onnx``; compare it with tools/compare_models.py
+before switching the setting.
+
+Usage:
+    python tools/quantize_model.py --mode dynamic
+    python tools/quantize_model.py --mode static --recordings spool/ --simulated 60
+
+Requires the ``onnx`` package in addition to onnxruntime.
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import settings
+from core.runtime import variant_model_path
+from tools.model_data import build_dataset, model_inputs
+
+
+def calibration_reader(model_path: str, inputs: list[np.ndarray]):
+    """Feed calibration windows one at a time (works for fixed-batch models)."""
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationDataReader
+
+    input_name = ort.InferenceSession(
+        model_path, providers=["CPUExecutionProvider"]
+    ).get_inputs()[0].name
+
+    class WindowReader(CalibrationDataReader):
+        def __init__(self):
+            self._rows = (row[np.newaxis] for batch in inputs for row in batch)
+
+        def get_next(self):
+            row = next(self._rows, None)
+            return None if row is None else {input_name: row}
+
+    return WindowReader()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize the heart sound model to INT8")
+    parser.add_argument("--model", default=settings.MODEL_PATH, help="fp32 ONNX model")
+    parser.add_argument("--mode", choices=("dynamic", "static"), default="dynamic")
+    parser.add_argument("--recordings", help="directory of WAV files / recording spools")
+    parser.add_argument("--simulated", type=int, default=36,
+                        help="simulated calibration recordings (static mode)")
+    parser.add_argument("--seconds", type=float, default=15.0,
+                        help="length of simulated recordings")
+    parser.add_argument("--per-channel", action="store_true",
+                        help="per-channel weight scales (more accurate, larger)")
+    parser.add_argument("--output", help="output path (default: variant name next to model)")
+    args = parser.parse_args()
+
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    variant = f"int8_{args.mode}"
+    output = args.output or variant_model_path(args.model, variant)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Shape inference and graph cleanup make more nodes quantizable
+        prepared = str(Path(tmp) / "prepared.onnx")
+        quant_pre_process(args.model, prepared)
+
+        if args.mode == "dynamic":
+            quantize_dynamic(
+                prepared,
+                output,
+                weight_type=QuantType.QInt8,
+                per_channel=args.per_channel
+            )
+        else:
+            recordings = build_dataset(args.recordings, args.simulated, args.seconds)
+            inputs = [batch for _, batch in model_inputs(recordings)]
+            windows = sum(len(batch) for batch in inputs)
+            print(f"Calibrating on {windows} windows from {len(recordings)} recordings")
+            quantize_static(
+                prepared,
+                output,
+                calibration_reader(prepared, inputs),
+                quant_format=QuantFormat.QDQ,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+                per_channel=args.per_channel
+            )
+
+    fp32_size = Path(args.model).stat().st_size
+    int8_size = Path(output).stat().st_size
+    print(f"Wrote {output}")
+    print(f"Size: {fp32_size / 1e6:.2f} MB -> {int8_size / 1e6:.2f} MB "
+          f"({int8_size / fp32_size:.0%})")
+    print(f"Compare: python tools/compare_models.py --variant {variant}")
+
+
+if __name__ == "__main__":
+    main()
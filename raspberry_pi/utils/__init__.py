@@ -5,12 +5,34 @@ HeartSound Utils Package
 """
 from utils.network import get_local_ip, generate_qr_code
 from utils.audio_utils import (
+    pcm16_to_float32,
+    float_to_pcm16,
     normalize_audio,
     calculate_rms,
+    channel_rms,
+    mix_channels,
     extract_waveform_points,
+    extract_channel_waveforms,
+    extract_waveform_batch,
+    waveform_frame,
+    frame_channels,
     audio_to_base64_frame,
     preprocess_for_inference,
-    is_audio_valid
+    preprocess_into,
+    preprocess_windows_into,
+    window_starts,
+    is_audio_valid,
+    AudioStats
+)
+from utils.frame_codec import FrameEncoder, decode_frame, FRAME_ENCODINGS
+from utils.dsp import StreamingResampler, StreamingBandpass
+from utils.features import (
+    FeatureExtractor,
+    StreamingSpectrogram,
+    stft_power,
+    mel_filterbank,
+    dct_matrix,
+    FEATURE_TYPES
 )
 
 __all__ = [
@@ -18,10 +40,36 @@ __all__ = [
     "get_local_ip",
     "generate_qr_code",
     # Audio Utils
+    "pcm16_to_float32",
+    "float_to_pcm16",
     "normalize_audio",
     "calculate_rms",
+    "channel_rms",
+    "mix_channels",
     "extract_waveform_points",
+    "extract_channel_waveforms",
+    "extract_waveform_batch",
+    "waveform_frame",
+    "frame_channels",
     "audio_to_base64_frame",
     "preprocess_for_inference",
+    "preprocess_into",
+    "preprocess_windows_into",
+    "window_starts",
     "is_audio_valid",
+    "AudioStats",
+    # Frame codec
+    "FrameEncoder",
+    "decode_frame",
+    "FRAME_ENCODINGS",
+    # Streaming DSP
+    "StreamingResampler",
+    "StreamingBandpass",
+    # Feature extraction
+    "FeatureExtractor",
+    "StreamingSpectrogram",
+    "stft_power",
+    "mel_filterbank",
+    "dct_matrix",
+    "FEATURE_TYPES",
 ]
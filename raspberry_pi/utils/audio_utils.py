@@ -9,6 +9,37 @@ import logging
 
 logger = logging.getLogger("heartsound.audio_utils")
 
+# Full scale of 16-bit PCM samples
+PCM16_SCALE = 32768.0
+
+
+def pcm16_to_float32(
+    audio_data: np.ndarray,
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Convert int16 PCM samples to float32 in [-1, 1].
+    将int16 PCM采样转换为[-1, 1]范围的float32
+
+    Float input is returned unchanged (or copied into ``out``).
+    """
+    if out is None:
+        out = np.empty(audio_data.shape, dtype=np.float32)
+    if np.issubdtype(audio_data.dtype, np.integer):
+        np.multiply(audio_data, 1.0 / PCM16_SCALE, out=out, casting="unsafe")
+    else:
+        out[...] = audio_data
+    return out
+
+
+def float_to_pcm16(audio_data: np.ndarray) -> np.ndarray:
+    """
+    Convert float samples in [-1, 1] to int16 PCM (with clipping).
+    将[-1, 1]范围的浮点采样转换为int16 PCM（带削波）
+    """
+    scaled = np.clip(audio_data * PCM16_SCALE, -PCM16_SCALE, PCM16_SCALE - 1)
+    return scaled.astype(np.int16)
+
 
 def normalize_audio(audio_data: np.ndarray) -> np.ndarray:
     """
@@ -18,6 +49,9 @@ def normalize_audio(audio_data: np.ndarray) -> np.ndarray:
     if audio_data.size == 0:
         return audio_data
 
+    if np.issubdtype(audio_data.dtype, np.integer):
+        audio_data = audio_data.astype(np.float32)
+
     max_val = np.abs(audio_data).max()
     if max_val > 0:
         return audio_data / max_val
@@ -28,10 +62,135 @@ def calculate_rms(audio_data: np.ndarray) -> float:
     """
     Calculate Root Mean Square of audio signal.
     计算音频信号的RMS值
+
+    Integer (int16 PCM) input is scaled to the [-1, 1] range.
     """
     if audio_data.size == 0:
         return 0.0
-    return float(np.sqrt(np.mean(audio_data ** 2)))
+    rms = float(np.sqrt(np.mean(np.square(audio_data, dtype=np.float64))))
+    if np.issubdtype(audio_data.dtype, np.integer):
+        rms /= PCM16_SCALE
+    return rms
+
+
+def channel_rms(audio_data: np.ndarray) -> np.ndarray:
+    """
+    Calculate RMS of each channel of (frames, channels) audio.
+    计算多声道音频各声道的RMS值
+
+    Integer (int16 PCM) input is scaled to the [-1, 1] range.
+    """
+    data = audio_data[:, np.newaxis] if audio_data.ndim == 1 else audio_data
+    if len(data) == 0:
+        return np.zeros(data.shape[1])
+    rms = np.sqrt(np.mean(np.square(data, dtype=np.float64), axis=0))
+    if np.issubdtype(audio_data.dtype, np.integer):
+        rms /= PCM16_SCALE
+    return rms
+
+
+def mix_channels(audio_data: np.ndarray, mode: str = "mean") -> np.ndarray:
+    """
+    Reduce (frames, channels) audio to a single channel.
+    将多声道音频合并为单声道
+
+    Args:
+        audio_data: Samples shaped (frames, channels); 1-D input is returned as is
+        mode: "mean" (mixdown), "best" (channel with the highest RMS)
+            or a channel index
+
+    Returns:
+        1-D array in the input dtype
+    """
+    if audio_data.ndim == 1:
+        return audio_data
+    if audio_data.shape[1] == 1:
+        return audio_data[:, 0]
+
+    mode = str(mode).strip().lower()
+    if mode == "mean":
+        mixed = audio_data.mean(axis=1, dtype=np.float32)
+        if np.issubdtype(audio_data.dtype, np.integer):
+            mixed = np.rint(mixed)
+        return mixed.astype(audio_data.dtype, copy=False)
+    if mode == "best":
+        return audio_data[:, int(np.argmax(channel_rms(audio_data)))]
+    if mode.isdigit() and int(mode) < audio_data.shape[1]:
+        return audio_data[:, int(mode)]
+    raise ValueError(f"Invalid channel mix mode: {mode}")
+
+
+def _peak_envelope(data: np.ndarray, num_points: int, axis: int) -> np.ndarray:
+    """
+    Peak absolute value of ``num_points`` consecutive bins along ``axis``.
+
+    Bins start at ``i * n // num_points``, so their sizes differ by at most
+    one sample and no tail samples are dropped. Shorter inputs yield one
+    sample per point followed by zeros.
+    """
+    n = data.shape[axis]
+    shape = list(data.shape)
+    shape[axis] = num_points
+    if n == 0:
+        return np.zeros(shape)
+
+    if n >= num_points:
+        edges = (np.arange(num_points) * n) // num_points
+        # max/min instead of abs: no temporary, and no int16 overflow at -32768
+        high = np.maximum.reduceat(data, edges, axis=axis)
+        low = np.minimum.reduceat(data, edges, axis=axis)
+        return np.maximum(high, -low.astype(np.float64))
+
+    envelope = np.zeros(shape)
+    index = [slice(None)] * data.ndim
+    index[axis] = slice(0, n)
+    envelope[tuple(index)] = np.abs(data.astype(np.float64))
+    return envelope
+
+
+def _normalize_rows(points: np.ndarray) -> np.ndarray:
+    """Scale each row to a peak of 1 (all-zero rows stay zero)."""
+    peak = points.max(axis=-1, keepdims=True)
+    np.divide(points, peak, out=points, where=peak > 0)
+    return points
+
+
+def extract_waveform_batch(
+    chunks: np.ndarray,
+    num_points: int = 100
+) -> np.ndarray:
+    """
+    Extract waveform points for many chunks in one call.
+    批量提取波形可视化点
+
+    Args:
+        chunks: Array shaped (n_chunks, samples), e.g. consecutive frames
+            or one frame per session
+        num_points: Number of points per chunk
+
+    Returns:
+        Array shaped (n_chunks, num_points), each row normalized to [0, 1]
+    """
+    return _normalize_rows(_peak_envelope(chunks, num_points, axis=1))
+
+
+def extract_channel_waveforms(
+    audio_data: np.ndarray,
+    num_points: int = 100
+) -> np.ndarray:
+    """
+    Extract waveform points for every channel at once.
+    同时提取各声道的波形可视化点
+
+    Args:
+        audio_data: Samples, 1-D or shaped (frames, channels)
+        num_points: Number of points per channel
+
+    Returns:
+        Array shaped (channels, num_points), each row normalized to [0, 1]
+    """
+    data = audio_data[:, np.newaxis] if audio_data.ndim == 1 else audio_data
+    return _normalize_rows(_peak_envelope(data, num_points, axis=0).T)
 
 
 def extract_waveform_points(
@@ -49,56 +208,144 @@ def extract_waveform_points(
     Returns:
         List of normalized amplitude values for waveform display
     """
-    if audio_data.size == 0:
-        return [0.0] * num_points
-
-    # Downsample to num_points
-    chunk_size = max(1, len(audio_data) // num_points)
-    points = []
-
-    for i in range(num_points):
-        start_idx = i * chunk_size
-        end_idx = min((i + 1) * chunk_size, len(audio_data))
-        if start_idx < len(audio_data):
-            chunk = audio_data[start_idx:end_idx]
-            # Use max absolute value for visual amplitude
-            points.append(float(np.abs(chunk).max()))
-        else:
-            points.append(0.0)
-
-    # Normalize points
-    max_point = max(points) if points else 1.0
-    if max_point > 0:
-        points = [p / max_point for p in points]
+    return extract_channel_waveforms(audio_data.reshape(-1), num_points)[0].tolist()
 
-    return points
+
+def waveform_frame(
+    audio_chunk: np.ndarray,
+    sample_rate: int = 16000,
+    num_points: int = 50,
+    per_channel: bool = True,
+    channel_mix: str = "mean"
+) -> dict:
+    """
+    Compute display data for one audio frame, as NumPy values.
+    计算单个音频帧的显示数据（NumPy格式）
+
+    Multi-channel chunks shaped (frames, channels) are shown as their
+    mixdown, with per-channel levels and waveforms added.
+
+    Args:
+        audio_chunk: Audio data chunk
+        sample_rate: Sample rate in Hz
+        num_points: Number of waveform points
+        per_channel: Add per-channel data (skip it for mono-only consumers)
+        channel_mix: Mixdown mode, as for :func:`mix_channels`; pass the
+            one used for analysis so the display shows the analysed signal
+
+    Returns:
+        Dict with ``amplitude`` (float), ``waveform`` (float array in
+        [0, 1]), ``sample_rate`` and, for multi-channel input,
+        ``channel_amplitudes`` and ``channel_waveforms``
+    """
+    mono = mix_channels(audio_chunk, channel_mix)
+    frame = {
+        "amplitude": calculate_rms(mono),
+        "waveform": extract_channel_waveforms(mono, num_points)[0],
+        "sample_rate": sample_rate
+    }
+
+    if per_channel and audio_chunk.ndim == 2 and audio_chunk.shape[1] > 1:
+        frame["channel_amplitudes"] = channel_rms(audio_chunk)
+        frame["channel_waveforms"] = extract_channel_waveforms(audio_chunk, num_points)
+
+    return frame
 
 
 def audio_to_base64_frame(
     audio_chunk: np.ndarray,
-    sample_rate: int = 16000
+    sample_rate: int = 16000,
+    channel_mix: str = "mean"
 ) -> dict:
     """
     Convert audio chunk to a frame dict for WebSocket transmission.
     将音频块转换为WebSocket传输的帧字典
 
+    JSON-ready version of :func:`waveform_frame`; per-channel data is
+    listed under ``channels``. Compact binary encodings live in
+    utils.frame_codec.
+
     Args:
         audio_chunk: Audio data chunk
         sample_rate: Sample rate in Hz
+        channel_mix: Mixdown mode for multi-channel chunks
 
     Returns:
         Dict containing waveform and amplitude data
     """
-    # Calculate amplitude and waveform for visualization
-    amplitude = calculate_rms(audio_chunk)
-    waveform = extract_waveform_points(audio_chunk, num_points=50)
+    raw = waveform_frame(audio_chunk, sample_rate, channel_mix=channel_mix)
 
-    return {
-        "amplitude": round(amplitude, 4),
-        "waveform": [round(w, 3) for w in waveform],
+    frame = {
+        "amplitude": round(raw["amplitude"], 4),
+        "waveform": np.round(raw["waveform"], 3).tolist(),
         "sample_rate": sample_rate
     }
 
+    channels = frame_channels(raw)
+    if channels is not None:
+        frame["channels"] = channels
+
+    return frame
+
+
+def frame_channels(frame: dict) -> Optional[list[dict]]:
+    """
+    JSON-ready per-channel levels and waveforms of a :func:`waveform_frame`.
+    获取帧的逐通道电平与波形（JSON格式）
+
+    Returns:
+        ``[{"amplitude": ..., "waveform": [...]}, ...]`` per channel, or
+        None for mono frames
+    """
+    if "channel_amplitudes" not in frame:
+        return None
+    waveforms = np.round(frame["channel_waveforms"], 3)
+    return [
+        {"amplitude": round(float(level), 4), "waveform": points.tolist()}
+        for level, points in zip(frame["channel_amplitudes"], waveforms)
+    ]
+
+
+def preprocess_into(audio_data: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """
+    Preprocess audio straight into a preallocated model input tensor.
+    将音频预处理结果直接写入预分配的模型输入张量
+
+    Picks the region the model will see (the centre ``target_length``
+    samples, or all of a shorter recording), finds its peak once and
+    writes the peak-normalized samples into ``out`` with the remainder
+    zero-padded. No full-size temporaries are allocated.
+
+    Args:
+        audio_data: 1-D audio samples (int16 PCM or float)
+        out: float32 tensor shaped (1, target_length), overwritten
+
+    Returns:
+        ``out``
+    """
+    target_length = out.shape[-1]
+    row = out.reshape(-1)
+
+    # Region fed to the model: centre portion, or everything
+    if len(audio_data) > target_length:
+        start = (len(audio_data) - target_length) // 2
+        region = audio_data[start:start + target_length]
+    else:
+        region = audio_data
+    n = len(region)
+
+    peak = 0.0
+    if n:
+        # max/min instead of abs: no temporary, and no int16 overflow at -32768
+        peak = max(float(region.max()), -float(region.min()))
+
+    if peak > 0:
+        np.multiply(region, np.float32(1.0 / peak), out=row[:n], casting="unsafe")
+    else:
+        row[:n] = region
+    row[n:] = 0.0
+    return out
+
 
 def preprocess_for_inference(
     audio_data: np.ndarray,
@@ -109,36 +356,204 @@ def preprocess_for_inference(
     Preprocess audio data for AI model inference.
     预处理音频数据用于AI模型推理
 
+    Allocates a new tensor; callers that run repeatedly should reuse one
+    with :func:`preprocess_into`.
+
     Args:
         audio_data: Raw audio data
         target_length: Target number of samples
         sample_rate: Sample rate
 
     Returns:
-        Preprocessed audio data ready for model input
+        Preprocessed audio data ready for model input, shaped [1, samples]
+    """
+    out = np.empty((1, target_length), dtype=np.float32)
+    return preprocess_into(audio_data, out)
+
+
+def window_starts(
+    num_samples: int,
+    window_length: int,
+    hop_length: int,
+    max_windows: Optional[int] = None
+) -> np.ndarray:
+    """
+    Start offsets of overlapping model windows covering a recording.
+    计算覆盖整段录音的重叠窗口起点
+
+    Windows are spread evenly from the first to the last sample, so the
+    hop is at most ``hop_length`` (smaller when the recording does not
+    divide evenly, larger when ``max_windows`` caps the count). A
+    recording shorter than one window gives a single window at 0.
+
+    Returns:
+        int64 array of start offsets
+    """
+    if num_samples <= window_length:
+        return np.zeros(1, dtype=np.int64)
+    count = int(np.ceil((num_samples - window_length) / hop_length)) + 1
+    if max_windows:
+        count = min(count, max_windows)
+    if count == 1:
+        return np.array([(num_samples - window_length) // 2], dtype=np.int64)
+    return np.rint(np.linspace(0, num_samples - window_length, count)).astype(np.int64)
+
+
+def preprocess_windows_into(
+    audio_data: np.ndarray,
+    starts: np.ndarray,
+    out: np.ndarray
+) -> np.ndarray:
+    """
+    Preprocess several windows into the rows of a batch tensor.
+    将多个窗口预处理到批量张量的各行
+
+    Each row is normalized on its own, exactly as :func:`preprocess_into`
+    does for a single window.
+
+    Args:
+        audio_data: 1-D audio samples (int16 PCM or float)
+        starts: Window start offsets (see :func:`window_starts`)
+        out: float32 tensor shaped (len(starts), window_length), overwritten
+
+    Returns:
+        ``out``
     """
-    # Normalize
-    audio = normalize_audio(audio_data.astype(np.float32))
+    window_length = out.shape[-1]
+    for row, start in enumerate(starts):
+        preprocess_into(audio_data[start:start + window_length], out[row:row + 1])
+    return out
 
-    # Pad or trim to target length
-    if len(audio) < target_length:
-        # Pad with zeros
-        audio = np.pad(audio, (0, target_length - len(audio)))
-    elif len(audio) > target_length:
-        # Take center portion
-        start = (len(audio) - target_length) // 2
-        audio = audio[start:start + target_length]
 
-    # Reshape for model input [batch, samples]
-    audio = audio.reshape(1, -1)
+class AudioStats:
+    """
+    Incremental signal statistics, updated once per chunk.
+    增量音频统计（每个音频块更新一次）
+
+    Keeps running sums per channel so recording-level RMS, peak, clipping,
+    DC offset and zero-crossing rate are available at any time without
+    rescanning the recording. Input-side figures (clipping, DC offset) are
+    taken from the raw device samples via ``update_input``; level figures
+    from the stored, possibly filtered, samples via ``update``.
+    """
 
-    return audio
+    def __init__(self, channels: int = 1, clip_level: float = 0.999):
+        """
+        Initialize accumulator.
+
+        Args:
+            channels: Number of channels
+            clip_level: Absolute level (in [-1, 1] units) counted as clipped
+        """
+        self.channels = channels
+        self.clip_level = clip_level
+        self.reset()
+
+    def reset(self):
+        """Clear all accumulated statistics."""
+        zeros = np.zeros(self.channels)
+        self.frames = 0
+        self.sum_squares = zeros.copy()
+        self.peak = zeros.copy()
+        self.zero_crossings = np.zeros(self.channels, dtype=np.int64)
+        self.input_frames = 0
+        self.input_sum = zeros.copy()
+        self.clipped = np.zeros(self.channels, dtype=np.int64)
+        self._last_sign: Optional[np.ndarray] = None
+
+    @staticmethod
+    def _scale(block: np.ndarray) -> float:
+        return 1.0 / PCM16_SCALE if np.issubdtype(block.dtype, np.integer) else 1.0
+
+    def update(self, block: np.ndarray):
+        """
+        Add a chunk of stored samples (level, peak, zero crossings).
+        累加一个音频块的电平统计
+        """
+        block = block.reshape(-1, self.channels)
+        if len(block) == 0:
+            return
+        scale = self._scale(block)
+
+        self.frames += len(block)
+        self.sum_squares += np.einsum("ij,ij->j", block, block, dtype=np.float64) * scale ** 2
+        peak = np.maximum(block.max(axis=0), -block.min(axis=0).astype(np.float64)) * scale
+        np.maximum(self.peak, peak, out=self.peak)
+
+        signs = np.signbit(block)
+        self.zero_crossings += np.count_nonzero(signs[1:] != signs[:-1], axis=0)
+        if self._last_sign is not None:
+            self.zero_crossings += signs[0] != self._last_sign
+        self._last_sign = signs[-1]
+
+    def update_input(self, block: np.ndarray):
+        """
+        Add a chunk of raw device samples (clipping, DC offset).
+        累加原始输入的削波与直流偏移统计
+        """
+        block = block.reshape(-1, self.channels)
+        if len(block) == 0:
+            return
+        scale = self._scale(block)
+
+        self.input_frames += len(block)
+        self.input_sum += block.sum(axis=0, dtype=np.float64) * scale
+        limit = self.clip_level / scale
+        self.clipped += np.count_nonzero((block >= limit) | (block <= -limit), axis=0)
+
+    @property
+    def channel_rms(self) -> np.ndarray:
+        """RMS of each channel."""
+        if self.frames == 0:
+            return np.zeros(self.channels)
+        return np.sqrt(self.sum_squares / self.frames)
+
+    @property
+    def rms(self) -> float:
+        """RMS over all channels (same as calculate_rms on the recording)."""
+        if self.frames == 0:
+            return 0.0
+        return float(np.sqrt(self.sum_squares.sum() / (self.frames * self.channels)))
+
+    @property
+    def dc_offset(self) -> np.ndarray:
+        """Mean of the raw input, per channel."""
+        if self.input_frames == 0:
+            return np.zeros(self.channels)
+        return self.input_sum / self.input_frames
+
+    @property
+    def clipped_ratio(self) -> float:
+        """Fraction of raw input samples at or above the clip level."""
+        if self.input_frames == 0:
+            return 0.0
+        return float(self.clipped.sum() / (self.input_frames * self.channels))
+
+    @property
+    def zero_crossing_rate(self) -> np.ndarray:
+        """Zero crossings per sample, per channel."""
+        if self.frames < 2:
+            return np.zeros(self.channels)
+        return self.zero_crossings / (self.frames - 1)
+
+    def summary(self) -> dict:
+        """Get the statistics as JSON-ready values."""
+        return {
+            "frames": self.frames,
+            "rms": round(self.rms, 4),
+            "peak": round(float(self.peak.max()), 4),
+            "clipped_samples": int(self.clipped.sum()),
+            "clipped_ratio": round(self.clipped_ratio, 5),
+            "dc_offset": [round(float(v), 5) for v in self.dc_offset],
+            "zero_crossing_rate": [round(float(v), 4) for v in self.zero_crossing_rate],
+        }
 
 
 def is_audio_valid(
     audio_data: np.ndarray,
     min_rms: float = 0.01,
-    min_duration_samples: int = 8000  # 0.5 seconds at 16kHz
+    min_duration_samples: int = 8000,  # 0.5 seconds at 16kHz
+    stats: Optional[AudioStats] = None
 ) -> tuple[bool, str]:
     """
     Check if audio data is valid for processing.
@@ -148,14 +563,23 @@ def is_audio_valid(
         audio_data: Audio data to validate
         min_rms: Minimum RMS threshold
         min_duration_samples: Minimum number of samples required
+        stats: Running statistics of ``audio_data``; avoids rescanning it
 
     Returns:
         Tuple of (is_valid, reason)
     """
-    if audio_data.size < min_duration_samples:
+    if stats is not None:
+        num_samples = stats.frames
+        rms = stats.rms
+    else:
+        num_samples = audio_data.size
+        rms = None
+
+    if num_samples < min_duration_samples:
         return False, "音频时长不足"
 
-    rms = calculate_rms(audio_data)
+    if rms is None:
+        rms = calculate_rms(audio_data)
     if rms < min_rms:
         return False, "音频信号过弱，请检查麦克风"
 
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Feature Extraction
+心音智鉴特征提取模块
+
+STFT power spectrogram, log-mel spectrogram and MFCC for models that
+take time-frequency input. Window functions, mel filterbanks and DCT
+matrices are built once per parameter set and cached; frames are strided
+views of the signal, so a whole recording is transformed by one batched
+FFT. StreamingSpectrogram emits the same columns chunk by chunk while a
+recording is still running.
+
+Spectrograms are not centre-padded: frame ``k`` covers samples
+``[k * hop_length, k * hop_length + n_fft)``, which is what makes the
+streaming and batch outputs identical.
+"""
+import logging
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from config import settings
+from utils.audio_utils import pcm16_to_float32
+
+logger = logging.getLogger("heartsound.features")
+
+# Added before taking the log of mel energies
+LOG_EPSILON = 1e-6
+
+# Supported model input representations (MODEL_INPUT_FEATURES)
+FEATURE_TYPES = ("waveform", "log_mel", "mfcc")
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    """Freeze a cached array so callers cannot modify the shared copy."""
+    array.flags.writeable = False
+    return array
+
+
+@lru_cache(maxsize=8)
+def stft_window(n_fft: int) -> np.ndarray:
+    """
+    Periodic Hann window of length ``n_fft`` (cached, read-only).
+    获取缓存的汉宁窗
+    """
+    n = np.arange(n_fft)
+    window = 0.5 - 0.5 * np.cos(2.0 * np.pi * n / n_fft)
+    return _read_only(window.astype(np.float32))
+
+
+def hz_to_mel(hz):
+    """Convert frequency (Hz) to the HTK mel scale."""
+    return 2595.0 * np.log10(1.0 + np.asarray(hz, dtype=np.float64) / 700.0)
+
+
+def mel_to_hz(mel):
+    """Convert HTK mel values to frequency (Hz)."""
+    return 700.0 * (10.0 ** (np.asarray(mel, dtype=np.float64) / 2595.0) - 1.0)
+
+
+@lru_cache(maxsize=8)
+def mel_filterbank(
+    sample_rate: int,
+    n_fft: int,
+    n_mels: int,
+    fmin: float,
+    fmax: float
+) -> np.ndarray:
+    """
+    Triangular mel filterbank (cached, read-only).
+    获取缓存的梅尔滤波器组
+
+    Filters are area-normalized (Slaney style), so a filter's output does
+    not depend on its bandwidth.
+
+    Returns:
+        float32 matrix shaped (n_mels, n_fft // 2 + 1)
+
+    Raises:
+        ValueError: If the frequency range is invalid
+    """
+    if not 0 <= fmin < fmax <= sample_rate / 2:
+        raise ValueError(f"mel range must satisfy 0 <= fmin < fmax <= {sample_rate / 2} Hz")
+
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    edges = mel_to_hz(np.linspace(hz_to_mel(fmin), hz_to_mel(fmax), n_mels + 2))
+    left, centre, right = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+
+    rising = (freqs - left) / (centre - left)
+    falling = (right - freqs) / (right - centre)
+    weights = np.maximum(0.0, np.minimum(rising, falling))
+    weights *= 2.0 / (right - left)
+    return _read_only(weights.astype(np.float32))
+
+
+@lru_cache(maxsize=8)
+def dct_matrix(n_mfcc: int, n_mels: int) -> np.ndarray:
+    """
+    Orthonormal DCT-II matrix (cached, read-only).
+    获取缓存的DCT矩阵
+
+    Returns:
+        float32 matrix shaped (n_mfcc, n_mels)
+    """
+    k = np.arange(n_mfcc)[:, None]
+    n = np.arange(n_mels)[None, :]
+    basis = np.cos(np.pi / n_mels * (n + 0.5) * k) * np.sqrt(2.0 / n_mels)
+    basis[0] /= np.sqrt(2.0)
+    return _read_only(basis.astype(np.float32))
+
+
+def frame_signal(audio_data: np.ndarray, n_fft: int, hop_length: int) -> np.ndarray:
+    """
+    Strided (frames, n_fft) view of a 1-D signal; no samples are copied.
+    将信号切分为重叠帧（步幅视图，不复制数据）
+    """
+    if len(audio_data) < n_fft:
+        return np.zeros((0, n_fft), dtype=audio_data.dtype)
+    return sliding_window_view(audio_data, n_fft)[::hop_length]
+
+
+def stft_power(audio_data: np.ndarray, n_fft: int, hop_length: int) -> np.ndarray:
+    """
+    Power spectrogram of all frames in one batched FFT.
+    批量计算功率谱
+
+    Args:
+        audio_data: 1-D samples (int16 PCM or float)
+        n_fft: Frame length
+        hop_length: Frame step
+
+    Returns:
+        float32 array shaped (frames, n_fft // 2 + 1)
+    """
+    if np.issubdtype(audio_data.dtype, np.integer):
+        audio_data = pcm16_to_float32(audio_data)
+    frames = frame_signal(audio_data, n_fft, hop_length)
+    spectrum = np.fft.rfft(frames * stft_window(n_fft), axis=1)
+    return np.square(np.abs(spectrum)).astype(np.float32)
+
+
+class FeatureExtractor:
+    """
+    Log-mel / MFCC extractor with cached transform matrices.
+    带缓存变换矩阵的对数梅尔/MFCC特征提取器
+    """
+
+    def __init__(
+        self,
+        sample_rate: Optional[int] = None,
+        n_fft: Optional[int] = None,
+        hop_length: Optional[int] = None,
+        n_mels: Optional[int] = None,
+        fmin: Optional[float] = None,
+        fmax: Optional[float] = None,
+        n_mfcc: Optional[int] = None
+    ):
+        """
+        Initialize extractor; unset parameters come from settings.
+
+        Args:
+            sample_rate: Sample rate (Hz)
+            n_fft: STFT frame length
+            hop_length: STFT frame step
+            n_mels: Number of mel bands
+            fmin: Lowest mel frequency (Hz)
+            fmax: Highest mel frequency (Hz)
+            n_mfcc: Number of cepstral coefficients
+        """
+        self.sample_rate = sample_rate or settings.AUDIO_SAMPLE_RATE
+        self.n_fft = n_fft or settings.FEATURE_N_FFT
+        self.hop_length = hop_length or settings.FEATURE_HOP_LENGTH
+        self.n_mels = n_mels or settings.FEATURE_N_MELS
+        self.fmin = settings.FEATURE_FMIN if fmin is None else fmin
+        self.fmax = fmax or settings.FEATURE_FMAX
+        self.n_mfcc = n_mfcc or settings.FEATURE_N_MFCC
+
+        self.filterbank = mel_filterbank(
+            self.sample_rate, self.n_fft, self.n_mels, self.fmin, self.fmax
+        )
+        self.dct = dct_matrix(self.n_mfcc, self.n_mels)
+
+    def num_frames(self, num_samples: int) -> int:
+        """Number of spectrogram columns for a signal of ``num_samples``."""
+        if num_samples < self.n_fft:
+            return 0
+        return 1 + (num_samples - self.n_fft) // self.hop_length
+
+    def log_mel_from_power(self, power: np.ndarray) -> np.ndarray:
+        """Map power frames (frames, bins) to log-mel columns (n_mels, frames)."""
+        mel = self.filterbank @ power.T
+        return np.log(mel + LOG_EPSILON, out=mel)
+
+    def mfcc_from_log_mel(self, log_mel: np.ndarray) -> np.ndarray:
+        """Map log-mel columns (n_mels, frames) to MFCC columns (n_mfcc, frames)."""
+        return self.dct @ log_mel
+
+    def log_mel(self, audio_data: np.ndarray) -> np.ndarray:
+        """
+        Log-mel spectrogram of a complete signal.
+        计算对数梅尔频谱
+
+        Returns:
+            float32 array shaped (n_mels, frames)
+        """
+        return self.log_mel_from_power(stft_power(audio_data, self.n_fft, self.hop_length))
+
+    def mfcc(self, audio_data: np.ndarray) -> np.ndarray:
+        """
+        MFCC of a complete signal.
+        计算MFCC
+
+        Returns:
+            float32 array shaped (n_mfcc, frames)
+        """
+        return self.mfcc_from_log_mel(self.log_mel(audio_data))
+
+    def extract(self, audio_data: np.ndarray, kind: str) -> np.ndarray:
+        """
+        Compute one of FEATURE_TYPES other than "waveform".
+
+        Raises:
+            ValueError: For unknown feature types
+        """
+        if kind == "log_mel":
+            return self.log_mel(audio_data)
+        if kind == "mfcc":
+            return self.mfcc(audio_data)
+        raise ValueError(f"Unknown feature type: {kind}")
+
+    def stream(self, kind: str = "log_mel") -> "StreamingSpectrogram":
+        """Create a streaming extractor sharing this extractor's matrices."""
+        return StreamingSpectrogram(self, kind)
+
+
+class StreamingSpectrogram:
+    """
+    Incremental spectrogram that emits columns as chunks arrive.
+    增量式频谱计算，随音频块到达输出新的频谱列
+
+    Samples not yet covered by a full frame are carried over, so the
+    concatenated output equals the batch result for the whole signal.
+    """
+
+    def __init__(self, extractor: FeatureExtractor, kind: str = "log_mel"):
+        """
+        Initialize streaming extractor.
+
+        Args:
+            extractor: Parameters and cached matrices
+            kind: "power", "log_mel" or "mfcc"
+        """
+        if kind not in ("power", "log_mel", "mfcc"):
+            raise ValueError(f"Unknown feature type: {kind}")
+        self.extractor = extractor
+        self.kind = kind
+        self.reset()
+
+    def reset(self):
+        """Drop carried samples; the next chunk starts a new signal."""
+        self._pending = np.zeros(0, dtype=np.float32)
+        self.frames_emitted = 0
+
+    def update(self, block: np.ndarray) -> np.ndarray:
+        """
+        Add the next mono chunk and return the columns it completes.
+        添加下一段单声道音频，返回新完成的频谱列
+
+        Args:
+            block: 1-D samples (int16 PCM or float)
+
+        Returns:
+            float32 array shaped (features, new_frames); ``new_frames`` may be 0
+        """
+        extractor = self.extractor
+        samples = pcm16_to_float32(block)
+        data = np.concatenate((self._pending, samples)) if len(self._pending) else samples
+
+        frames = extractor.num_frames(len(data))
+        self._pending = data[frames * extractor.hop_length:].astype(np.float32, copy=True)
+        self.frames_emitted += frames
+
+        power = stft_power(data, extractor.n_fft, extractor.hop_length)
+        if self.kind == "power":
+            return power.T
+        log_mel = extractor.log_mel_from_power(power)
+        if self.kind == "mfcc":
+            return extractor.mfcc_from_log_mel(log_mel)
+        return log_mel
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+HeartSound Waveform Frame Codec
+心音智鉴波形帧编码模块
+
+Compact encodings for the ``audio_frame`` messages streamed during a
+recording. The client picks a format when it connects:
+
+    /ws/audio/{session_id}?frame_encoding=uint8&frame_transport=binary
+
+Encodings:
+- ``json`` (default): list of floats inside a JSON message, plus a
+  ``channels`` list of per-channel levels and waveforms for
+  multi-channel recordings
+- ``uint8`` / ``int16``: waveform points in [0, 1] quantized to the type's
+  positive range
+- ``float16``: waveform points as IEEE half floats
+
+Transports for the packed encodings:
+- ``binary``: one binary WebSocket message per frame
+- ``base64``: ``{"type": "audio_frame", "encoding": ..., "payload": ...}``
+  with the same bytes base64-encoded, for clients without binary support
+
+Packed layout (little-endian): a fixed header followed by the points.
+
+    version      uint8     FRAME_VERSION
+    encoding     uint8     FRAME_ENCODINGS code
+    num_points   uint16
+    sequence     uint32    per-connection frame counter
+    amplitude    float32   RMS in [0, 1]
+    remaining    uint16    seconds left in the recording
+    quality      uint8     signal quality score * 254 (255 = not yet known)
+    bpm          uint8     heart rate, rounded (0 = not yet known)
+
+Packed frames are mono-only: the points and amplitude are those of the
+channel mixdown, and per-channel data is not sent (clients that need
+it use the ``json`` encoding). Beat markers (S1/S2) do not fit the fixed
+layout; with packed encodings they are sent as separate
+``{"type": "beats", ...}`` JSON messages.
+"""
+import base64
+import struct
+from typing import Mapping, Optional, Union
+
+import numpy as np
+
+from utils.audio_utils import frame_channels
+
+FRAME_VERSION = 2
+
+# Quality byte value when no quality report is available yet
+QUALITY_UNKNOWN = 255
+
+# BPM byte value when no heart rate estimate is available yet
+BPM_UNKNOWN = 0
+
+# Encoding name -> header code
+FRAME_ENCODINGS = {"json": 0, "uint8": 1, "int16": 2, "float16": 3}
+
+FRAME_TRANSPORTS = ("binary", "base64")
+
+FRAME_HEADER = struct.Struct("<BBHIfHBB")
+
+# Packed encodings: (wire dtype, scale applied to points in [0, 1])
+_PACKED_TYPES = {
+    "uint8": (np.dtype("u1"), 255.0),
+    "int16": (np.dtype("<i2"), 32767.0),
+    "float16": (np.dtype("<f2"), None),
+}
+
+
+class FrameEncoder:
+    """
+    Per-connection waveform frame encoder.
+    单连接波形帧编码器
+    """
+
+    def __init__(self, encoding: str = "json", transport: str = "binary"):
+        """
+        Initialize encoder.
+
+        Args:
+            encoding: One of FRAME_ENCODINGS
+            transport: One of FRAME_TRANSPORTS (ignored for json)
+
+        Raises:
+            ValueError: For unknown encodings or transports
+        """
+        if encoding not in FRAME_ENCODINGS:
+            raise ValueError(f"Unknown frame encoding: {encoding}")
+        if transport not in FRAME_TRANSPORTS:
+            raise ValueError(f"Unknown frame transport: {transport}")
+
+        self.encoding = encoding
+        self.transport = transport
+        self.sequence = 0
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, str]) -> "FrameEncoder":
+        """Create an encoder from connection query parameters."""
+        return cls(
+            encoding=params.get("frame_encoding", "json").lower(),
+            transport=params.get("frame_transport", "binary").lower()
+        )
+
+    @property
+    def is_binary(self) -> bool:
+        """True if frames are sent as binary WebSocket messages."""
+        return self.encoding != "json" and self.transport == "binary"
+
+    def describe(self) -> dict:
+        """Negotiated format, echoed to the client on connect."""
+        info = {"encoding": self.encoding}
+        if self.encoding != "json":
+            info.update({
+                "transport": self.transport,
+                "version": FRAME_VERSION,
+                "header": FRAME_HEADER.format,
+                "header_size": FRAME_HEADER.size,
+            })
+        return info
+
+    def encode(self, frame: dict) -> Union[dict, bytes]:
+        """
+        Encode one frame from ``AudioRecorder.stream_frames``.
+        编码一个波形帧
+
+        Returns:
+            JSON message dict, or bytes for the binary transport
+        """
+        self.sequence += 1
+
+        if self.encoding == "json":
+            message = {
+                "type": "audio_frame",
+                "timestamp": frame["timestamp"],
+                "data": np.round(frame["waveform"], 3).tolist(),
+                "amplitude": round(float(frame["amplitude"]), 4),
+                "remaining_seconds": frame["remaining_seconds"]
+            }
+            quality = frame.get("quality")
+            if quality is not None:
+                message["quality"] = quality["score"]
+                message["quality_issue"] = quality["issue"]
+            if "bpm" in frame:
+                message["bpm"] = frame["bpm"]
+                message["beats"] = frame["beats"]
+            channels = frame_channels(frame)
+            if channels is not None:
+                message["channels"] = channels
+            return message
+
+        packed = self.pack(frame)
+        if self.transport == "binary":
+            return packed
+        return {
+            "type": "audio_frame",
+            "encoding": self.encoding,
+            "payload": base64.b64encode(packed).decode("ascii")
+        }
+
+    def pack(self, frame: dict) -> bytes:
+        """Pack header and quantized points into bytes."""
+        dtype, scale = _PACKED_TYPES[self.encoding]
+        points = np.asarray(frame["waveform"], dtype=np.float32)
+        if scale is not None:
+            points = np.rint(np.clip(points, 0.0, 1.0) * scale)
+
+        quality = frame.get("quality")
+        bpm = frame.get("bpm")
+        header = FRAME_HEADER.pack(
+            FRAME_VERSION,
+            FRAME_ENCODINGS[self.encoding],
+            len(points),
+            self.sequence & 0xFFFFFFFF,
+            float(frame["amplitude"]),
+            min(max(int(frame["remaining_seconds"]), 0), 0xFFFF),
+            QUALITY_UNKNOWN if quality is None else int(round(quality["score"] * 254)),
+            BPM_UNKNOWN if bpm is None else min(max(int(round(bpm)), 1), 255)
+        )
+        return header + points.astype(dtype).tobytes()
+
+
+def decode_frame(data: Union[bytes, str]) -> dict:
+    """
+    Decode a packed frame (bytes, or the base64 payload string).
+    解码打包的波形帧
+
+    Returns:
+        Dict with sequence, amplitude, remaining_seconds, quality and bpm
+        (None if unknown), encoding and waveform (float32 points in [0, 1])
+
+    Raises:
+        ValueError: If the frame is malformed
+    """
+    if isinstance(data, str):
+        data = base64.b64decode(data)
+    if len(data) < FRAME_HEADER.size:
+        raise ValueError("Frame shorter than header")
+
+    (version, code, num_points, sequence,
+     amplitude, remaining, quality, bpm) = FRAME_HEADER.unpack_from(data)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported frame version: {version}")
+    encoding: Optional[str] = next(
+        (name for name, value in FRAME_ENCODINGS.items() if value == code and name in _PACKED_TYPES),
+        None
+    )
+    if encoding is None:
+        raise ValueError(f"Unknown frame encoding code: {code}")
+
+    dtype, scale = _PACKED_TYPES[encoding]
+    points = np.frombuffer(data, dtype=dtype, count=num_points, offset=FRAME_HEADER.size)
+    waveform = points.astype(np.float32)
+    if scale is not None:
+        waveform /= scale
+
+    return {
+        "sequence": sequence,
+        "encoding": encoding,
+        "amplitude": amplitude,
+        "remaining_seconds": remaining,
+        "quality": None if quality == QUALITY_UNKNOWN else quality / 254,
+        "bpm": None if bpm == BPM_UNKNOWN else bpm,
+        "waveform": waveform,
+    }
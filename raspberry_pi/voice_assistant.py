@@ -7,6 +7,7 @@ HeartSound Voice Assistant
 """
 
 import os
+import select
 import sys
 import json
 import struct
@@ -57,6 +58,7 @@ VAD_TRIGGER_DECAY = max(0.70, min(0.98, VAD_TRIGGER_DECAY))
 SILENCE_TIMEOUT = 0.8         # 说完话后静音多久停止录音（秒）
 MIN_SPEECH_DURATION = 0.35    # 最短有效语音时长（秒），过短丢弃
 NOISE_CALIBRATION_SECONDS = 1.0  # 启动后先采样噪声底噪用于动态阈值
+NOISE_CALIBRATION_TIMEOUT = 5  # 校准读取超时(秒)，采集源卡住时不阻塞启动
 
 # Wake word (唤醒词)
 WAKE_WORDS = ["小智", "小知", "小志", "小枝", "晓智", "筱智", "导致", "角质", "调制", "小只"]  # 加强同音容错
@@ -74,6 +76,13 @@ ALSA_PCM_VOLUME = 78  # 禁止修改！已验证最佳值
 INPUT_DEVICE = os.environ.get("INPUT_DEVICE", "plughw:3,0")   # USB microphone
 OUTPUT_DEVICE = os.environ.get("OUTPUT_DEVICE", "plughw:2,0")  # 板载3.5mm耳机口
 
+# 音频输入来源: heartsound（默认，复用心音服务常开的共享采集设备，不可用时回退到 arecord）
+# | arecord（独占 INPUT_DEVICE）
+CAPTURE_SOURCE = os.environ.get("CAPTURE_SOURCE", "heartsound").strip().lower()
+HEARTSOUND_CAPTURE_WS = os.environ.get(
+    "HEARTSOUND_CAPTURE_WS", "ws://127.0.0.1:8000/ws/capture?name=voice_assistant"
+)
+
 # TTS tuning
 TTS_ENGINE = os.environ.get("TTS_ENGINE", "edge").strip().lower()  # edge | espeak
 TTS_ALLOW_FALLBACK = os.environ.get("TTS_ALLOW_FALLBACK", "1").strip().lower() not in {"0", "false", "no"}
@@ -360,6 +369,107 @@ def get_openclaw_token():
         return ""
 
 
+class ArecordPcmSource:
+    """arecord 子进程 PCM 源（独占 INPUT_DEVICE）"""
+
+    def __init__(self, duration_s=None):
+        cmd = [
+            ARECORD_BIN,
+            "-D", INPUT_DEVICE,
+            "-f", "S16_LE",
+            "-r", str(RATE),
+            "-c", "1",
+            "-t", "raw",        # 输出原始 PCM
+            "-q",                 # 安静模式
+        ]
+        if duration_s:
+            cmd[1:1] = ["-d", str(max(1, int(duration_s)))]
+        self._proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def read(self, n_bytes, timeout_s=None):
+        if timeout_s is None:
+            return self._proc.stdout.read(n_bytes)
+        # 带超时读取：到期后返回已读到的数据
+        fd = self._proc.stdout.fileno()
+        deadline = time.monotonic() + timeout_s
+        data = bytearray()
+        while len(data) < n_bytes:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                break
+            chunk = os.read(fd, n_bytes - len(data))
+            if not chunk:
+                break
+            data.extend(chunk)
+        return bytes(data)
+
+    def close(self):
+        self._proc.terminate()
+        self._proc.wait()
+
+
+class HeartSoundPcmSource:
+    """心音服务共享采集设备 PCM 源（/ws/capture），与心音检测共用麦克风，不再抢占声卡"""
+
+    def __init__(self, ws_url: str, timeout_s: float = 3.0):
+        from websockets.sync.client import connect
+
+        self._conn = connect(ws_url, open_timeout=timeout_s, close_timeout=1, max_size=None)
+        self._buf = bytearray()
+        try:
+            header = json.loads(self._conn.recv(timeout=timeout_s))
+        except Exception:
+            self.close()
+            raise
+        if header.get("type") != "format":
+            self.close()
+            raise RuntimeError(header.get("message", "共享采集不可用"))
+        if header.get("sample_rate") != RATE or header.get("sample_format") != "S16_LE":
+            self.close()
+            raise RuntimeError(f"共享采集格式不匹配: {header}")
+
+    def read(self, n_bytes, timeout_s=None):
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+        while len(self._buf) < n_bytes:
+            recv_timeout = 2.0
+            if deadline is not None:
+                recv_timeout = min(recv_timeout, deadline - time.monotonic())
+                if recv_timeout <= 0:
+                    break
+            try:
+                msg = self._conn.recv(timeout=recv_timeout)
+            except Exception:
+                break
+            if isinstance(msg, str):
+                break
+            self._buf.extend(msg)
+        data = bytes(self._buf[:n_bytes])
+        del self._buf[:n_bytes]
+        return data
+
+    def close(self):
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+
+
+def open_pcm_source(duration_s=None):
+    """按 CAPTURE_SOURCE 打开 16k/单声道/16bit PCM 源，共享采集不可用时回退到 arecord"""
+    if CAPTURE_SOURCE == "heartsound":
+        try:
+            return HeartSoundPcmSource(HEARTSOUND_CAPTURE_WS)
+        except Exception as e:
+            print(f"⚠️ 共享采集不可用，回退到 arecord: {e}")
+    if not ARECORD_BIN:
+        raise RuntimeError("缺少 arecord，请先安装 alsa-utils")
+    return ArecordPcmSource(duration_s)
+
+
 def get_amplitude(raw_data):
     """Calculate max amplitude from raw PCM S16_LE data"""
     n_samples = len(raw_data) // 2
@@ -370,15 +480,13 @@ def get_amplitude(raw_data):
 
 
 def record_audio():
-    """Voice-activated recording using arecord + VAD
+    """Voice-activated recording using arecord (or the shared capture service) + VAD
 
     持续监听麦克风，检测到人声自动开始录音，
     静音超过 SILENCE_TIMEOUT 秒自动停止。
     无需按任何键。
     """
     global DYNAMIC_THRESHOLD
-    if not ARECORD_BIN:
-        raise RuntimeError("缺少 arecord，请先安装 alsa-utils")
 
     trigger_threshold = min(DYNAMIC_THRESHOLD, VAD_MAX_THRESHOLD)
     if trigger_threshold < DYNAMIC_THRESHOLD:
@@ -386,20 +494,8 @@ def record_audio():
 
     print(f"👂 正在监听... (说话即开始录音, 阈值={trigger_threshold})")
 
-    # 用 arecord 持续录制原始 PCM 流到 stdout
-    proc = subprocess.Popen(
-        [
-            ARECORD_BIN,
-            "-D", INPUT_DEVICE,
-            "-f", "S16_LE",
-            "-r", str(RATE),
-            "-c", "1",
-            "-t", "raw",        # 输出原始 PCM
-            "-q",                 # 安静模式
-        ],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.DEVNULL,
-    )
+    # 持续读取原始 PCM 流
+    source = open_pcm_source()
 
     frames = []
     is_recording = False
@@ -412,7 +508,7 @@ def record_audio():
         # 阶段1：等待触发
         triggered = False
         for _ in range(max_listen_chunks):
-            data = proc.stdout.read(CHUNK_BYTES)
+            data = source.read(CHUNK_BYTES)
             if not data or len(data) < CHUNK_BYTES:
                 break
             amplitude = get_amplitude(data)
@@ -430,7 +526,7 @@ def record_audio():
 
         # 阶段2：录音直到静音或超时
         for _ in range(max_record_chunks):
-            data = proc.stdout.read(CHUNK_BYTES)
+            data = source.read(CHUNK_BYTES)
             if not data or len(data) < CHUNK_BYTES:
                 break
 
@@ -453,8 +549,7 @@ def record_audio():
                 print("⏱️ 达到最大录音时长")
                 break
     finally:
-        proc.terminate()
-        proc.wait()
+        source.close()
 
     if not frames or speech_time < MIN_SPEECH_DURATION:
         print("❌ 语音太短，已忽略")
@@ -523,28 +618,18 @@ def calibrate_noise_threshold():
     """启动时采样环境噪声，自动更新触发阈值"""
     global DYNAMIC_THRESHOLD
 
-    if not ARECORD_BIN:
+    if not ARECORD_BIN and CAPTURE_SOURCE != "heartsound":
         print(f"⚠️ 未找到 arecord，跳过噪声校准，使用默认阈值 {SILENCE_THRESHOLD}")
         DYNAMIC_THRESHOLD = SILENCE_THRESHOLD
         return
 
     sample_bytes = int(RATE * 2 * NOISE_CALIBRATION_SECONDS)
     try:
-        proc = subprocess.run(
-            [
-                ARECORD_BIN,
-                "-D", INPUT_DEVICE,
-                "-f", "S16_LE",
-                "-r", str(RATE),
-                "-c", "1",
-                "-d", str(max(1, int(NOISE_CALIBRATION_SECONDS))),
-                "-t", "raw",
-                "-q",
-            ],
-            capture_output=True,
-            timeout=5,
-        )
-        data = proc.stdout[:sample_bytes]
+        source = open_pcm_source(duration_s=NOISE_CALIBRATION_SECONDS)
+        try:
+            data = source.read(sample_bytes, timeout_s=NOISE_CALIBRATION_TIMEOUT)
+        finally:
+            source.close()
         noise_amp = get_amplitude(data) if data else 0
 
         # 动态阈值 = max(默认阈值, 噪声幅度*2.2 + 安全余量)
@@ -1118,9 +1203,10 @@ def main():
     print(f"🔌 OpenClaw Gateway: {_normalize_ws_url(OPENCLAW_WS)}")
     print(f"🧠 Session: {OPENCLAW_SESSION_KEY}")
 
-    if not ARECORD_BIN:
+    if not ARECORD_BIN and CAPTURE_SOURCE != "heartsound":
         print("❌ 缺少 arecord（alsa-utils），无法录音。先安装: sudo apt install -y alsa-utils")
         return
+    print(f"🎙️ 音频输入: {CAPTURE_SOURCE}")
 
     # 锁定声卡音量为已验证最佳值，禁止其他地方修改
     try: